@@ -0,0 +1,38 @@
+'''
+Statistieken over populaties zonder de hele populatie langs te gaan
+
+schat_gemiddelde schat het gemiddelde van een grootheid over een populatie met een
+aselecte steekproef en geeft de standaardfout mee, zodat grafieken een foutmarge kunnen tonen.
+'''
+
+import math
+import numpy as np
+
+def standaardfout(waarden, populatie_grootte=None):
+    '''
+    Standaardfout van het gemiddelde van 'waarden'. Met populatie_grootte wordt gecorrigeerd voor een
+    steekproef zonder teruglegging uit een eindige populatie (0 als alles is meegenomen).
+    '''
+    aantal = len(waarden)
+    if aantal == 0:
+        return math.nan
+    variantie = float(waarden.var(ddof=1)) if aantal > 1 else 0.0
+    fout = math.sqrt(variantie / aantal)
+    if populatie_grootte:
+        fout *= math.sqrt(max(0.0, 1 - aantal / populatie_grootte))
+    return fout
+
+def schat_gemiddelde(bereken, populatie_grootte, steekproef, rng):
+    '''
+    Schat het gemiddelde van een grootheid over een populatie van 'populatie_grootte' agents.
+    'bereken' krijgt een array met indices (of None voor de hele populatie) en geeft de waarden terug.
+    Met steekproef=None, of als de populatie niet groter is dan de steekproef, wordt exact gerekend.
+    Geeft (gemiddelde, standaardfout) terug.
+    '''
+    if steekproef is None or populatie_grootte <= steekproef:
+        waarden = np.asarray(bereken(None), dtype=float)
+        return (float(waarden.mean()) if len(waarden) else 0.0), 0.0
+
+    indices = np.sort(rng.choice(populatie_grootte, size=steekproef, replace=False))
+    waarden = np.asarray(bereken(indices), dtype=float)
+    return float(waarden.mean()), standaardfout(waarden, populatie_grootte)
@@ -4,6 +4,8 @@ import uuid
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
+from grafiek import teken_runs
+from tracing import trace, INFO
 
 # Definiëren van de Token klasse
 class Token:
@@ -210,7 +212,7 @@ class InitialRelease:
                 # Wijs tokens toe aan reserves
                 self.reserves[category].total_tokens += total_tokens
 
-        print("Initial token distribution completed.")
+        trace("app", INFO, "Initial token distribution completed.")
 
 
 # Simulatie van de markt
@@ -358,9 +360,9 @@ if st.button("Voer Simulatie Uit"):
 
     # Plot de marktprijzen
     st.subheader("Marktprijs Ontwikkeling over Iteraties")
+    # Een lijn per run bij weinig runs, anders een waaier; altijd uitgedund (grafiek.py)
     fig, ax = plt.subplots()
-    for i, market_prices in enumerate(all_market_prices):
-        ax.plot(market_prices, label=f'Run {i+1}')
+    teken_runs(ax, np.array(all_market_prices))
     ax.set_xlabel('Iteratie (Dag)')
     ax.set_ylabel('Marktprijs')
     ax.set_title('Marktprijs Ontwikkeling over Iteraties')
@@ -1,19 +1,33 @@
 import random
 import math
+import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
+from grafiek import dun_uit, teken_runs, teken_waaier, MAX_LIJNEN
 import os
+from tracing import Tracer, DEBUG, INFO
 
 os.environ['USE_STREAMLIT'] = 'False'  # Verander deze waarde indien nodig
 
 # Controleer de omgevingsvariabele om te bepalen of streamlit moet worden gebruikt
 USE_STREAMLIT = os.environ.get('USE_STREAMLIT', 'False') == 'True'
 
-def write_output(message):
-    if USE_STREAMLIT:
-        st.write(message)
-    else:
-        print(message)
+# Sink die de traces van deze app naar Streamlit of de console schrijft
+class OutputSink:
+    def schrijf(self, categorie, niveau, bericht):
+        if USE_STREAMLIT:
+            st.write(bericht)
+        else:
+            print(bericht)
+
+# Eigen tracer voor deze app, zodat de gedeelde tracer van het model (en zijn sink) niet verandert als app_v1 geimporteerd wordt.
+# Details per gebruiker, order en trade zijn DEBUG en staan standaard uit
+tracer = Tracer(sink=OutputSink())
+tracer.zet("app_v1", INFO)
+
+def write_output(message, *args, niveau=INFO):
+    # Het bericht wordt alleen geformatteerd als het niveau voor deze app aan staat
+    tracer.trace("app_v1", niveau, message, *args)
 
 # Token: Een klasse die een enkel token voorstelt.
 class Token: 
@@ -118,14 +132,17 @@ class Market:
         self.sell_orders.sort(key=lambda x: x.price)  # Lowest sell price first
 
     def print_order_book(self):
-        write_output("Orderboek:")
-        write_output("Kooporders:")
+        # Het orderboek is een DEBUG trace, sla het doorlopen van de orders over als die uit staat
+        if not tracer.aan("app_v1", DEBUG):
+            return
+        write_output("Orderboek:", niveau=DEBUG)
+        write_output("Kooporders:", niveau=DEBUG)
         for order in self.buy_orders:
-            write_output(f"Gebruiker: {order.user.user_id}, Aantal: {order.quantity}, Prijs: {order.price:.2f}")
+            write_output("Gebruiker: {}, Aantal: {}, Prijs: {:.2f}", order.user.user_id, order.quantity, order.price, niveau=DEBUG)
 
-        write_output("Verkooporders:")
+        write_output("Verkooporders:", niveau=DEBUG)
         for order in self.sell_orders:
-            write_output(f"Gebruiker: {order.user.user_id}, Aantal: {order.quantity}, Prijs: {order.price:.2f}")
+            write_output("Gebruiker: {}, Aantal: {}, Prijs: {:.2f}", order.user.user_id, order.quantity, order.price, niveau=DEBUG)
 
     def match_orders(self):
         while self.buy_orders and self.sell_orders:
@@ -145,8 +162,10 @@ class Market:
     
                 # Print details of the trade
                 write_output(
-                    f"Trade executed: {trade_quantity} tokens from {best_sell.user.user_id} "
-                    f"to {best_buy.user.user_id} at price {best_sell.price:.2f}"
+                    "Trade executed: {} tokens from {} "
+                    "to {} at price {:.2f}",
+                    trade_quantity, best_sell.user.user_id, best_buy.user.user_id, best_sell.price,
+                    niveau=DEBUG
                 )
     
                 best_buy.quantity -= trade_quantity
@@ -165,7 +184,7 @@ class Market:
             self.price *= (1 + self.elasticity)
         elif len(self.sell_orders) > len(self.buy_orders):
             self.price *= (1 - self.elasticity)
-        write_output(f"De nieuwe marktprijs voor tokens is {self.price:.2f} euro.")
+        write_output("De nieuwe marktprijs voor tokens is {:.2f} euro.", self.price, niveau=DEBUG)
 
     def clear_orders(self):
         self.buy_orders.clear()
@@ -184,14 +203,14 @@ class ActivityPool:
     def assign_tokens(self, user):
         tokens_paid = user.pay_token(self.activity_price)
         if tokens_paid:
-            write_output(f"{user.user_id} heeft {self.activity_price} token(s) betaald.")
+            write_output("{} heeft {} token(s) betaald.", user.user_id, self.activity_price, niveau=DEBUG)
             if random.random() < self.probability:
                 user.receive_tokens(self.received_tokens)
-                write_output(f"{user.user_id} heeft {self.received_tokens} token(s) gekregen.")
+                write_output("{} heeft {} token(s) gekregen.", user.user_id, self.received_tokens, niveau=DEBUG)
             else:
-                write_output(f"{user.user_id} heeft geen tokens gekregen.")
+                write_output("{} heeft geen tokens gekregen.", user.user_id, niveau=DEBUG)
         else:
-            write_output(f"{user.user_id} heeft niet genoeg tokens om deel te nemen.")
+            write_output("{} heeft niet genoeg tokens om deel te nemen.", user.user_id, niveau=DEBUG)
             # Probeer een token te kopen van een andere gebruiker
             # Hier gebruiken we de orders in plaats van directe koopfunctie
             self.market.place_orders()
@@ -210,7 +229,7 @@ class ActivityPool:
                 self.market.place_orders()
                 self.market.match_orders()
         else:
-            write_output(f"{user.user_id} heeft besloten niet deel te nemen vanwege lage utility.")
+            write_output("{} heeft besloten niet deel te nemen vanwege lage utility.", user.user_id, niveau=DEBUG)
      
 # Initial Release class: 
 class InitialRelease:
@@ -221,7 +240,7 @@ class InitialRelease:
         for _ in range(num_tokens):
             user = random.choice(self.users) # voeg de num_tokens op een random manier toe
             user.receive_tokens(1)
-        write_output(f"Inital release of {num_tokens} tokens completed.")        
+        write_output("Inital release of {} tokens completed.", num_tokens)        
         
 # Functie om gebruikers aan te maken
 def create_users(num_friends_family, num_team_advisors, num_general):
@@ -238,23 +257,24 @@ def create_users(num_friends_family, num_team_advisors, num_general):
 def simulate_activity(activity_pool, initial_release, market, iterations):
     # Algemene informatie
     write_output("Algemene Informatie:")
-    write_output(f"- Activity Threshold: {activity_pool.utility_threshold:.2f}")
+    write_output("- Activity Threshold: {:.2f}", activity_pool.utility_threshold)
     write_output("")  # Lege regel voor leesbaarheid
     
-    # Basisinformatie van de users
-    for user in activity_pool.users:  # Gebruik bestaande activity_pool gebruikers
-        write_output(f"Basisinformatie voor {user.user_id}:")
-        write_output(f"- Balance: {user.balance:.2f}")
-        write_output(f"- Aantal tokens: {user.token_count()}")
-        write_output(f"- Activity Desire: {user.activity_desire:.2f}")
-        write_output(f"- Activity Utility: {user.activity_utility():.2f}")
-        write_output(f"- Buy Utility: {user.buy_utility(market.price):.2f}")  # Geef de marktprijs door
-        write_output(f"- Sell Utility: {user.sell_utility(market.price):.2f}")  # Geef de marktprijs door
-        write_output("")  # Lege regel voor leesbaarheid
+    # Basisinformatie van de users (alleen als DEBUG aan staat, de utilities worden anders voor niets berekend)
+    if tracer.aan("app_v1", DEBUG):
+        for user in activity_pool.users:  # Gebruik bestaande activity_pool gebruikers
+            write_output("Basisinformatie voor {}:", user.user_id, niveau=DEBUG)
+            write_output("- Balance: {:.2f}", user.balance, niveau=DEBUG)
+            write_output("- Aantal tokens: {}", user.token_count(), niveau=DEBUG)
+            write_output("- Activity Desire: {:.2f}", user.activity_desire, niveau=DEBUG)
+            write_output("- Activity Utility: {:.2f}", user.activity_utility(), niveau=DEBUG)
+            write_output("- Buy Utility: {:.2f}", user.buy_utility(market.price), niveau=DEBUG)  # Geef de marktprijs door
+            write_output("- Sell Utility: {:.2f}", user.sell_utility(market.price), niveau=DEBUG)  # Geef de marktprijs door
+            write_output("", niveau=DEBUG)  # Lege regel voor leesbaarheid
     
     for i in range(iterations):
-        write_output(f"--- Iteratie {i+1} ---")
-        write_output(f"Huidige marktprijs: {market.price:.2f}\n")
+        write_output("--- Iteratie {} ---", i+1)
+        write_output("Huidige marktprijs: {:.2f}\n", market.price)
 
         # Plaats orders en match deze
         market.place_orders()
@@ -264,23 +284,24 @@ def simulate_activity(activity_pool, initial_release, market, iterations):
         market.clear_orders()
 
         for user in activity_pool.users:
-            write_output(f"{user.user_id} heeft {user.token_count()} tokens.")
-            write_output(f"{user.user_id} heeft {user.balance:.2f} balance.")
-            write_output(f"{user.user_id} heeft {user.activity_utility():.2f} utility.")
-            write_output(f"{user.user_id}- Buy Utility: {user.buy_utility(market.price):.2f}")  # Geef de marktprijs door
-            write_output(f"{user.user_id}- Sell Utility: {user.sell_utility(market.price):.2f}")  # Geef de marktprijs door
+            if tracer.aan("app_v1", DEBUG):
+                write_output("{} heeft {} tokens.", user.user_id, user.token_count(), niveau=DEBUG)
+                write_output("{} heeft {:.2f} balance.", user.user_id, user.balance, niveau=DEBUG)
+                write_output("{} heeft {:.2f} utility.", user.user_id, user.activity_utility(), niveau=DEBUG)
+                write_output("{}- Buy Utility: {:.2f}", user.user_id, user.buy_utility(market.price), niveau=DEBUG)  # Geef de marktprijs door
+                write_output("{}- Sell Utility: {:.2f}", user.user_id, user.sell_utility(market.price), niveau=DEBUG)  # Geef de marktprijs door
             
             # Laat gebruiker deelnemen en print de resultaten via write_output
             activity_pool.participate(user)
-            write_output("")  # Een lege regel voor leesbaarheid
+            write_output("", niveau=DEBUG)  # Een lege regel voor leesbaarheid
 
         # Pas de marktprijs aan en print het resultaat
         market.adjust_market_price()
-        write_output(f"Nieuwe marktprijs: {market.price:.2f}")
+        write_output("Nieuwe marktprijs: {:.2f}", market.price)
 
         # Print vraag en aanbod na elke iteratie
-        write_output(f"Vraag naar tokens: {len(market.buy_orders)}")
-        write_output(f"Aanbod van tokens: {len(market.sell_orders)}\n")
+        write_output("Vraag naar tokens: {}", len(market.buy_orders))
+        write_output("Aanbod van tokens: {}\n", len(market.sell_orders))
 
     write_output("Simulatie voltooid.")
 
@@ -378,6 +399,22 @@ for user_id in all_utilities[0].keys():
     for i, utilities in enumerate(all_utilities):
         print(f"{user_id} Run {i+1}: {utilities[user_id]}")
 
+def teken_per_user(ax, reeksen_per_run):
+    # Een (uitgedunde) lijn per user en run zolang dat er weinig zijn; anders per user een waaier over de runs,
+    # of bij veel users een waaier over alle users en runs samen
+    user_ids = list(reeksen_per_run[0].keys())
+    paden = {user_id: np.array([reeksen[user_id] for reeksen in reeksen_per_run]) for user_id in user_ids}
+    if len(user_ids) * len(reeksen_per_run) <= MAX_LIJNEN:
+        for user_id in user_ids:
+            for i, pad in enumerate(paden[user_id]):
+                x, y = dun_uit(np.arange(len(pad)), pad)
+                ax.plot(x, y, label=f'{user_id} Run {i+1}')
+    elif len(user_ids) > MAX_LIJNEN:
+        teken_waaier(ax, np.concatenate([paden[user_id] for user_id in user_ids]), label="Alle users")
+    else:
+        for user_id in user_ids:
+            teken_waaier(ax, paden[user_id], label=user_id)
+
 # Streamlit interface
 st.title("Tokenomics Simulatie voor $HEALTH")
 
@@ -398,9 +435,9 @@ if st.button("Start simulatie"):
         
         # Plot de marktprijzen
         st.subheader("Marktprijs Ontwikkeling over Iteraties")
+        # Een lijn per run bij weinig runs, anders een waaier; altijd uitgedund (grafiek.py)
         fig, ax = plt.subplots()
-        for i, market_prices in enumerate(all_market_prices):
-            ax.plot(market_prices, label=f'Run {i+1}')
+        teken_runs(ax, np.array(all_market_prices))
         ax.set_xlabel('Iteratie (Dag)')
         ax.set_ylabel('Marktprijs')
         ax.set_title('Marktprijs Ontwikkeling over Iteraties')
@@ -410,9 +447,7 @@ if st.button("Start simulatie"):
         # Plot de balans per user
         st.subheader("Balans Ontwikkeling per User over Iteraties")
         fig, ax = plt.subplots()
-        for user_id in all_balances[0].keys():
-            for i, balances in enumerate(all_balances):
-                ax.plot(balances[user_id], label=f'{user_id} Run {i+1}')
+        teken_per_user(ax, all_balances)
         ax.set_xlabel('Iteratie (Dag)')
         ax.set_ylabel('Balans')
         ax.set_title('Balans Ontwikkeling per User over Iteraties')
@@ -422,9 +457,7 @@ if st.button("Start simulatie"):
         # Plot de utility per user
         st.subheader("Utility Ontwikkeling per User over Iteraties")
         fig, ax = plt.subplots()
-        for user_id in all_utilities[0].keys():
-            for i, utilities in enumerate(all_utilities):
-                ax.plot(utilities[user_id], label=f'{user_id} Run {i+1}')
+        teken_per_user(ax, all_utilities)
         ax.set_xlabel('Iteratie (Dag)')
         ax.set_ylabel('Utility')
         ax.set_title('Utility Ontwikkeling per User over Iteraties')
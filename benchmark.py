@@ -0,0 +1,173 @@
+'''
+Schaal benchmark voor het HB model
+
+Draait de simulatie zonder Streamlit voor verschillende aantallen gebruikers, horizons en
+backends, en meet per geval:
+    - de tijd per fase van een iteratie (vrijgave, activiteiten, handel, ...)
+    - de doorvoer in agent-dagen per seconde
+    - het piekgeheugen van het proces
+Elk geval draait in een eigen proces, zodat het piekgeheugen niet door een vorig geval
+wordt beinvloed. De resultaten worden als JSON opgeslagen en kunnen met --vergelijk naast
+een eerdere run (bijvoorbeeld van een oudere versie van het model) gelegd worden.
+
+Gebruik:
+    python benchmark.py                                   # volledige suite (10k/100k/1M, 365/1825 dagen)
+    python benchmark.py --gebruikers 10000 --dagen 365 --backends array kernel
+    python benchmark.py --max-seconden 60 --uitvoer nieuw.json --vergelijk oud.json
+'''
+
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import platform
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from hb_model import Configuratie, Simulation
+from cache import code_versie
+
+try:
+    import resource
+except ImportError: # Niet beschikbaar op Windows
+    resource = None
+
+STANDAARD_GEBRUIKERS = [10000, 100000, 1000000]
+STANDAARD_DAGEN = [365, 1825]
+STANDAARD_BACKENDS = ["array", "kernel", "cohort", "object"]
+
+class FaseTimer:
+    '''
+    Telt de tijd per fase van Simulation.step op. Simulation roept start() aan het begin van
+    een iteratie aan en markeer(fase) aan het eind van elke fase.
+    '''
+    def __init__(self):
+        self.tijden = {}
+        self.vorige = None
+
+    def start(self):
+        self.vorige = time.perf_counter()
+
+    def markeer(self, fase):
+        nu = time.perf_counter()
+        self.tijden[fase] = self.tijden.get(fase, 0.0) + (nu - self.vorige)
+        self.vorige = nu
+
+def piek_geheugen_mb():
+    # Piek van het resident geheugen van dit proces (ru_maxrss is in KB op Linux, in bytes op macOS)
+    if resource is None:
+        return None
+    piek = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return piek / (1024 * 1024) if sys.platform == "darwin" else piek / 1024
+
+def meet_geval(backend, aantal_gebruikers, dagen, seed=0, max_seconden=None):
+    '''
+    Draait een simulatie en geeft de metingen als dictionary terug. Met max_seconden wordt
+    de run na die tijd afgebroken; de doorvoer is dan over de gedraaide dagen berekend.
+    '''
+    config = Configuratie(
+        aantal_gebruikers=aantal_gebruikers,
+        aantal_speculators=aantal_gebruikers // 5, # Zelfde verhouding als de standaard configuratie
+        iterations=dagen,
+        backend=backend
+    )
+
+    begin = time.perf_counter()
+    simulatie = Simulation(config, seed=seed)
+    opzet_tijd = time.perf_counter() - begin
+
+    timer = FaseTimer()
+    simulatie.fase_timer = timer
+    agent_dagen = 0
+    begin = time.perf_counter()
+    for _ in simulatie.iter_steps():
+        # Gebruikers en speculators groeien tijdens de run, dus per dag optellen
+        agent_dagen += len(simulatie.gebruikers) + len(simulatie.specs)
+        if max_seconden is not None and time.perf_counter() - begin > max_seconden:
+            break
+    looptijd = time.perf_counter() - begin
+
+    return {
+        "backend": backend,
+        "gebruikers": aantal_gebruikers,
+        "dagen": dagen,
+        "gedraaide_dagen": simulatie.iteratie,
+        "afgebroken": simulatie.iteratie < dagen,
+        "opzet_seconden": opzet_tijd,
+        "looptijd_seconden": looptijd,
+        "seconden_per_dag": looptijd / max(simulatie.iteratie, 1),
+        "agent_dagen": agent_dagen,
+        "agent_dagen_per_seconde": agent_dagen / looptijd if looptijd > 0 else None,
+        "fasen": timer.tijden,
+        "piek_geheugen_mb": piek_geheugen_mb(),
+        "eind_gebruikers": len(simulatie.gebruikers),
+        "eind_prijs": simulatie.token.get_prijs(),
+    }
+
+def draai_suite(gebruikers, dagen, backends, seed=0, max_seconden=None, rapporteer=print):
+    resultaten = []
+    for backend in backends:
+        for aantal_gebruikers in gebruikers:
+            for aantal_dagen in dagen:
+                # Een vers proces per geval, zodat het piekgeheugen alleen dit geval meet
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    resultaat = pool.submit(meet_geval, backend, aantal_gebruikers, aantal_dagen, seed, max_seconden).result()
+                resultaten.append(resultaat)
+                rapporteer(regel(resultaat))
+    return resultaten
+
+def regel(resultaat):
+    dagen = f"{resultaat['gedraaide_dagen']}/{resultaat['dagen']}"
+    geheugen = resultaat["piek_geheugen_mb"]
+    totaal = sum(resultaat["fasen"].values()) or 1
+    fasen = ", ".join(f"{fase} {tijd / totaal:.0%}" for fase, tijd in sorted(resultaat["fasen"].items(), key=lambda item: -item[1]))
+    return (f"{resultaat['backend']:>6} {resultaat['gebruikers']:>8} gebruikers {dagen:>10} dagen  "
+            f"{resultaat['looptijd_seconden']:8.1f} s  {resultaat['agent_dagen_per_seconde']:12.0f} agent-dagen/s  "
+            f"{geheugen:8.1f} MB" + ("  (afgebroken)" if resultaat["afgebroken"] else "") + f"\n{'':>8}{fasen}")
+
+def sleutel(resultaat):
+    return (resultaat["backend"], resultaat["gebruikers"], resultaat["dagen"])
+
+def vergelijk(oud, nieuw, rapporteer=print):
+    # Verhouding van de doorvoer (nieuw / oud) voor de gevallen die in beide runs voorkomen
+    oude_gevallen = {sleutel(resultaat): resultaat for resultaat in oud["resultaten"]}
+    rapporteer(f"Vergelijking met code versie {oud['code_versie']} ({oud['datum']})")
+    for resultaat in nieuw["resultaten"]:
+        vorige = oude_gevallen.get(sleutel(resultaat))
+        if vorige is None or not vorige["agent_dagen_per_seconde"]:
+            continue
+        verhouding = resultaat["agent_dagen_per_seconde"] / vorige["agent_dagen_per_seconde"]
+        backend, aantal_gebruikers, dagen = sleutel(resultaat)
+        rapporteer(f"{backend:>6} {aantal_gebruikers:>8} gebruikers {dagen:>5} dagen  {verhouding:6.2f}x")
+
+def main(argumenten=None):
+    parser = argparse.ArgumentParser(description="Schaal benchmark voor het HB model")
+    parser.add_argument("--gebruikers", type=int, nargs="+", default=STANDAARD_GEBRUIKERS)
+    parser.add_argument("--dagen", type=int, nargs="+", default=STANDAARD_DAGEN)
+    parser.add_argument("--backends", nargs="+", default=STANDAARD_BACKENDS, choices=STANDAARD_BACKENDS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-seconden", type=float, default=None, help="Breek elk geval na zoveel seconden af")
+    parser.add_argument("--uitvoer", default="benchmark_resultaten.json")
+    parser.add_argument("--vergelijk", default=None, help="JSON van een eerdere run om mee te vergelijken")
+    args = parser.parse_args(argumenten)
+
+    resultaten = draai_suite(args.gebruikers, args.dagen, args.backends, seed=args.seed, max_seconden=args.max_seconden)
+    uitvoer = {
+        "datum": datetime.now().isoformat(timespec="seconds"),
+        "code_versie": code_versie(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "resultaten": resultaten,
+    }
+    with open(args.uitvoer, "w", encoding="utf-8") as f:
+        json.dump(uitvoer, f, indent=2)
+    print(f"Resultaten opgeslagen in {args.uitvoer}")
+
+    if args.vergelijk:
+        with open(args.vergelijk, encoding="utf-8") as f:
+            vergelijk(json.load(f), uitvoer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+'''
+Cache voor simulatie resultaten, met als sleutel een hash van de configuratie en de seed
+
+Twee lagen: een LRU in het geheugen van het proces, en optioneel een map op schijf waarvan
+de totale grootte begrensd is (de minst recent gebruikte bestanden worden eerst verwijderd).
+Zo komen herhaalde en gedeelde scenario's direct terug zonder opnieuw te simuleren.
+'''
+
+import os
+import json
+import pickle
+import hashlib
+import functools
+from collections import OrderedDict
+
+# Bestanden waarvan de inhoud de uitkomst van een simulatie bepaalt
+MODEL_BESTANDEN = ["hb_model.py", "populatie.py", "recorder.py", "vesting.py", "kalender.py", "aggregaten.py", "kernels.py",
+                   "cohorten.py", "gewogen.py"]
+
+@functools.lru_cache(maxsize=None)
+def code_versie():
+    # Hash van de model code, zodat resultaten van een oudere versie van het model niet hergebruikt worden.
+    # Een keer per proces: de code verandert niet terwijl het proces draait, en sweeps en de opslag vragen er heel vaak om.
+    h = hashlib.sha256()
+    map_ = os.path.dirname(os.path.abspath(__file__))
+    for bestand in MODEL_BESTANDEN:
+        with open(os.path.join(map_, bestand), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+def config_hash(config, seed, **extra):
+    '''
+    Canonieke hash van alle invoer van een run: de velden van de configuratie, de seed,
+    eventuele extra invoer (zoals het aantal runs van een ensemble) en de versie van de code
+    '''
+    invoer = {
+        "config": vars(config),
+        "seed": seed,
+        "extra": extra,
+        "code": code_versie(),
+    }
+    # sort_keys en vaste separators maken de JSON onafhankelijk van de volgorde van de velden
+    tekst = json.dumps(invoer, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(tekst.encode("utf-8")).hexdigest()
+
+class ResultaatCache:
+    def __init__(self, max_items=32, map_=None, max_bytes=512 * 1024 * 1024):
+        self.max_items = max_items
+        self.map = map_
+        self.max_bytes = max_bytes
+        self.geheugen = OrderedDict()
+        if self.map is not None:
+            os.makedirs(self.map, exist_ok=True)
+
+    def _pad(self, sleutel):
+        return os.path.join(self.map, f"{sleutel}.pkl")
+
+    def __contains__(self, sleutel):
+        return sleutel in self.geheugen or (self.map is not None and os.path.exists(self._pad(sleutel)))
+
+    def get(self, sleutel, standaard=None):
+        # Eerst in het geheugen kijken
+        if sleutel in self.geheugen:
+            self.geheugen.move_to_end(sleutel)
+            return self.geheugen[sleutel]
+
+        # Daarna op schijf
+        if self.map is not None:
+            pad = self._pad(sleutel)
+            try:
+                with open(pad, "rb") as f:
+                    waarde = pickle.load(f)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                return standaard
+            os.utime(pad) # Markeer als recent gebruikt voor de eviction
+            self._bewaar_in_geheugen(sleutel, waarde)
+            return waarde
+
+        return standaard
+
+    def put(self, sleutel, waarde):
+        self._bewaar_in_geheugen(sleutel, waarde)
+        if self.map is not None:
+            # Eerst naar een tijdelijk bestand schrijven, zodat een half geschreven bestand nooit gelezen wordt
+            pad = self._pad(sleutel)
+            with open(pad + ".tmp", "wb") as f:
+                pickle.dump(waarde, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(pad + ".tmp", pad)
+            self._ruim_schijf_op()
+
+    def haal_op_of_bereken(self, sleutel, bereken):
+        # Geeft (waarde, uit_cache) terug; bereken() wordt alleen aangeroepen als de sleutel niet bekend is
+        waarde = self.get(sleutel)
+        if waarde is not None:
+            return waarde, True
+        waarde = bereken()
+        self.put(sleutel, waarde)
+        return waarde, False
+
+    def _bewaar_in_geheugen(self, sleutel, waarde):
+        self.geheugen[sleutel] = waarde
+        self.geheugen.move_to_end(sleutel)
+        while len(self.geheugen) > self.max_items:
+            self.geheugen.popitem(last=False)
+
+    def _ruim_schijf_op(self):
+        # Verwijder de minst recent gebruikte bestanden tot de map weer onder max_bytes zit
+        bestanden = []
+        for naam in os.listdir(self.map):
+            if naam.endswith(".pkl"):
+                status = os.stat(os.path.join(self.map, naam))
+                bestanden.append((status.st_mtime, status.st_size, naam))
+
+        totaal = sum(grootte for _, grootte, _ in bestanden)
+        for _, grootte, naam in sorted(bestanden):
+            if totaal <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.map, naam))
+            totaal -= grootte
@@ -0,0 +1,225 @@
+'''
+Checkpoints van de volledige toestand van een simulatie
+
+Een checkpoint bevat alles wat nodig is om een run exact verder te draaien: de toestand van
+Token, Exchange, HB, de investeerdersgroepen en systemen, DataPartner, Brand en de activiteiten,
+de populaties van gebruikers en speculators, de beschikbaarheidskalender, de tot nu toe
+opgenomen tijdreeksen en de toestand van alle random generators.
+
+Het bestand is een NumPy .npz archief (niet gecomprimeerd, zodat opslaan en laden snel blijven):
+elke kolom van een populatie, de kalender en de recorder is een eigen array sectie, en alle
+losse getallen staan samen in een kleine "meta" sectie.
+
+Gebruik:
+    simulatie.checkpoints = Checkpoints("checkpoints", cadans=100)  # elke 100 dagen een checkpoint
+    simulatie.run()
+    ...
+    simulatie = laad_checkpoint("checkpoints/dag_00900.npz")       # verder vanaf dag 900
+    simulatie.run()
+'''
+
+import os
+import copy
+import pickle
+import random
+import numpy as np
+from hb_model import Simulation, Gebruiker, Speculator, PopulatieGebruiker, PopulatieSpeculator
+from populatie import GebruikersPopulatie, SpeculatorPopulatie
+from cache import code_versie
+
+FORMAAT_VERSIE = 1
+
+# Attributen die bij het opbouwen van de simulatie uit de configuratie volgen, of verwijzingen naar andere objecten zijn
+NIET_OPSLAAN = {"token", "liquidity", "orderboek", "token_houders", "schema", "vrijgave"}
+
+def _objecten(simulatie):
+    # Alle objecten met losse getallen als toestand, op een vaste naam
+    objecten = {"Token": simulatie.token, "Exchange": simulatie.exchange, "HB": simulatie.hb,
+                "DataPartner": simulatie.DP, "Brand": simulatie.Bra}
+    objecten.update(simulatie.groepen())
+    for index, activiteit in enumerate(simulatie.activiteiten):
+        objecten[f"activiteit/{index}"] = activiteit
+    return objecten
+
+def _getallen(object_):
+    return {naam: waarde for naam, waarde in vars(object_).items()
+            if naam not in NIET_OPSLAAN and isinstance(waarde, (bool, int, float, str))}
+
+def _populatie_kolommen(populatie, klasse):
+    # Kolommen van een populatie; met de object backend worden ze uit de losse agents gelezen
+    if isinstance(populatie, list):
+        return {naam: np.array([getattr(agent, naam) for agent in populatie], dtype=dtype)
+                for naam, dtype in klasse.KOLOMMEN.items()}
+    return {naam: populatie.kolom(naam) for naam in klasse.KOLOMMEN}
+
+def sla_checkpoint_op(simulatie, pad):
+    '''
+    Schrijft de toestand van 'simulatie' (tussen twee iteraties) naar 'pad'
+    '''
+    if len(simulatie.exchange.orderboek):
+        raise ValueError("Een checkpoint kan alleen gemaakt worden als het orderboek leeg is")
+    if simulatie.config.backend == "cohort":
+        raise ValueError("Een checkpoint wordt (nog) niet ondersteund met de cohort backend")
+    if simulatie.gewichten != {"gebruikers": 1.0, "speculators": 1.0}:
+        raise ValueError("Een checkpoint wordt (nog) niet ondersteund met representatieve agents")
+
+    secties = {}
+    for naam, populatie, klasse in [("gebruikers", simulatie.gebruikers, GebruikersPopulatie),
+                                    ("speculators", simulatie.specs, SpeculatorPopulatie)]:
+        for kolom, waarden in _populatie_kolommen(populatie, klasse).items():
+            secties[f"{naam}/{kolom}"] = waarden
+
+    # De kalender als twee platte arrays: per ingeplande gebruiker de dag en de index
+    emmers = simulatie.kalender.emmers
+    secties["kalender/dagen"] = np.array([dag for dag, emmer in emmers.items() for indices in emmer for _ in range(len(indices))], dtype=np.int64)
+    secties["kalender/indices"] = np.concatenate([indices for emmer in emmers.values() for indices in emmer] or [np.empty(0, dtype=np.int64)])
+
+    recorder = simulatie.recorder
+    secties["recorder/iteraties"] = recorder.iteraties
+    for naam, kolom in recorder.kolommen.items():
+        secties[f"recorder/{naam}"] = kolom
+
+    houders = {id(groep): naam for naam, groep in simulatie.groepen().items()}
+    meta = {
+        "formaat": FORMAAT_VERSIE,
+        "code_versie": code_versie(),
+        "config": simulatie.config,
+        "seed": simulatie.seed,
+        "iteratie": simulatie.iteratie,
+        "objecten": {naam: _getallen(object_) for naam, object_ in _objecten(simulatie).items()},
+        "token_houders": {houders[id(bron)]: aantal for bron, aantal in simulatie.exchange.token_houders.items()},
+        "random": random.getstate(),
+        "rng": simulatie.rng.bit_generator.state,
+        "statistiek_rng": simulatie.statistiek_rng.bit_generator.state,
+        "externe_ids": {naam: (ids.rng.getstate(), ids.uuids) for naam, ids in
+                        [("gebruikers", simulatie.gebruiker_ids), ("speculators", simulatie.speculator_ids)]},
+        "recorder": {"aantal": recorder.aantal, "capaciteit": recorder.capaciteit},
+    }
+    secties["meta"] = np.frombuffer(pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+    # Eerst naar een tijdelijk bestand, zodat een onderbroken schrijfactie geen half checkpoint achterlaat
+    tijdelijk = pad + ".tmp"
+    with open(tijdelijk, "wb") as f:
+        np.savez(f, **secties)
+    os.replace(tijdelijk, pad)
+
+def _bouw_populatie(simulatie, naam, kolommen):
+    aantal = len(kolommen["cash"])
+    if simulatie.config.backend == "object":
+        agents = []
+        for i in range(aantal):
+            if naam == "gebruikers":
+                agent = Gebruiker(i, cash=kolommen["cash"][i].item(), data_utility=kolommen["data_utility"][i].item(),
+                                  random_factor=kolommen["random_factor"][i].item())
+                agent.days_until_available = kolommen["days_until_available"][i].item()
+            else:
+                agent = Speculator(i, cash=kolommen["cash"][i].item(), koop_threshold=kolommen["koop_threshold"][i].item(),
+                                   verkoop_threshold=kolommen["verkoop_threshold"][i].item(), random_factor=kolommen["random_factor"][i].item())
+            agent.tokens = kolommen["tokens"][i].item()
+            agents.append(agent)
+        return agents
+
+    if naam == "gebruikers":
+        populatie = GebruikersPopulatie(rij_klasse=PopulatieGebruiker, capaciteit=max(aantal, 1), rng=simulatie.rng)
+    else:
+        populatie = SpeculatorPopulatie(rij_klasse=PopulatieSpeculator, capaciteit=max(aantal, 1), rng=simulatie.rng)
+    rijen = populatie._nieuwe_rijen(aantal)
+    for kolom, waarden in kolommen.items():
+        populatie.kolommen[kolom][rijen] = waarden
+    return populatie
+
+def laad_checkpoint(pad, controleer_versie=True):
+    '''
+    Bouwt een Simulation op uit een checkpoint. De run gaat daarna precies zo verder als de
+    oorspronkelijke run vanaf die iteratie. Met controleer_versie wordt geweigerd een checkpoint
+    van een andere versie van de model code te laden (die zou niet exact verder draaien).
+    '''
+    with np.load(pad, allow_pickle=False) as archief:
+        secties = {naam: archief[naam] for naam in archief.files}
+    meta = pickle.loads(secties.pop("meta").tobytes())
+
+    if meta["formaat"] != FORMAAT_VERSIE:
+        raise ValueError(f"Onbekend checkpoint formaat {meta['formaat']}")
+    if controleer_versie and meta["code_versie"] != code_versie():
+        raise ValueError(f"Checkpoint is gemaakt met code versie {meta['code_versie']}, niet met {code_versie()}")
+
+    # Een lege simulatie met dezelfde configuratie: de populaties worden hieronder uit het checkpoint gevuld
+    config = meta["config"]
+    lege_config = copy.copy(config)
+    lege_config.aantal_gebruiker = 0
+    lege_config.aantal_speculators = 0
+    simulatie = Simulation(lege_config, seed=meta["seed"])
+    simulatie.config = config
+    simulatie.iteratie = meta["iteratie"]
+
+    objecten = _objecten(simulatie)
+    for naam, getallen in meta["objecten"].items():
+        for attribuut, waarde in getallen.items():
+            setattr(objecten[naam], attribuut, waarde)
+    groepen = simulatie.groepen()
+    simulatie.exchange.token_houders = {groepen[naam]: aantal for naam, aantal in meta["token_houders"].items()}
+
+    for naam in ["gebruikers", "speculators"]:
+        begin = naam + "/"
+        kolommen = {sectie[len(begin):]: waarden for sectie, waarden in secties.items() if sectie.startswith(begin)}
+        populatie = _bouw_populatie(simulatie, naam, kolommen)
+        if naam == "gebruikers":
+            simulatie.gebruikers = populatie
+        else:
+            simulatie.specs = populatie
+
+    kalender = simulatie.kalender
+    kalender.emmers = {}
+    dagen, indices = secties["kalender/dagen"], secties["kalender/indices"]
+    for dag in np.unique(dagen).tolist():
+        kalender.plan(dag, indices[dagen == dag])
+
+    recorder = simulatie.recorder
+    recorder.aantal = meta["recorder"]["aantal"]
+    recorder.capaciteit = meta["recorder"]["capaciteit"]
+    recorder.iteraties = secties["recorder/iteraties"]
+    for naam in recorder.kolommen:
+        recorder.kolommen[naam] = secties[f"recorder/{naam}"]
+
+    random.setstate(meta["random"])
+    simulatie.rng.bit_generator.state = meta["rng"]
+    simulatie.statistiek_rng.bit_generator.state = meta["statistiek_rng"]
+    for naam, ids in [("gebruikers", simulatie.gebruiker_ids), ("speculators", simulatie.speculator_ids)]:
+        toestand, uuids = meta["externe_ids"][naam]
+        ids.rng.setstate(toestand)
+        ids.uuids = dict(uuids)
+        ids.ids = {externe_id: agent_id for agent_id, externe_id in uuids.items()}
+    return simulatie
+
+class Checkpoints:
+    '''
+    Schrijft tijdens een run elke 'cadans' iteraties een checkpoint naar 'map_'
+    (dag_00100.npz, dag_00200.npz, ...). Met 'bewaar' blijven alleen de laatste checkpoints staan.
+    Simulation roept na_stap() aan het eind van elke iteratie aan.
+    '''
+    def __init__(self, map_, cadans=100, bewaar=None):
+        self.map = map_
+        self.cadans = max(1, int(cadans))
+        self.bewaar = bewaar
+        os.makedirs(self.map, exist_ok=True)
+
+    def pad(self, iteratie):
+        return os.path.join(self.map, f"dag_{iteratie:05d}.npz")
+
+    def na_stap(self, simulatie):
+        # simulatie.iteratie is het aantal gedraaide dagen: het checkpoint gaat verder vanaf die dag
+        if simulatie.iteratie % self.cadans != 0:
+            return
+        sla_checkpoint_op(simulatie, self.pad(simulatie.iteratie))
+        if self.bewaar is not None:
+            for iteratie in self.iteraties()[:-self.bewaar]:
+                os.remove(self.pad(iteratie))
+
+    def iteraties(self):
+        # Dagen waarvoor een checkpoint bestaat, oplopend
+        return sorted(int(naam[4:-4]) for naam in os.listdir(self.map) if naam.startswith("dag_") and naam.endswith(".npz"))
+
+    def laatste(self):
+        # Pad van het meest recente checkpoint, of None
+        iteraties = self.iteraties()
+        return self.pad(iteraties[-1]) if iteraties else None
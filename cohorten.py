@@ -0,0 +1,265 @@
+'''
+Cohort (mean-field) modus voor zeer grote aantallen gebruikers
+
+Met backend="cohort" worden gebruikers niet meer een voor een bijgehouden. Gebruikers die
+(bijna) hetzelfde zijn zitten samen in een cohort met een massa (het aantal gebruikers) en de
+gemiddelde random_factor, cash en tokens van die gebruikers. Cohorten zijn ingedeeld in bakjes
+over random_factor, cash en tokens (logaritmisch) en de dag waarop ze weer beschikbaar zijn (de
+wachttijd na een activiteit). Per dag worden alleen de cohorten die beschikbaar worden verwerkt:
+
+- de massa wordt verdeeld over de vijf activiteiten,
+- per activiteit doet een cohort mee of niet (de utility van het gemiddelde van het cohort),
+- het deel dat tokens moet bijkopen wordt gesplitst in een deel waarvoor de exchange genoeg
+  tokens heeft en een deel waarvoor niet,
+- deelnemers worden gesplitst in winnaars en verliezers (met de kans van de activiteit),
+- en alles wordt verdeeld over de wachttijden van 7 tot 28 dagen.
+
+Daarna worden cohorten die in hetzelfde bakje vallen samengevoegd (met gewogen gemiddelden,
+zodat de totale cash en het totale aantal tokens behouden blijven). De kosten per dag hangen zo
+af van het aantal bezette bakjes, niet van het aantal gebruikers.
+
+Met cohort_transities="verwachting" worden de massa's volgens de verwachting verdeeld (geen
+willekeur); met "steekproef" blijven massa's gehele getallen en wordt elke verdeling getrokken
+(multinomiaal), zodat er spreiding tussen runs is zoals bij de agents. De inleg van een activiteit
+is het gemiddelde van 5 tot 10 euro. Speculators blijven gewone agents.
+
+valideer() vergelijkt de cohort modus met de agent backend over een aantal seeds:
+    python cohorten.py --gebruikers 20000 --dagen 365 --seeds 5
+'''
+
+import time
+import math
+import argparse
+import numpy as np
+
+RF_BAKJES = 8 # random_factor is uniform tussen 1 en 5
+CASH_PER_DECADE = 10
+TOKENS_PER_DECADE = 5
+GEMIDDELDE_INLEG = 7.5 # Gemiddelde van random.uniform(5, 10)
+
+STANDAARD, BURNING, MINING_ACTIVITEIT, DATAPOOL, HOST = 0, 1, 2, 3, 4 # Volgorde in Simulation.activiteiten
+WACHTTIJDEN = np.array([7, 14, 21, 28])
+WACHTTIJD_KANSEN = np.array([1, 1, 3, 1]) / 6 # Zelfde gewichten als Activiteiten.check_en_update_beschikbaarheid
+
+def _log_bakje(waarden, per_decade):
+    # Bakje op logaritmische schaal, met een eigen kant voor negatieve waarden
+    return (np.sign(waarden) * np.floor(np.log10(1 + np.abs(waarden)) * per_decade)).astype(np.int64)
+
+class CohortPopulatie:
+    def __init__(self, rng, transities="verwachting", max_koop_bedrag=5000, data_utility=75):
+        self.rng = rng
+        self.transities = transities
+        self.max_koop_bedrag = max_koop_bedrag # Zelfde limiet per kooporder als User.max_koop_bedrag
+        self.data_utility = data_utility # Gelijk voor alle gebruikers
+        self.massa = np.empty(0)
+        self.random_factor = np.empty(0)
+        self.cash = np.empty(0)
+        self.tokens = np.empty(0)
+        self.dag = np.empty(0, dtype=np.int64) # Dag waarop het cohort (weer) beschikbaar is
+
+    def __len__(self):
+        return int(round(self.massa.sum()))
+
+    def aantal_cohorten(self):
+        return len(self.massa)
+
+    def _verdeel(self, massa, kansen):
+        '''
+        Verdeelt de massa van elk cohort over len(kansen) delen: volgens de verwachting, of met een
+        multinomiale trekking. 'kansen' is een vector, of een matrix met een rij per cohort.
+        Geeft een array (cohorten, delen).
+        '''
+        kansen = np.broadcast_to(np.asarray(kansen, dtype=float), (len(massa), np.shape(kansen)[-1]))
+        if self.transities == "verwachting":
+            return massa[:, None] * kansen
+        return np.array([self.rng.multinomial(int(aantal), rij) for aantal, rij in zip(massa, kansen)], dtype=float).reshape(kansen.shape)
+
+    def voeg_toe(self, aantal, cash, data_utility, dag=0):
+        # Nieuwe gebruikers zonder tokens, gelijk verdeeld over de bakjes van random_factor
+        midden = 1 + 4 * (np.arange(RF_BAKJES) + 0.5) / RF_BAKJES
+        massa = self._verdeel(np.array([float(aantal)]), np.full(RF_BAKJES, 1 / RF_BAKJES))[0]
+        self.data_utility = data_utility
+        self._voeg_samen(np.concatenate([self.massa, massa]), np.concatenate([self.random_factor, midden]),
+                         np.concatenate([self.cash, np.full(RF_BAKJES, float(cash))]), np.concatenate([self.tokens, np.zeros(RF_BAKJES)]),
+                         np.concatenate([self.dag, np.full(RF_BAKJES, dag, dtype=np.int64)]))
+
+    def _voeg_samen(self, massa, random_factor, cash, tokens, dag):
+        # Cohorten in hetzelfde bakje worden een cohort, met de gewogen gemiddelden
+        levend = massa > 1e-9
+        massa, random_factor, cash, tokens, dag = massa[levend], random_factor[levend], cash[levend], tokens[levend], dag[levend]
+        sleutels = np.stack([np.minimum(((random_factor - 1) / 4 * RF_BAKJES).astype(np.int64), RF_BAKJES - 1),
+                             _log_bakje(cash, CASH_PER_DECADE), _log_bakje(tokens, TOKENS_PER_DECADE), dag], axis=1)
+        uniek, inverse = np.unique(sleutels, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        totaal = np.bincount(inverse, massa)
+        self.massa = totaal
+        self.random_factor = np.bincount(inverse, massa * random_factor) / totaal
+        self.cash = np.bincount(inverse, massa * cash) / totaal
+        self.tokens = np.bincount(inverse, massa * tokens) / totaal
+        self.dag = uniek[:, 3]
+
+    def activiteit_utilities(self, prijs):
+        # Gebruiker.activiteit_utility voor het gemiddelde van elk cohort
+        value = 1 + 3 * self.tokens + 1 * self.cash + (self.tokens * prijs)
+        value = np.where(value <= 0, 1, value)
+        return self.random_factor * np.log(value)
+
+    def gemiddelde_utility(self, prijs):
+        if not len(self.massa):
+            return math.nan
+        return float(np.average(self.activiteit_utilities(prijs), weights=self.massa))
+
+    def _koop(self, simulatie, totaal):
+        '''
+        Een kooporder van 'totaal' tokens van de gebruikers samen, met de regels van Exchange.koop_tokens.
+        Geeft het deel terug dat gevuld kan worden.
+        '''
+        exchange = simulatie.exchange
+        if totaal <= 0:
+            return 1.0
+        if totaal > exchange.beschikbare_tokens and simulatie.liquidity.vrijgegeven_tokens > 0:
+            exchange.voeg_tokens_toe(simulatie.liquidity, simulatie.liquidity.vrijgegeven_tokens, simulatie.token)
+        fractie = 1.0 if totaal <= exchange.beschikbare_tokens else max(exchange.beschikbare_tokens, 0) / totaal
+        exchange.beschikbare_tokens -= totaal * fractie
+        exchange.vraag += totaal * fractie
+        return fractie
+
+    def deelname_activiteiten(self, simulatie, dag):
+        '''
+        De activiteiten van alle cohorten die op 'dag' beschikbaar worden (de cohort versie van de
+        activiteiten lus in Simulation.step)
+        '''
+        wakker = self.dag == dag
+        if not wakker.any():
+            return
+        massa, random_factor, cash, tokens = self.massa[wakker], self.random_factor[wakker], self.cash[wakker], self.tokens[wakker]
+
+        # Elke gebruiker kiest een van de activiteiten
+        activiteiten = simulatie.activiteiten
+        per_activiteit = self._verdeel(massa, np.full(len(activiteiten), 1 / len(activiteiten)))
+        delen = [self._activiteit(simulatie, index, per_activiteit[:, index], random_factor, cash, tokens)
+                 for index in range(len(activiteiten))]
+        massa, random_factor, cash, tokens = (np.concatenate(kolom) for kolom in zip(*delen))
+
+        # Iedereen die aan de beurt was krijgt een nieuwe wachttijd
+        per_wachttijd = self._verdeel(massa, WACHTTIJD_KANSEN)
+        aantal = len(WACHTTIJDEN)
+        rust = ~wakker
+        self._voeg_samen(np.concatenate([self.massa[rust], per_wachttijd.ravel()]),
+                         np.concatenate([self.random_factor[rust], np.repeat(random_factor, aantal)]),
+                         np.concatenate([self.cash[rust], np.repeat(cash, aantal)]),
+                         np.concatenate([self.tokens[rust], np.repeat(tokens, aantal)]),
+                         np.concatenate([self.dag[rust], np.tile(dag + WACHTTIJDEN, len(massa))]))
+
+    def _activiteit(self, simulatie, index, massa, random_factor, cash, tokens):
+        # Geeft de cohorten na de activiteit terug als (massa, random_factor, cash, tokens)
+        token = simulatie.token
+        exchange = simulatie.exchange
+        hb = simulatie.hb
+        activiteit = simulatie.activiteiten[index]
+        prijs = token.get_prijs()
+        drempel = activiteit.bereken_threshold(exchange)
+        utility = random_factor * np.log(np.where(1 + 3 * tokens + cash + tokens * prijs <= 0, 1, 1 + 3 * tokens + cash + tokens * prijs))
+
+        if index in (STANDAARD, BURNING, MINING_ACTIVITEIT):
+            doet_mee = utility > drempel
+            inleg = GEMIDDELDE_INLEG / prijs
+            if index == STANDAARD:
+                hb.tokens += inleg * 0.01 * float(massa[doet_mee].sum()) # Fee voor HB
+
+            # Deelnemers kopen de ontbrekende tokens; een deel van de orders wordt niet gevuld als de exchange te weinig heeft
+            aantal = np.where(doet_mee & (tokens < inleg), inleg - tokens, 0.0)
+            aantal = np.minimum(aantal, self.max_koop_bedrag / prijs)
+            koopt = (aantal > 0) & (cash >= aantal * prijs)
+            fractie = self._koop(simulatie, float((massa * aantal)[koopt].sum()))
+            gevuld = self._verdeel(massa, np.stack([np.where(koopt, fractie, 0.0), np.where(koopt, 1 - fractie, 1.0)], axis=1))
+            massa = gevuld.T.ravel()
+            random_factor, doet_mee = np.tile(random_factor, 2), np.tile(doet_mee, 2)
+            cash = np.concatenate([cash - aantal * prijs, cash])
+            tokens = np.concatenate([tokens + aantal, tokens])
+
+            # Winnaars en verliezers onder de deelnemers
+            kans = activiteit.probability
+            uitkomst = self._verdeel(massa, np.stack([np.where(doet_mee, kans, 0.0), np.where(doet_mee, 1 - kans, 0.0),
+                                                      np.where(doet_mee, 0.0, 1.0)], axis=1))
+            gewonnen, verloren = float(uitkomst[:, 0].sum()), float(uitkomst[:, 1].sum())
+            if index == STANDAARD:
+                winst = tokens + 0.5 * inleg
+                hb.tokens += inleg * 0.9 * verloren # 90% van de inleg gaat naar HB als de deelnemer faalt
+                hb.burn_tokens(token, inleg * 0.1 * verloren)
+            else:
+                winst = tokens - inleg
+                token.burn_tokens(inleg * gewonnen)
+                if index == BURNING:
+                    simulatie.Eco.ontvang_burn_tokens(inleg * verloren)
+                else:
+                    simulatie.Min.ontvang_mining_tokens(inleg * verloren)
+            return (uitkomst.T.ravel(), np.tile(random_factor, 3), np.tile(cash, 3),
+                    np.concatenate([winst, tokens - inleg, tokens]))
+
+        # DataPool en HostActiviteit: winnaars krijgen een beloning van de data partner of de brand
+        if index == DATAPOOL:
+            doet_mee = np.full(len(massa), self.data_utility > drempel)
+            beloning = activiteit.setup_fee / prijs * 0.05
+            partner = simulatie.DP
+        else:
+            doet_mee = utility > 3 * drempel
+            beloning = activiteit.pool_fee / prijs * 0.1
+            partner = simulatie.Bra
+        kans = activiteit.probability
+        uitkomst = self._verdeel(massa, np.stack([np.where(doet_mee, kans, 0.0), np.where(doet_mee, 1 - kans, 1.0)], axis=1))
+        nodig = float(uitkomst[:, 0].sum()) * beloning
+
+        # De partner koopt wat ontbreekt voor alle winnaars samen, voor zover de cash strekt
+        if nodig > partner.tokens:
+            aantal = min(nodig - partner.tokens, partner.cash / prijs)
+            gekocht = aantal * self._koop(simulatie, aantal)
+            partner.tokens += gekocht
+            partner.cash -= gekocht * prijs
+        uitgekeerd = min(1.0, partner.tokens / nodig) if nodig > 0 else 0.0
+        partner.tokens -= nodig * uitgekeerd
+        return (uitkomst.T.ravel(), np.tile(random_factor, 2), np.tile(cash, 2),
+                np.concatenate([tokens + beloning * uitgekeerd, tokens]))
+
+def valideer(aantal_gebruikers=20000, dagen=365, seeds=5, backend="array", transities="verwachting", rapporteer=print):
+    '''
+    Draait dezelfde configuratie met de agent backend en met de cohort modus over 'seeds' seeds en
+    vergelijkt de eindwaarden (gemiddelde en standaardafwijking over de seeds) en de rekentijd per dag
+    '''
+    from hb_model import Configuratie, Simulation
+
+    uitkomsten = {}
+    for modus in (backend, "cohort"):
+        config = Configuratie(aantal_gebruikers=aantal_gebruikers, aantal_speculators=max(1, aantal_gebruikers // 5),
+                              iterations=dagen, backend=modus, cohort_transities=transities)
+        eind, seconden, cohorten = [], 0.0, []
+        for seed in range(seeds):
+            begin = time.perf_counter()
+            simulatie = Simulation(config, seed=seed).run()
+            seconden += time.perf_counter() - begin
+            eind.append(simulatie.resultaat()["eind"])
+            if modus == "cohort":
+                cohorten.append(simulatie.gebruikers.aantal_cohorten())
+        uitkomsten[modus] = {naam: np.array([rij[naam] for rij in eind]) for naam in eind[0]}
+        extra = f", {np.mean(cohorten):.0f} cohorten aan het eind" if cohorten else ""
+        rapporteer(f"{modus:>7}: {1000 * seconden / (seeds * dagen):.2f} ms per dag{extra}")
+
+    for naam in ["prijs", "burned", "hb_tokens", "tokens_op_markt"]:
+        agents, cohort = uitkomsten[backend][naam], uitkomsten["cohort"][naam]
+        verschil = (cohort.mean() - agents.mean()) / agents.mean() if agents.mean() else math.nan
+        rapporteer(f"{naam:>16}: agents {agents.mean():.6g} (sd {agents.std():.3g}), cohort {cohort.mean():.6g} "
+                   f"(sd {cohort.std():.3g}), verschil {verschil:+.1%}")
+    return uitkomsten
+
+def main(argumenten=None):
+    parser = argparse.ArgumentParser(description="Vergelijk de cohort modus met de agent backend")
+    parser.add_argument("--gebruikers", type=int, default=20000)
+    parser.add_argument("--dagen", type=int, default=365)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--backend", default="array", choices=["array", "kernel", "object"])
+    parser.add_argument("--transities", default="verwachting", choices=["verwachting", "steekproef"])
+    args = parser.parse_args(argumenten)
+    valideer(args.gebruikers, args.dagen, args.seeds, args.backend, args.transities)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+'''
+Emulator van het HB model voor directe feedback bij het verschuiven van sliders
+
+Een Gaussian process (GP) regressie, getraind op de runs in de run opslag, voorspelt uit de
+velden van de Configuratie de curves van de marktprijs, de burn en de tokens van HB (op een vast
+raster van dagen) en de eindwaarden. Een voorspelling kost een paar matrix-vector producten en
+duurt dus milliseconden, in plaats van een volledige simulatie.
+
+- Alleen runs die de emulator kan gebruiken tellen mee: zelfde aantal iteraties en zelfde
+  niet-numerieke instellingen (vesting, afwikkeling). Instellingen die alleen de opname of
+  de rekenwijze bepalen (backend, opname_cadans, utilities) maken niet uit, behalve de cohort
+  backend: dat is een benadering, dus die runs worden niet met die van de agents gemengd.
+- Invoer zijn de numerieke velden die tussen de trainingsruns verschillen. Een veld dat in alle
+  trainingsruns gelijk is en in de vraag anders, kan de emulator niet beoordelen: dan is de
+  onzekerheid oneindig.
+- Elke curve wordt ontbonden in hoofdcomponenten (over de trainingsruns); per component score
+  is er een GP met een ARD kernel (een lengteschaal per veld) en een ruisterm, die de verschillen
+  tussen seeds opvangt. De hyperparameters worden gekozen op de marginal likelihood, met een
+  eenvoudige coordinaat zoektocht (er is geen scipy nodig).
+- Per voorspelling komen twee onzekerheden mee: die van de emulator zelf (hoe goed het punt
+  door trainingsruns gedekt is) en de spreiding tussen runs (de ruis). De eerste bepaalt of een
+  volledige simulatie nodig is (onzeker()).
+
+Gebruik:
+    emulator = Emulator.train(RunOpslag(".hb_runs"), config)  # None als er te weinig bruikbare runs zijn
+    voorspelling = emulator.voorspel(config)                  # None als de emulator niets over config kan zeggen
+'''
+
+import json
+import numpy as np
+
+# Curves die de emulator voorspelt; de prijs op log schaal (altijd positief, groeit multiplicatief)
+CURVES = {"marktprijs_over_time": True, "burned": False, "hb_tokens": False}
+RASTER_PUNTEN = 60 # Aantal dagen waarop de curves voorspeld worden
+MIN_RUNS = 8 # Minder trainingsruns geeft geen emulator
+MAX_RUNS = 400 # Alleen de meest recente runs (de rekentijd groeit met het kwadraat)
+
+# Velden die de uitkomst niet (of alleen door andere random getallen) veranderen
+ONAFHANKELIJK = {"backend", "opname_cadans", "utility_opname", "utility_steekproef"}
+# Numerieke velden die geen invoer zijn maar gelijk moeten zijn: een steekproef van gewogen agents is een benadering
+EXACT = {"iterations", "representatieve_gebruikers", "representatieve_speculators"}
+
+def _config_velden(config):
+    # De velden van een configuratie zoals ze in de run opslag staan (zie opslag._config_json)
+    return json.loads(json.dumps(vars(config), default=str))
+
+def _is_getal(waarde):
+    return isinstance(waarde, (int, float)) and not isinstance(waarde, bool)
+
+class _GP:
+    def __init__(self, x, y, lengteschalen, ruis):
+        # x in [0, 1]^k, y gestandaardiseerd (n, 1)
+        self.x = x
+        self.lengteschalen = lengteschalen
+        self.ruis = ruis
+        k = self.kernel(x, x) + (ruis + 1e-8) * np.eye(len(x))
+        self.cholesky = np.linalg.cholesky(k)
+        self.alfa = np.linalg.solve(self.cholesky.T, np.linalg.solve(self.cholesky, y))
+        # Log marginal likelihood
+        self.log_likelihood = float(-0.5 * np.sum(y * self.alfa) - y.shape[1] * np.sum(np.log(np.diag(self.cholesky)))
+                                    - 0.5 * y.size * np.log(2 * np.pi))
+
+    def kernel(self, a, b):
+        verschil = (a[:, None, :] - b[None, :, :]) / self.lengteschalen
+        return np.exp(-0.5 * np.sum(verschil ** 2, axis=2))
+
+    def voorspel(self, x):
+        k = self.kernel(x, self.x)
+        gemiddelde = k @ self.alfa
+        v = np.linalg.solve(self.cholesky, k.T)
+        variantie = np.maximum(1.0 - np.sum(v ** 2, axis=0), 0.0) # Variantie van de (gestandaardiseerde) functie zelf
+        return gemiddelde, variantie
+
+def _kies_gp(x, y, rondes=3):
+    # Coordinaat zoektocht over log lengteschalen en log ruis op de marginal likelihood
+    kandidaten = np.array([0.05, 0.1, 0.2, 0.4, 0.8, 1.6, 3.2])
+    ruis_kandidaten = np.array([1e-4, 1e-3, 1e-2, 0.05, 0.2, 0.5])
+    lengteschalen = np.full(x.shape[1], 0.4)
+    ruis = 0.05
+    beste = _GP(x, y, lengteschalen, ruis)
+    for _ in range(rondes):
+        for veld in range(x.shape[1] + 1):
+            for kandidaat in (ruis_kandidaten if veld == x.shape[1] else kandidaten):
+                schalen = lengteschalen.copy()
+                nieuwe_ruis = ruis
+                if veld == x.shape[1]:
+                    nieuwe_ruis = kandidaat
+                else:
+                    schalen[veld] = kandidaat
+                try:
+                    gp = _GP(x, y, schalen, nieuwe_ruis)
+                except np.linalg.LinAlgError:
+                    continue
+                if gp.log_likelihood > beste.log_likelihood:
+                    beste, lengteschalen, ruis = gp, schalen, nieuwe_ruis
+    return beste
+
+class _Componenten:
+    '''
+    Een curve (n runs, p dagen) als gemiddelde plus de belangrijkste hoofdcomponenten, met een
+    eigen GP per component score. Zo krijgt elke vorm van variatie eigen lengteschalen, en
+    domineren de dagen waarop de runs alleen door toeval verschillen de fit niet.
+    '''
+    def __init__(self, x, y, verklaard=0.999, max_componenten=6):
+        self.gemiddelde = y.mean(axis=0)
+        _, singulier, basis = np.linalg.svd(y - self.gemiddelde, full_matrices=False)
+        variantie = singulier ** 2
+        aandeel = np.cumsum(variantie) / variantie.sum() if variantie.sum() > 0 else np.ones_like(variantie)
+        aantal = min(int(np.searchsorted(aandeel, verklaard)) + 1, max_componenten, len(variantie))
+        self.basis = basis[:aantal]
+        scores = (y - self.gemiddelde) @ self.basis.T
+        self.schaal = np.maximum(scores.std(axis=0), 1e-12)
+        self.gps = [_kies_gp(x, scores[:, [component]] / self.schaal[component]) for component in range(aantal)]
+        # Wat de weggelaten componenten niet verklaren telt als spreiding tussen runs
+        rest = y - self.gemiddelde - scores @ self.basis
+        self.rest_variantie = rest.var(axis=0)
+
+    def voorspel(self, x):
+        # Verwachting, variantie van de emulator en variantie van een enkele run, per dag
+        functie = self.gemiddelde.copy()
+        emulator_variantie = np.zeros_like(functie)
+        run_variantie = self.rest_variantie.copy()
+        for component, gp in enumerate(self.gps):
+            gemiddelde, variantie = gp.voorspel(x)
+            schaal = self.schaal[component]
+            functie += gemiddelde[0, 0] * schaal * self.basis[component]
+            emulator_variantie += variantie[0] * schaal ** 2 * self.basis[component] ** 2
+            run_variantie += (variantie[0] + gp.ruis) * schaal ** 2 * self.basis[component] ** 2
+        return functie, emulator_variantie, run_variantie
+
+class Voorspelling:
+    '''
+    Uitkomst van Emulator.voorspel: per curve de verwachting en de 5% en 95% grenzen van een run
+    (spreiding tussen runs plus onzekerheid van de emulator), en de relatieve onzekerheid van de
+    emulator zelf in de eindprijs
+    '''
+    def __init__(self, iteraties, curves, onder, boven, onzekerheid):
+        self.iteraties = iteraties
+        self.curves = curves
+        self.onder = onder
+        self.boven = boven
+        self.onzekerheid = onzekerheid
+
+    def eind(self, curve):
+        return self.curves[curve][-1]
+
+class Emulator:
+    def __init__(self, referentie, velden, vast, grenzen, componenten, iteraties, aantal_runs):
+        self.referentie = referentie # Velden die voor alle trainingsruns gelijk moeten zijn aan de vraag
+        self.velden = velden # Invoer van de GP's
+        self.vast = vast # Numerieke velden die in de training niet varieerden
+        self.grenzen = grenzen # (laagste, hoogste) per invoerveld, voor de schaling naar [0, 1]
+        self.componenten = componenten # Per curve de hoofdcomponenten met een GP per component
+        self.iteraties = iteraties # Het raster van dagen van de curves
+        self.aantal_runs = aantal_runs
+
+    @staticmethod
+    def referentie_velden(config):
+        # De velden die een run bruikbaar maken voor deze configuratie: alles wat niet numeriek is, plus de velden in EXACT
+        velden = _config_velden(config)
+        return {naam: waarde for naam, waarde in velden.items()
+                if naam not in ONAFHANKELIJK and (naam in EXACT or not _is_getal(waarde))}
+
+    @classmethod
+    def train(cls, opslag, config, raster_punten=RASTER_PUNTEN, max_runs=MAX_RUNS):
+        '''
+        Traint een emulator op de runs in 'opslag' die bruikbaar zijn voor 'config'.
+        Geeft None als er minder dan MIN_RUNS van zijn.
+        '''
+        referentie = cls.referentie_velden(config)
+        runs = opslag.zoek()
+        configs, sleutels = [], []
+        for sleutel, tekst in zip(runs["sleutel"][::-1], runs["config"][::-1]): # Nieuwste eerst
+            velden = json.loads(tekst)
+            cohort = velden.get("backend") == "cohort"
+            if cohort == (config.backend == "cohort") and all(velden.get(naam) == waarde for naam, waarde in referentie.items()):
+                configs.append(velden)
+                sleutels.append(sleutel)
+            if len(sleutels) == max_runs:
+                break
+        if len(sleutels) < MIN_RUNS:
+            return None
+
+        numeriek = [naam for naam, waarde in configs[0].items() if naam not in ONAFHANKELIJK and naam not in EXACT and _is_getal(waarde)]
+        waarden = {naam: np.array([velden[naam] for velden in configs], dtype=float) for naam in numeriek}
+        velden = [naam for naam in numeriek if np.ptp(waarden[naam]) > 0]
+        vast = {naam: float(waarden[naam][0]) for naam in numeriek if naam not in velden}
+        grenzen = {naam: (waarden[naam].min(), waarden[naam].max()) for naam in velden}
+
+        # Uitkomsten: elke curve op een vast raster van dagen (de opname cadans kan per run verschillen)
+        iteraties = np.unique(np.linspace(0, config.iterations - 1, raster_punten).round().astype(np.int64))
+        curves = {curve: [] for curve in CURVES}
+        for sleutel in sleutels:
+            opgenomen = opslag.reeks(sleutel, "iteraties")
+            for curve, log in CURVES.items():
+                waarde = np.interp(iteraties, opgenomen, opslag.reeks(sleutel, curve))
+                curves[curve].append(np.log(np.maximum(waarde, 1e-300)) if log else waarde)
+
+        emulator = cls(referentie, velden, vast, grenzen, {}, iteraties, len(sleutels))
+        x = emulator._invoer([dict(zip(velden, rij)) for rij in zip(*(waarden[naam] for naam in velden))])
+        for curve, y in curves.items():
+            emulator.componenten[curve] = _Componenten(x, np.array(y))
+        return emulator
+
+    def _invoer(self, rijen):
+        x = np.array([[rij[naam] for naam in self.velden] for rij in rijen], dtype=float).reshape(len(rijen), len(self.velden))
+        for kolom, naam in enumerate(self.velden):
+            laag, hoog = self.grenzen[naam]
+            x[:, kolom] = (x[:, kolom] - laag) / (hoog - laag)
+        return x
+
+    def bruikbaar(self, config):
+        # Of de emulator iets over deze configuratie kan zeggen (zelfde referentie, zelfde vaste velden)
+        velden = _config_velden(config)
+        return (self.referentie_velden(config) == self.referentie
+                and all(np.isclose(velden[naam], waarde) for naam, waarde in self.vast.items()))
+
+    def voorspel(self, config):
+        '''
+        Voorspelling voor een configuratie, of None als de emulator er niets over kan zeggen
+        '''
+        if not self.bruikbaar(config):
+            return None
+        x = self._invoer([_config_velden(config)])
+        curves, onder, boven = {}, {}, {}
+        for curve, log in CURVES.items():
+            functie, emulator_variantie, run_variantie = self.componenten[curve].voorspel(x)
+            marge = 1.645 * np.sqrt(run_variantie)
+            midden, laag, hoog = functie, functie - marge, functie + marge
+            if log:
+                midden, laag, hoog = np.exp(midden), np.exp(laag), np.exp(hoog)
+            curves[curve], onder[curve], boven[curve] = midden, laag, hoog
+            if curve == "marktprijs_over_time":
+                emulator_fout = np.sqrt(emulator_variantie)
+
+        # Relatieve onzekerheid van de emulator in de eindprijs (de log prijs: een standaardafwijking is een relatieve fout)
+        onzekerheid = float(emulator_fout[-1])
+        return Voorspelling(self.iteraties, curves, onder, boven, onzekerheid)
+
+    def onzeker(self, voorspelling, drempel=0.15):
+        # Een volledige simulatie is nodig als er geen voorspelling is, of als de emulator te onzeker is
+        return voorspelling is None or voorspelling.onzekerheid > drempel
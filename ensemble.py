@@ -0,0 +1,88 @@
+'''
+Monte Carlo ensemble voor het HB model
+
+Draait N onafhankelijke runs van de Simulation over een process pool. Elke run krijgt een
+eigen seed, afgeleid van een master seed, zodat het hele ensemble reproduceerbaar is en de
+runs statistisch onafhankelijk zijn. De paden van prijs, burn en HB treasury worden
+samengevat in percentiel banden.
+'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from hb_model import Simulation
+
+# Grootheden die per iteratie worden bijgehouden
+GROOTHEDEN = ["prijs", "burned", "hb_tokens"]
+
+def seeds_voor_runs(master_seed, aantal_runs):
+    # Onafhankelijke seeds per run via een NumPy SeedSequence
+    kinderen = np.random.SeedSequence(master_seed).spawn(aantal_runs)
+    return [int(kind.generate_state(1)[0]) for kind in kinderen]
+
+def draai_run(config, seed):
+    '''
+    Draait een enkele simulatie en geeft de paden van prijs, burn en HB tokens terug
+    (de kolommen van de recorder, met de opgenomen iteraties onder "iteraties")
+    '''
+    simulatie = Simulation(config, seed=seed).run()
+    recorder = simulatie.recorder
+    paden = {grootheid: recorder.kolom(grootheid).copy() for grootheid in GROOTHEDEN}
+    paden["iteraties"] = recorder.opgenomen_iteraties().copy()
+    return paden
+
+def _draai_run(argumenten):
+    # Hulpfunctie voor de process pool (map geeft een enkel argument door)
+    return draai_run(*argumenten)
+
+class EnsembleResultaat:
+    def __init__(self, seeds, paden, iteraties):
+        self.seeds = seeds
+        self.paden = paden # grootheid -> array (aantal_runs, opgenomen iteraties)
+        self.iteraties = iteraties # De iteraties waarop de paden zijn opgenomen
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def banden(self, grootheid, percentielen=(5, 25, 50, 75, 95)):
+        # Percentiel banden per iteratie: dictionary percentiel -> array
+        waarden = np.percentile(self.paden[grootheid], percentielen, axis=0)
+        return dict(zip(percentielen, waarden))
+
+    def eindwaarden(self, grootheid):
+        return self.paden[grootheid][:, -1]
+
+def draai_ensemble(config, aantal_runs, master_seed=0, max_workers=None, rapporteer=None, stop=None):
+    '''
+    Draait 'aantal_runs' simulaties met 'config' verdeeld over alle cores.
+    Met max_workers=1 wordt alles in het huidige proces gedraaid. 'rapporteer' wordt na elke
+    afgeronde run aangeroepen met (aantal klaar, aantal_runs). Met een 'stop' (zoals een
+    multiprocessing.Event) die gezet wordt, stopt het ensemble na de lopende runs en geeft None.
+    '''
+    seeds = seeds_voor_runs(master_seed, aantal_runs)
+    argumenten = [(config, seed) for seed in seeds]
+    max_workers = max_workers or os.cpu_count() or 1
+
+    resultaten = []
+    if max_workers == 1:
+        for arg in argumenten:
+            if stop is not None and stop.is_set():
+                return None
+            resultaten.append(_draai_run(arg))
+            if rapporteer is not None:
+                rapporteer(len(resultaten), aantal_runs)
+    else:
+        # Grotere chunks beperken de overhead van het versturen van de configuratie
+        chunksize = max(1, aantal_runs // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for resultaat in pool.map(_draai_run, argumenten, chunksize=chunksize):
+                if stop is not None and stop.is_set():
+                    # Runs die nog niet begonnen zijn worden geschrapt
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return None
+                resultaten.append(resultaat)
+                if rapporteer is not None:
+                    rapporteer(len(resultaten), aantal_runs)
+
+    paden = {grootheid: np.stack([resultaat[grootheid] for resultaat in resultaten]) for grootheid in GROOTHEDEN}
+    return EnsembleResultaat(seeds, paden, resultaten[0]["iteraties"])
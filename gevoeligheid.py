@@ -0,0 +1,213 @@
+'''
+Globale gevoeligheidsanalyse over de velden van de Configuratie
+
+Welke invoer bepaalt de eindprijs en de totale burn echt? In plaats van een volledig raster
+(dat exponentieel groeit met het aantal velden) worden de punten gekozen volgens een ontwerp
+dat met weinig runs zoveel mogelijk zegt:
+
+- Morris (elementary effects): 'trajecten' paden door een raster met 'niveaus' waarden per
+  veld, waarbij elke stap een veld verandert. Kost trajecten * (velden + 1) runs en is bedoeld
+  om snel de onbelangrijke velden eruit te halen. Geeft per veld mu, mu* (gemiddelde absolute
+  effect), sigma (interactie / niet-lineariteit) en een betrouwbaarheidsinterval van mu*.
+- Sobol (Saltelli ontwerp): twee steekproef matrices A en B en per veld een matrix AB_i (A met
+  de kolom van dat veld uit B). Kost basis * (velden + 2) runs. Geeft per veld de eerste orde
+  index S1 (Saltelli 2010) en de totale index ST (Jansen), met betrouwbaarheidsintervallen via
+  bootstrap. A en B zijn Latin hypercube steekproeven, zodat elk veld gelijkmatig gedekt is.
+
+De velden krijgen een bereik (laag, hoog) in de eenheden van Configuratie; gehele grenzen geven
+gehele waarden. De runs gaan via draai_sweep, dus parallel en met hergebruik van runs die al in
+de cache of de run opslag staan (punten van een Morris raster komen vaak meer dan eens voor).
+
+Gebruik:
+    python gevoeligheid.py --methode sobol --bereik elasticiteit=0.2,0.8 tge_psa=50,100 kans_activiteit=0.5,1 \
+        --basis iterations=365 aantal_gebruikers=2000 --aantal 64
+'''
+
+import argparse
+import numpy as np
+import pandas as pd
+from sweep import maak_jobs, draai_sweep, _lees_velden
+from cache import ResultaatCache
+from opslag import RunOpslag
+
+UITKOMSTEN = ["eind_prijs", "eind_burned"]
+
+def _schaal(eenheid, bereiken):
+    # Punten in [0, 1]^k naar instellingen voor Configuratie
+    instellingen = []
+    for punt in eenheid:
+        combinatie = {}
+        for (naam, (laag, hoog)), waarde in zip(bereiken.items(), punt):
+            waarde = laag + waarde * (hoog - laag)
+            combinatie[naam] = int(round(waarde)) if isinstance(laag, int) and isinstance(hoog, int) else float(waarde)
+        instellingen.append(combinatie)
+    return instellingen
+
+def morris_ontwerp(aantal_velden, trajecten=10, niveaus=4, seed=0):
+    '''
+    Punten in [0, 1]^k: per traject een startpunt op het raster en daarna voor elk veld
+    (in willekeurige volgorde) een stap van delta. Geeft een array (trajecten * (k + 1), k).
+    '''
+    rng = np.random.default_rng(seed)
+    delta = niveaus / (2 * (niveaus - 1))
+    # Startwaarden waarvandaan een stap van delta binnen [0, 1] blijft
+    starts = np.arange(niveaus) / (niveaus - 1)
+    starts = starts[starts + delta <= 1 + 1e-12]
+    punten = np.empty((trajecten, aantal_velden + 1, aantal_velden))
+    for traject in range(trajecten):
+        punt = rng.choice(starts, size=aantal_velden)
+        punten[traject, 0] = punt
+        for stap, veld in enumerate(rng.permutation(aantal_velden)):
+            punt = punt.copy()
+            punt[veld] += delta
+            punten[traject, stap + 1] = punt
+    return punten.reshape(-1, aantal_velden)
+
+def _latin_hypercube(aantal, aantal_velden, rng):
+    # Per veld precies een punt in elk van de 'aantal' even grote intervallen
+    strata = np.argsort(rng.random((aantal_velden, aantal)), axis=1).T
+    return (strata + rng.random((aantal, aantal_velden))) / aantal
+
+def saltelli_ontwerp(aantal_velden, basis=64, seed=0):
+    '''
+    Punten in [0, 1]^k in blokken van 'basis' rijen: A, B en daarna AB_i voor elk veld i.
+    Geeft een array (basis * (k + 2), k).
+    '''
+    rng = np.random.default_rng(seed)
+    a = _latin_hypercube(basis, aantal_velden, rng)
+    b = _latin_hypercube(basis, aantal_velden, rng)
+    blokken = [a, b]
+    for veld in range(aantal_velden):
+        ab = a.copy()
+        ab[:, veld] = b[:, veld]
+        blokken.append(ab)
+    return np.concatenate(blokken)
+
+def _bootstrap_interval(schatter, aantal, bootstrap, rng):
+    # Halve breedte van het 95% interval: 1.96 keer de standaardafwijking over bootstrap steekproeven
+    if bootstrap <= 1:
+        return np.nan
+    waarden = [schatter(rng.integers(0, aantal, aantal)) for _ in range(bootstrap)]
+    return 1.96 * float(np.nanstd(waarden, ddof=1))
+
+def morris_analyse(eenheid, uitkomst, namen, bootstrap=1000, seed=0):
+    '''
+    Elementary effects per veld uit een Morris ontwerp en de uitkomst per punt. Effecten zijn
+    per eenheid van het genormaliseerde bereik, zodat de velden onderling te vergelijken zijn.
+    '''
+    aantal_velden = len(namen)
+    eenheid = eenheid.reshape(-1, aantal_velden + 1, aantal_velden)
+    uitkomst = np.asarray(uitkomst, dtype=float).reshape(-1, aantal_velden + 1)
+    effecten = np.empty((len(eenheid), aantal_velden))
+    for traject in range(len(eenheid)):
+        stappen = np.diff(eenheid[traject], axis=0)
+        velden = np.argmax(np.abs(stappen), axis=1)
+        effecten[traject, velden] = np.diff(uitkomst[traject]) / stappen[np.arange(aantal_velden), velden]
+
+    rng = np.random.default_rng(seed)
+    rijen = []
+    for veld, naam in enumerate(namen):
+        effect = effecten[:, veld]
+        rijen.append({"veld": naam, "mu": np.mean(effect), "mu_ster": np.mean(np.abs(effect)),
+                      "sigma": np.std(effect, ddof=1) if len(effect) > 1 else np.nan,
+                      "mu_ster_interval": _bootstrap_interval(lambda steekproef: np.mean(np.abs(effect[steekproef])), len(effect), bootstrap, rng)})
+    return pd.DataFrame(rijen).set_index("veld")
+
+def sobol_analyse(uitkomst, namen, bootstrap=1000, seed=0):
+    '''
+    Eerste orde (S1) en totale (ST) Sobol indices uit de uitkomsten van een Saltelli ontwerp
+    '''
+    aantal_velden = len(namen)
+    blokken = np.asarray(uitkomst, dtype=float).reshape(aantal_velden + 2, -1)
+    f_a, f_b, f_ab = blokken[0], blokken[1], blokken[2:]
+
+    def s1(veld, rijen):
+        variantie = np.var(np.concatenate([f_a[rijen], f_b[rijen]]), ddof=1)
+        return np.mean(f_b[rijen] * (f_ab[veld][rijen] - f_a[rijen])) / variantie if variantie > 0 else np.nan
+
+    def st(veld, rijen):
+        variantie = np.var(np.concatenate([f_a[rijen], f_b[rijen]]), ddof=1)
+        return 0.5 * np.mean((f_a[rijen] - f_ab[veld][rijen]) ** 2) / variantie if variantie > 0 else np.nan
+
+    rng = np.random.default_rng(seed)
+    alle = np.arange(len(f_a))
+    rijen = []
+    for veld, naam in enumerate(namen):
+        rijen.append({"veld": naam,
+                      "S1": s1(veld, alle), "S1_interval": _bootstrap_interval(lambda steekproef: s1(veld, steekproef), len(alle), bootstrap, rng),
+                      "ST": st(veld, alle), "ST_interval": _bootstrap_interval(lambda steekproef: st(veld, steekproef), len(alle), bootstrap, rng)})
+    return pd.DataFrame(rijen).set_index("veld")
+
+def evalueer(instellingen, basis=None, herhalingen=1, master_seed=0, cache=None, opslag=None, max_workers=None, rapporteer=None):
+    '''
+    Draait elk punt (met 'herhalingen' seeds, gelijk voor alle punten) via draai_sweep en geeft
+    per punt het gemiddelde van de samenvatting over de herhalingen terug
+    '''
+    jobs = maak_jobs(instellingen, basis=basis, herhalingen=herhalingen, master_seed=master_seed)
+    tabel = draai_sweep(jobs, cache=cache, opslag=opslag, max_workers=max_workers, rapporteer=rapporteer)
+    tabel["punt"] = tabel["job"] // herhalingen
+    return tabel.groupby("punt")[UITKOMSTEN].mean(), int(tabel["uit_cache"].sum())
+
+def analyseer(bereiken, methode="morris", aantal=10, niveaus=4, basis=None, herhalingen=1, seed=0,
+              bootstrap=1000, cache=None, opslag=None, max_workers=None, rapporteer=None):
+    '''
+    Gevoeligheidsanalyse van UITKOMSTEN voor de velden in 'bereiken' ({veld: (laag, hoog)}).
+    'aantal' is het aantal trajecten (Morris) of het aantal rijen van A en B (Sobol).
+    Geeft {uitkomst: tabel per veld}, de uitkomsten per punt en het aantal runs dat al bewaard was.
+    '''
+    namen = list(bereiken)
+    if methode == "morris":
+        eenheid = morris_ontwerp(len(namen), trajecten=aantal, niveaus=niveaus, seed=seed)
+    elif methode == "sobol":
+        eenheid = saltelli_ontwerp(len(namen), basis=aantal, seed=seed)
+    else:
+        raise ValueError(f"Onbekende methode {methode}, kies morris of sobol")
+
+    instellingen = _schaal(eenheid, bereiken)
+    punten, uit_cache = evalueer(instellingen, basis=basis, herhalingen=herhalingen, master_seed=seed,
+                                 cache=cache, opslag=opslag, max_workers=max_workers, rapporteer=rapporteer)
+    indices = {}
+    for uitkomst in UITKOMSTEN:
+        if methode == "morris":
+            indices[uitkomst] = morris_analyse(eenheid, punten[uitkomst].to_numpy(), namen, bootstrap=bootstrap, seed=seed)
+        else:
+            indices[uitkomst] = sobol_analyse(punten[uitkomst].to_numpy(), namen, bootstrap=bootstrap, seed=seed)
+    punten = pd.concat([pd.DataFrame(instellingen), punten.reset_index(drop=True)], axis=1)
+    return indices, punten, uit_cache
+
+def main(argumenten=None):
+    parser = argparse.ArgumentParser(description="Gevoeligheidsanalyse voor het HB model")
+    parser.add_argument("--methode", choices=["morris", "sobol"], default="morris")
+    parser.add_argument("--bereik", nargs="+", required=True, help="Velden met laag en hoog, bijvoorbeeld elasticiteit=0.2,0.8")
+    parser.add_argument("--basis", nargs="+", default=[], help="Vaste velden voor alle runs, bijvoorbeeld iterations=365")
+    parser.add_argument("--aantal", type=int, default=10, help="Aantal trajecten (morris) of basis steekproeven (sobol)")
+    parser.add_argument("--niveaus", type=int, default=4, help="Aantal niveaus per veld (morris)")
+    parser.add_argument("--herhalingen", type=int, default=1, help="Seeds per punt, het gemiddelde wordt geanalyseerd")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bootstrap", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=".hb_cache", help="Map van de resultaat cache (leeg voor geen cache)")
+    parser.add_argument("--opslag", default=".hb_runs", help="Map van de run opslag (leeg voor geen opslag)")
+    parser.add_argument("--uitvoer", default="gevoeligheid", help="Voorvoegsel van de CSV bestanden")
+    args = parser.parse_args(argumenten)
+
+    bereiken = {naam: tuple(waarden) for naam, waarden in _lees_velden(args.bereik).items()}
+    basis = {naam: waarden[0] for naam, waarden in _lees_velden(args.basis).items()}
+    cache = ResultaatCache(map_=args.cache) if args.cache else None
+    opslag = RunOpslag(args.opslag) if args.opslag else None
+
+    indices, punten, uit_cache = analyseer(
+        bereiken, methode=args.methode, aantal=args.aantal, niveaus=args.niveaus, basis=basis,
+        herhalingen=args.herhalingen, seed=args.seed, bootstrap=args.bootstrap, cache=cache, opslag=opslag,
+        max_workers=args.workers, rapporteer=lambda klaar, totaal: print(f"\r{klaar}/{totaal} runs", end="", flush=True)
+    )
+    print()
+    print(f"{len(punten)} punten x {args.herhalingen} herhalingen ({uit_cache} runs al bewaard)")
+    punten.to_csv(f"{args.uitvoer}_punten.csv", index=False)
+    for uitkomst, tabel in indices.items():
+        print(f"\n{uitkomst}")
+        print(tabel.to_string(float_format=lambda waarde: f"{waarde:.4g}"))
+        tabel.to_csv(f"{args.uitvoer}_{uitkomst}.csv")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+'''
+Gewogen representatieve agents
+
+Een tussenweg tussen alle agents en cohorten: met Configuratie(representatieve_gebruikers=K)
+draait de simulatie met een aselecte steekproef van K gebruikers, waarbij elke gebruiker in
+de steekproef staat voor gewicht = aantal_gebruikers / K gebruikers (en net zo voor speculators
+met representatieve_speculators). Een agent rekent met de eigen cash en tokens, maar alles wat
+die met gedeelde objecten doet telt 'gewicht' keer: orders op de exchange, de fee en inleg voor
+HB, burns, tokens naar Ecosystem en Mining en de beloningen van de data partner en de brand.
+
+Dat gebeurt met een Gewogen view op elk gedeeld object. Een view toont de hoeveelheden van het
+object gedeeld door het gewicht (de exchange lijkt voor een agent uit de steekproef 'gewicht' keer
+zo klein) en schrijft elke verandering vermenigvuldigd met het gewicht terug. De bestaande code
+van de activiteiten en de exchange draait zo ongewijzigd op de views.
+
+Bij de groei wordt bijgehouden hoeveel agents de steekproef vertegenwoordigt; de nieuwe agents
+worden met hetzelfde gewicht aan de steekproef toegevoegd (het aantal wordt stochastisch
+afgerond, zodat ook een kleine steekproef gemiddeld net zo hard groeit).
+
+De schattingen zijn niet zonder meer zuiver: de prijs volgt vraag / aanbod niet lineair, dus de
+extra spreiding van een kleine steekproef (weinig speculators met een groot gewicht) geeft ook
+een verschuiving van het gemiddelde. Met diagnose() is te zien vanaf welke K die verdwijnt. Boven
+een gewicht van MAX_GEWICHT geeft de Simulation een GewichtWaarschuwing.
+
+diagnose() laat zien hoe de spreiding van de schattingen afneemt met de grootte van de steekproef:
+    python gewogen.py --gebruikers 50000 --steekproeven 500 2000 10000 --seeds 8
+'''
+
+import time
+import math
+import types
+import warnings
+import argparse
+import numpy as np
+
+# Grootste gewicht (aantal / K) zonder waarschuwing. Gemeten met 2000 gebruikers en 400 speculators, 120 dagen
+# en 24 seeds (sd van de prijs tussen seeds ongeveer 33%): de gemiddelde prijs verschoof +2% bij gewicht 2, +10%
+# bij gewicht 3 en +28% bij gewicht 4. Met grotere steekproeven is de verschuiving kleiner (20000 gebruikers:
+# binnen 1% bij K = 4000, gewicht 5), maar dat hangt van de configuratie af; controleer dat met diagnose().
+MAX_GEWICHT = 2.0
+
+class GewichtWaarschuwing(UserWarning):
+    '''
+    Het gewicht van de representatieve agents is zo groot dat de schattingen verschoven kunnen zijn
+    '''
+
+def controleer_gewicht(naam, gewicht, steekproef):
+    if gewicht > MAX_GEWICHT:
+        warnings.warn(f"Met {steekproef} representatieve {naam} staat elke agent voor {gewicht:.3g} {naam} (meer dan "
+                      f"{MAX_GEWICHT:g}): de gemiddelde prijs kan verschoven zijn, controleer dit met gewogen.diagnose()",
+                      GewichtWaarschuwing, stacklevel=3)
+
+class Gewogen:
+    '''
+    View op een gedeeld object voor agents die elk 'gewicht' agents vertegenwoordigen.
+    - velden: attributen die gedeeld door het gewicht getoond en maal het gewicht teruggeschreven worden
+    - geschaald: methoden die op het object zelf worden aangeroepen met een hoeveelheid maal het
+      gewicht (naam -> positie van dat argument)
+    - eigen: methoden die met de view als self draaien, zodat ook hun eigen rekenwerk gewogen is
+    Al het andere wordt ongewijzigd doorgegeven.
+    '''
+    def __init__(self, doel, gewicht, velden=(), geschaald=None, eigen=()):
+        object.__setattr__(self, "doel", doel)
+        object.__setattr__(self, "gewicht", gewicht)
+        object.__setattr__(self, "velden", set(velden))
+        object.__setattr__(self, "geschaald", geschaald or {})
+        object.__setattr__(self, "eigen", set(eigen))
+
+    def __getattr__(self, naam):
+        # Wordt alleen aangeroepen als het attribuut niet op de view zelf staat
+        doel = self.doel
+        if naam in self.velden:
+            return getattr(doel, naam) / self.gewicht
+        if naam in self.eigen:
+            return types.MethodType(getattr(type(doel), naam), self)
+        if naam in self.geschaald:
+            positie = self.geschaald[naam]
+            methode = getattr(doel, naam)
+            def gewogen_methode(*argumenten):
+                argumenten = [argument.doel if isinstance(argument, Gewogen) else argument for argument in argumenten]
+                argumenten[positie] = argumenten[positie] * self.gewicht
+                return methode(*argumenten)
+            return gewogen_methode
+        return getattr(doel, naam)
+
+    def __setattr__(self, naam, waarde):
+        if naam in self.velden:
+            waarde = waarde * self.gewicht
+        setattr(self.doel, naam, waarde)
+
+class GewogenWereld:
+    '''
+    De gedeelde objecten van een simulatie zoals agents met een gewicht ze zien. Heeft dezelfde
+    namen als de Simulation (token, exchange, hb, Eco, Min, DP, Bra), zodat de stap van de
+    simulatie zonder gewicht gewoon de Simulation zelf kan gebruiken.
+    '''
+    def __init__(self, simulatie, gewicht):
+        self.gewicht = gewicht
+        self.token = Gewogen(simulatie.token, gewicht, geschaald={"burn_tokens": 0})
+        self.exchange = Gewogen(simulatie.exchange, gewicht, velden=["beschikbare_tokens", "vraag", "aanbod"],
+                                eigen=["koop_tokens", "verkoop_tokens", "handel_bulk"])
+        self.hb = Gewogen(simulatie.hb, gewicht, velden=["tokens"], geschaald={"burn_tokens": 1})
+        self.Eco = Gewogen(simulatie.Eco, gewicht, geschaald={"ontvang_burn_tokens": 0})
+        self.Min = Gewogen(simulatie.Min, gewicht, geschaald={"ontvang_mining_tokens": 0})
+        self.DP = Gewogen(simulatie.DP, gewicht, velden=["tokens", "cash"], eigen=["koop_tokens"])
+        self.Bra = Gewogen(simulatie.Bra, gewicht, velden=["tokens", "cash"], eigen=["koop_tokens"])
+
+def groei_steekproef(vertegenwoordigd, nieuw_aantal, gewicht, rng):
+    # Aantal nieuwe agents in de steekproef als de vertegenwoordigde populatie naar 'nieuw_aantal' groeit
+    verwacht = (nieuw_aantal - vertegenwoordigd) / gewicht
+    return int(math.floor(verwacht) + (rng.random() < verwacht - math.floor(verwacht)))
+
+def diagnose(aantal_gebruikers=50000, steekproeven=(500, 2000, 10000), dagen=365, seeds=8, volledig=True, rapporteer=print):
+    '''
+    Draait dezelfde configuratie met steekproeven van verschillende grootte (K gebruikers en
+    K / 5 speculators, net als de verhouding in de configuratie) over 'seeds' seeds, en met
+    volledig=True ook met alle agents als referentie. Per K en per eindwaarde: het gemiddelde en
+    de standaardafwijking over de seeds. Met de referentie ook het verschil in het gemiddelde en
+    de extra spreiding door de steekproef (de variantie boven die van het model met alle agents);
+    die extra standaardafwijking maal wortel K is ongeveer constant als de variantie met 1/K afneemt.
+    '''
+    from hb_model import Configuratie, Simulation
+
+    config = Configuratie(aantal_gebruikers=aantal_gebruikers, aantal_speculators=aantal_gebruikers // 5, iterations=dagen, backend="array")
+    varianten = [(k, config.met(representatieve_gebruikers=k, representatieve_speculators=max(1, k // 5))) for k in sorted(steekproeven)]
+    if volledig:
+        varianten.append((aantal_gebruikers, config))
+
+    uitkomsten = {}
+    for k, variant in varianten:
+        eind, seconden = [], 0.0
+        for seed in range(seeds):
+            begin = time.perf_counter()
+            with warnings.catch_warnings():
+                # De verschuiving bij grote gewichten is juist wat hier gemeten wordt
+                warnings.simplefilter("ignore", GewichtWaarschuwing)
+                eind.append(Simulation(variant, seed=seed).run().resultaat()["eind"])
+            seconden += time.perf_counter() - begin
+        uitkomsten[k] = {naam: np.array([rij[naam] for rij in eind]) for naam in ["prijs", "burned", "hb_tokens"]}
+        rapporteer(f"K = {k:>8}{' (alle agents)' if variant is config else ''}: {1000 * seconden / (seeds * dagen):.2f} ms per dag")
+
+    for naam in ["prijs", "burned", "hb_tokens"]:
+        rapporteer(f"{naam}:")
+        referentie = uitkomsten[aantal_gebruikers][naam] if volledig else None
+        for k, _ in varianten:
+            waarden = uitkomsten[k][naam]
+            regel = f"  K = {k:>8}: gemiddelde {waarden.mean():.6g}, sd {waarden.std(ddof=1):.3g}"
+            if referentie is not None and k != aantal_gebruikers:
+                # De spreiding door de steekproef: de variantie boven die van het model met alle agents
+                extra = math.sqrt(max(waarden.var(ddof=1) - referentie.var(ddof=1), 0))
+                regel += (f", verschil met alle agents {(waarden.mean() - referentie.mean()) / referentie.mean():+.1%}, "
+                          f"extra sd {extra:.3g}, extra sd * wortel(K) {extra * math.sqrt(k):.3g}")
+            else:
+                regel += f", sd * wortel(K) {waarden.std(ddof=1) * math.sqrt(k):.3g}"
+            rapporteer(regel)
+    return uitkomsten
+
+def main(argumenten=None):
+    parser = argparse.ArgumentParser(description="Spreiding van de schattingen met gewogen representatieve agents")
+    parser.add_argument("--gebruikers", type=int, default=50000)
+    parser.add_argument("--steekproeven", type=int, nargs="+", default=[500, 2000, 10000])
+    parser.add_argument("--dagen", type=int, default=365)
+    parser.add_argument("--seeds", type=int, default=8)
+    parser.add_argument("--zonder-volledig", action="store_true", help="Sla de referentie met alle agents over")
+    args = parser.parse_args(argumenten)
+    diagnose(args.gebruikers, args.steekproeven, args.dagen, args.seeds, volledig=not args.zonder_volledig)
+
+if __name__ == "__main__":
+    main()
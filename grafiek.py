@@ -0,0 +1,134 @@
+'''
+Uitdunnen van tijdreeksen voor grafieken
+
+Een grafiek hoeft niet elk punt te krijgen: een scherm is maar een paar duizend pixels breed.
+Bij lange horizonnen (1825 dagen), veel klassen of veel Monte Carlo runs maakt elk punt de
+payload naar de browser (st.line_chart) of het tekenen (matplotlib) alleen maar trager. Alles
+hier werkt alleen op wat getoond wordt; de resultaten zelf blijven volledig.
+
+- lttb: Largest-Triangle-Three-Buckets, kiest per emmer het punt dat de vorm van de lijn het
+  best bewaart (een punt per emmer).
+- minmax: per emmer het laagste en het hoogste punt, zodat pieken nooit wegvallen.
+- dun_uit / dun_tabel_uit: een reeks of een tabel met meerdere kolommen (een gedeelde index)
+  begrensd op max_punten.
+- waaier: een ensemble van runs als percentiel banden (fan chart), per emmer van iteraties
+  over alle runs samen berekend, zodat de grootte niet van het aantal runs of dagen afhangt.
+'''
+
+import numpy as np
+import pandas as pd
+
+MAX_PUNTEN = 1000 # Maximaal aantal punten per lijn in een grafiek
+MAX_LIJNEN = 10 # Met meer runs wordt een ensemble als waaier getekend in plaats van een lijn per run
+
+def _emmers(aantal, emmers):
+    # Grenzen van 'emmers' (ongeveer) even grote emmers over 'aantal' punten
+    return np.linspace(0, aantal, emmers + 1).astype(np.int64)
+
+def lttb(x, y, max_punten=MAX_PUNTEN):
+    '''
+    Indices van de punten die LTTB kiest. Het eerste en het laatste punt blijven altijd staan.
+    '''
+    aantal = len(y)
+    if aantal <= max_punten or max_punten < 3:
+        return np.arange(aantal)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # De punten tussen het eerste en het laatste worden over max_punten - 2 emmers verdeeld
+    grenzen = 1 + _emmers(aantal - 2, max_punten - 2)
+    indices = np.empty(max_punten, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = aantal - 1
+    vorige = 0
+    for emmer in range(max_punten - 2):
+        begin, eind = grenzen[emmer], grenzen[emmer + 1]
+        # Het derde punt van de driehoek: het gemiddelde van de volgende emmer (of het laatste punt)
+        if emmer + 2 < len(grenzen):
+            volgende_x = x[eind:grenzen[emmer + 2]].mean()
+            volgende_y = y[eind:grenzen[emmer + 2]].mean()
+        else:
+            volgende_x, volgende_y = x[-1], y[-1]
+        oppervlak = np.abs((x[vorige] - volgende_x) * (y[begin:eind] - y[vorige])
+                           - (x[vorige] - x[begin:eind]) * (volgende_y - y[vorige]))
+        vorige = begin + int(np.nanargmax(oppervlak)) if not np.isnan(oppervlak).all() else begin
+        indices[emmer + 1] = vorige
+    return indices
+
+def minmax(y, max_punten=MAX_PUNTEN):
+    # Indices van het laagste en hoogste punt per emmer ((max_punten - 2) / 2 emmers, plus het eerste en laatste punt), op volgorde
+    aantal = len(y)
+    if aantal <= max_punten or max_punten < 4:
+        return np.arange(aantal)
+    y = np.asarray(y, dtype=float)
+    grenzen = _emmers(aantal, (max_punten - 2) // 2)
+    laagste = np.empty(len(grenzen) - 1, dtype=np.int64)
+    hoogste = np.empty(len(grenzen) - 1, dtype=np.int64)
+    for emmer in range(len(grenzen) - 1):
+        deel = y[grenzen[emmer]:grenzen[emmer + 1]]
+        laagste[emmer] = grenzen[emmer] + np.nanargmin(deel) if not np.isnan(deel).all() else grenzen[emmer]
+        hoogste[emmer] = grenzen[emmer] + np.nanargmax(deel) if not np.isnan(deel).all() else grenzen[emmer]
+    return np.unique(np.concatenate([laagste, hoogste, [0, aantal - 1]]))
+
+def dun_uit(x, y, max_punten=MAX_PUNTEN, methode="lttb"):
+    # Een uitgedunde reeks als (x, y)
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = lttb(x, y, max_punten) if methode == "lttb" else minmax(y, max_punten)
+    return x[indices], y[indices]
+
+def dun_tabel_uit(waarden, index=None, max_punten=MAX_PUNTEN):
+    '''
+    Een DataFrame voor st.line_chart met hoogstens max_punten rijen. 'waarden' is een Series,
+    DataFrame, dictionary van kolommen of een enkele array. Alle kolommen houden dezelfde index:
+    de rijen zijn de vereniging van de minmax punten van elke kolom, zodat geen kolom een piek verliest.
+    '''
+    if isinstance(waarden, (pd.Series, pd.DataFrame)):
+        tabel = waarden.to_frame() if isinstance(waarden, pd.Series) else waarden
+    else:
+        tabel = pd.DataFrame(waarden if isinstance(waarden, dict) else {"waarde": waarden}, index=index)
+    if len(tabel) <= max_punten:
+        return tabel
+
+    per_kolom = max(4, max_punten // max(1, len(tabel.columns)))
+    indices = np.unique(np.concatenate([minmax(tabel[kolom].to_numpy(dtype=float), per_kolom) for kolom in tabel.columns]))
+    return tabel.iloc[indices]
+
+def waaier(paden, x=None, percentielen=(5, 25, 50, 75, 95), max_punten=MAX_PUNTEN):
+    '''
+    Fan chart van een ensemble: 'paden' is een array (aantal_runs, aantal_iteraties). De
+    iteraties worden in hoogstens max_punten emmers verdeeld; per emmer worden de percentielen
+    over alle waarden van alle runs in die emmer berekend. Geeft (x per emmer, {percentiel: array}).
+    '''
+    paden = np.asarray(paden, dtype=float)
+    aantal = paden.shape[1]
+    x = np.arange(aantal) if x is None else np.asarray(x)
+    if aantal <= max_punten:
+        banden = np.percentile(paden, percentielen, axis=0)
+        return x, dict(zip(percentielen, banden))
+
+    grenzen = _emmers(aantal, max_punten)
+    banden = np.empty((len(percentielen), max_punten))
+    for emmer in range(max_punten):
+        banden[:, emmer] = np.percentile(paden[:, grenzen[emmer]:grenzen[emmer + 1]], percentielen)
+    # Elke emmer staat op de plaats van zijn middelste iteratie
+    midden = x[(grenzen[:-1] + grenzen[1:] - 1) // 2]
+    return midden, dict(zip(percentielen, banden))
+
+def teken_waaier(ax, paden, x=None, label=None, max_punten=MAX_PUNTEN):
+    # Tekent de 5-95% en 25-75% banden en de mediaan van een ensemble op 'ax'
+    x, banden = waaier(paden, x, max_punten=max_punten)
+    lijn, = ax.plot(x, banden[50], label=f"{label} (mediaan)" if label else "Mediaan")
+    ax.fill_between(x, banden[5], banden[95], alpha=0.2, color=lijn.get_color(), label=None if label else "5% - 95%")
+    ax.fill_between(x, banden[25], banden[75], alpha=0.4, color=lijn.get_color(), label=None if label else "25% - 75%")
+    return lijn
+
+def teken_runs(ax, paden, max_punten=MAX_PUNTEN, max_lijnen=MAX_LIJNEN):
+    '''
+    Tekent een ensemble op 'ax': een uitgedunde lijn per run als het er weinig zijn, anders een waaier
+    '''
+    if len(paden) > max_lijnen:
+        return teken_waaier(ax, paden, max_punten=max_punten)
+    for nummer, pad in enumerate(paden):
+        x, y = dun_uit(np.arange(len(pad)), pad, max_punten)
+        ax.plot(x, y, label=f"Run {nummer + 1}")
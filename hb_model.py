@@ -0,0 +1,1410 @@
+'''
+HB Token simulation model
+
+Assumptions:
+    - Zie configuratie klasse
+
+Dit bestand bevat het model zelf, zonder user interface. De Streamlit app (HB_Simulation_model.py)
+en de versie zonder streamlit gebruiken allebei de Simulation klasse uit dit bestand.
+'''
+
+import copy
+import uuid
+import math
+import random
+from collections import namedtuple
+import numpy as np
+from populatie import PopulatieRij, GebruikersPopulatie, SpeculatorPopulatie
+from tracing import trace, DEBUG, INFO, WAARSCHUWING
+from recorder import Recorder
+from vesting import VestingSchema
+from kalender import BeschikbaarheidsKalender
+from cohorten import CohortPopulatie
+from gewogen import GewogenWereld, groei_steekproef, controleer_gewicht
+from aggregaten import schat_gemiddelde
+import kernels
+
+# Configuratie klasse
+class Configuratie:
+    def __init__(self, initial_token_price=0.0001, total_supply=50000000000, initial_cash_user=1000,
+                 initial_cash_speculator=3000, initial_cash_datapartner=100000, initial_cash_brands=100000,
+                 setup_fee=20, pool_fee=20, aantal_gebruikers=10000, groeiratio_gebruiker=1,
+                 aantal_speculators=2000, groeiratio_speculators=1, ratio_op_de_markt_investeerders=0,
+                 ratio_op_de_markt_systemen=0.5, kans_activiteit=0.9, iterations=365, tge_psa=80,
+                 elasticiteit=0.5, backend="object", opname_cadans=1, vesting=None, afwikkeling="direct",
+                 utility_opname="volledig", utility_steekproef=2000, cohort_transities="verwachting",
+                 representatieve_gebruikers=None, representatieve_speculators=None):
+        self.initial_token_price = initial_token_price
+        self.total_supply = total_supply
+        self.initial_cash_user = initial_cash_user
+        self.initial_cash_speculator = initial_cash_speculator
+        self.initial_cash_datapartner = initial_cash_datapartner
+        self.initial_cash_brands = initial_cash_brands
+        self.setup_fee = setup_fee # in euro's
+        self.pool_fee = pool_fee # in euro's
+        self.aantal_gebruiker = aantal_gebruikers
+        self.aantal_speculators = aantal_speculators
+        self.iterations = iterations
+        self.groeiratio_gebruiker = groeiratio_gebruiker / 100  # Omdat de input is in percentages
+        self.groeiratio_speculators = groeiratio_speculators / 100  # Omdat de input is in percentages
+        self.ratio_op_de_markt_investeerders = ratio_op_de_markt_investeerders / 100
+        self.ratio_op_de_markt_systemen = ratio_op_de_markt_systemen / 100
+        self.kans_activiteit = kans_activiteit
+        self.tge_psa = tge_psa
+        self.elasticiteit = elasticiteit
+        self.backend = backend # "array" (kolommen in NumPy), "kernel" (kolommen, met de lussen in kernels.py), "cohort" (gebruikers als cohorten, zie cohorten.py) of "object" (een object per gebruiker en speculator)
+        self.opname_cadans = opname_cadans # Tijdreeksen worden elke 'opname_cadans' iteraties opgenomen
+        self.vesting = vesting or {} # Eigen VestingSchema per groep (naam zoals in Simulation.groepen()), anders de standaard
+        self.afwikkeling = afwikkeling # "direct" (elke order direct op de exchange) of "batch" (speculators via het orderboek, een afwikkeling per dag)
+        self.utility_opname = utility_opname # Gemiddelde utilities: "volledig" (exact), "steekproef" (schatting met foutmarge) of "uit"
+        self.utility_steekproef = utility_steekproef # Aantal agents per steekproef
+        self.cohort_transities = cohort_transities # Met backend="cohort": "verwachting" (verwachte massa's) of "steekproef" (getrokken aantallen)
+        self.representatieve_gebruikers = representatieve_gebruikers # Steekproef van gewogen gebruikers in plaats van allemaal (None: alle gebruikers, zie gewogen.py)
+        self.representatieve_speculators = representatieve_speculators # Idem voor speculators
+
+    def met(self, **wijzigingen):
+        '''
+        Kopie van de configuratie met andere waarden voor de opgegeven argumenten van __init__,
+        in dezelfde eenheden (percentages worden op dezelfde manier omgerekend)
+        '''
+        nieuw = copy.copy(self)
+        for naam, waarde in wijzigingen.items():
+            if naam == "aantal_gebruikers":
+                naam = "aantal_gebruiker"
+            elif naam in ("groeiratio_gebruiker", "groeiratio_speculators", "ratio_op_de_markt_investeerders", "ratio_op_de_markt_systemen"):
+                waarde = waarde / 100
+            elif naam == "vesting":
+                waarde = waarde or {}
+            if not hasattr(nieuw, naam):
+                raise TypeError(f"Configuratie heeft geen argument {naam}")
+            setattr(nieuw, naam, waarde)
+        return nieuw
+
+class Token:
+    '''
+    De token klasse die alle eigenschappen van de tokens bijhoudt
+    '''
+    # Attributen
+    def __init__(self, token_supply, initial_token_price, elasticiteit):
+        self.__totale_supply = token_supply
+        self.__circulerende_supply = 0
+        self.__prijs = initial_token_price
+        self.__elasticiteit = elasticiteit
+        
+    # Methodes    
+    def maandelijkse_supply_vrijgeven(self, hoeveelheid):
+        self.__circulerende_supply += hoeveelheid
+
+    def burn_tokens(self, hoeveelheid):
+        self.__circulerende_supply -= hoeveelheid
+        
+    def bereken_prijs(self, vraag, aanbod):
+        if aanbod > 0:
+            if vraag >= aanbod:
+                nieuwe_prijs_factor = 1 + (self.__elasticiteit*(vraag/aanbod)) 
+                self.__prijs *= nieuwe_prijs_factor
+            elif aanbod > vraag:
+                nieuwe_prijs_factor = 1 - (self.__elasticiteit*(vraag/aanbod)) 
+                self.__prijs *= nieuwe_prijs_factor               
+        else:
+            # Als er geen aanbod is, blijft de prijs hetzelfde om deling door nul te voorkomen
+            pass
+            
+    def update_prijs(self, vraag, aanbod):
+        self.bereken_prijs(vraag, aanbod)
+        
+    def get_prijs(self):
+        return self.__prijs
+
+    def set_elasticiteit(self, elasticiteit):
+        self.__elasticiteit = elasticiteit
+    
+    def get_totale_supply(self):
+        return self.__totale_supply
+    
+    def get_circulerende_tokens(self):
+        return self.__circulerende_supply
+    
+class ExterneIds:
+    '''
+    Optionele koppeling van de interne (gehele) agent ids aan UUIDs, voor als een agent buiten het model
+    uniek herkenbaar moet zijn. Een UUID wordt pas gemaakt als erom gevraagd wordt, met een eigen
+    random generator, zodat de koppeling reproduceerbaar is en de simulatie niet beinvloedt.
+    '''
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.uuids = {}
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def uuid(self, agent_id):
+        if agent_id not in self.uuids:
+            externe_id = uuid.UUID(int=self.rng.getrandbits(128), version=4)
+            self.uuids[agent_id] = externe_id
+            self.ids[externe_id] = agent_id
+        return self.uuids[agent_id]
+
+    def agent_id(self, externe_id):
+        return self.ids[externe_id]
+
+class User:
+    # Vaste attributen in plaats van een __dict__ per agent
+    __slots__ = ("id", "cash", "tokens")
+    max_koop_bedrag = 5000
+
+    def __init__(self, id, cash):
+        self.id = id # Geheel getal: de positie van de agent in de populatie
+        self.cash = cash
+        self.tokens = 0 # Elke user begint met 0 tokens
+        
+    def koop_tokens(self, exchange, aantal_tokens, liquidity=None):
+        # Liquidity wordt standaard toegewezen als deze niet is opgegeven
+        if liquidity is None:
+            liquidity = exchange.liquidity  # Verwijst naar een liquidity-klasse die je aan de exchange koppelt
+        
+        totale_kosten = aantal_tokens * exchange.token.get_prijs()
+        
+        if totale_kosten > self.max_koop_bedrag:
+            aantal_tokens = self.max_koop_bedrag / exchange.token.get_prijs()
+        
+        # De User koopt tokens via de Exchange
+        exchange.koop_tokens(self, aantal_tokens, liquidity)
+        
+    def verkoop_tokens(self, exchange, aantal_tokens):
+        # De User verkoopt tokens via de Exchange
+        exchange.verkoop_tokens(self, aantal_tokens)  
+        
+    # elke user heeft zijn eigen utility functies als optie
+
+class Gebruiker(User):
+    __slots__ = ("data_utility", "random_factor", "days_until_available")
+
+    def __init__(self, id, cash, data_utility, random_factor = None):
+        super().__init__(id, cash)
+        self.data_utility = data_utility
+        self.random_factor = random_factor if random_factor is not None else random.uniform(1, 5)
+        self.days_until_available = 0
+        
+    def activiteit_utility(self, token):    
+        value = 1 + 3 * self.tokens + 1 * self.cash + (self.tokens * token.get_prijs())  # Prijs heeft een lichte invloed
+            
+        # Controleer op negatieve waarde (log mag niet negatief zijn)
+        if value <= 0:
+           value = 1
+         
+        return self.random_factor * math.log(value) # we gaan er vanuit dat tokens een grotere invloed hebben op het meedoen van activiteiten
+
+class PopulatieGebruiker(PopulatieRij, Gebruiker):
+    '''
+    Gebruiker waarvan de toestand in een rij van een GebruikersPopulatie staat, zodat de activiteiten
+    ook met de array backend met een enkele gebruiker kunnen werken
+    '''
+
+class Speculator(User):
+    __slots__ = ("koop_threshold", "verkoop_threshold", "random_factor")
+
+    def __init__(self, id, cash, koop_threshold=None, verkoop_threshold=None, random_factor=None):
+        super().__init__(id, cash)
+        self.koop_threshold = koop_threshold if koop_threshold is not None else random.normalvariate(5, 1)
+        self.verkoop_threshold = verkoop_threshold if verkoop_threshold is not None else random.normalvariate(5, 1)
+        self.random_factor = random_factor if random_factor is not None else random.uniform(1, 5)
+
+    def koop_utility(self, token, tokens=None, cash=None, prijs=None):
+        if tokens is None:
+            tokens = self.tokens
+        if cash is None:
+            cash = self.cash
+        if prijs is None:
+            prijs = tokens * token.get_prijs()
+        
+        value = 1 + 1 * tokens + 2 * cash + prijs 
+            
+        # Controleer op negatieve waarde (log mag niet negatief zijn)
+        if value <= 0:
+            value = 1
+
+        return self.random_factor * math.log(value)  
+    
+    def verkoop_utility(self, token, tokens=None, cash=None, prijs=None):
+        if tokens is None:
+            tokens = self.tokens
+        if cash is None:
+            cash = self.cash
+        if prijs is None:
+            prijs = tokens * token.get_prijs()
+            
+        value = 1 + 2 * tokens + 1 * cash + prijs 
+            
+        # Controleer op negatieve waarde (log mag niet negatief zijn)
+        if value <= 0:
+            value = 1
+        
+        return self.random_factor * math.log(value)  
+    
+    def bepaal_aantal_tokens_om_te_handelen(self, token):
+        koop_utility = self.koop_utility(token)
+        verkoop_utility = self.verkoop_utility(token)
+
+        # Bepaal een willekeurige factor tussen 0 en 0.05
+        random_factor = random.uniform(0, 0.05)
+
+        max_cash = 5000  # Maximale hoeveelheid cash om te handelen
+        token_prijs = token.get_prijs()
+        
+        if token_prijs == 0 or random_factor == 0:
+            return 0  # Vermijd deling door nul
+
+        if koop_utility > verkoop_utility:
+            # Bepaal het aantal tokens om te kopen met maximaal 5% van de cash
+            max_cash = self.cash * random_factor
+            max_tokens = int(max_cash / token_prijs)
+            return min(max_tokens, int(self.cash / token_prijs))
+        elif koop_utility < verkoop_utility:
+            # Bepaal het aantal tokens om te verkopen met maximaal 5% van de tokens
+            max_tokens = int(self.tokens * random_factor)
+            return min(max_tokens, int(self.tokens))
+        else:
+            return 0
+
+class PopulatieSpeculator(PopulatieRij, Speculator):
+    '''
+    Speculator waarvan de toestand in een rij van een SpeculatorPopulatie staat
+    '''
+
+class InvestorGroup:
+    def __init__(self, totale_supply, allocatie_percentage, tge_percentage, vesting_maanden, verkoop_threshold = None, schema = None):
+        self.totale_allocatie = totale_supply * (allocatie_percentage / 100)
+        self.vrijgegeven_tokens = 0
+        self.beschikbare_vrijgegeven_tokens = 0        
+        self.cash = 0
+        self.tokens_op_markt = 0
+        self.resterende_tokens = self.totale_allocatie
+        self.verkoop_threshold = verkoop_threshold if verkoop_threshold is not None else random.normalvariate(5,1)
+        # De volledige vrijgave wordt vooraf uitgerekend (standaard TGE + lineaire vesting per maand)
+        self.schema = schema if schema is not None else VestingSchema.standaard(tge_percentage, vesting_maanden)
+        self.vrijgave = self.schema.vrijgave_per_iteratie(self.totale_allocatie)
+
+    def vrijgave_tokens(self, iteratie):
+        # Na de laatste vrijgave van het schema komt er niets meer vrij
+        tokens = float(self.vrijgave[iteratie]) if iteratie < len(self.vrijgave) else 0
+        if tokens:
+            self.vrijgegeven_tokens += tokens
+            self.beschikbare_vrijgegeven_tokens += tokens
+            self.resterende_tokens -= tokens
+            trace("vrijgave", INFO, "Iteratie {}: {} tokens vrijgegeven.", iteratie, tokens)
+            
+    def verkoop_utility(self, prijs_per_token):
+        
+        value = 1 + 2 * self.vrijgegeven_tokens + 1 * prijs_per_token # Prijs heeft een lichte invloed
+            
+        # Controleer op negatieve waarde (log mag niet negatief zijn)
+        if value <= 0:
+            raise ValueError(f"Waarde voor logaritme is niet positief: {value}")
+        
+        return math.log(value)  
+
+class FriendsAndFamily(InvestorGroup):
+    '''
+    We zouden hier nog specifieke aanpassingen kunnen aanmaken in de type investor zoals verschillende utilities
+    '''
+    def __init__(self, totale_supply, schema=None):
+        super().__init__(totale_supply, 2.5, 30, 12, schema=schema)
+
+class TeamAndAdvisors(InvestorGroup):
+    '''
+    We zouden hier nog specifieke aanpassingen kunnen aanmaken in de type investor zoals verschillende utilities
+    '''
+    def __init__(self, totale_supply, schema=None):
+        super().__init__(totale_supply, 19.5, 10, 24, schema=schema)
+
+# Hier komt het ecosystem & mining pool (genaamd systemen) klasse, ook wordt de public sale, en liquidity toegevoegd
+class System():
+    def __init__(self, totale_supply, allocatie_percentage, tge_percentage, vesting_maanden, schema = None):
+        self.totale_allocatie = totale_supply * (allocatie_percentage / 100)
+        self.vrijgegeven_tokens = 0
+        self.beschikbare_vrijgegeven_tokens = 0        
+        self.tokens_op_markt = 0        
+        self.resterende_tokens = self.totale_allocatie
+        # De volledige vrijgave wordt vooraf uitgerekend (standaard TGE + lineaire vesting per maand)
+        self.schema = schema if schema is not None else VestingSchema.standaard(tge_percentage, vesting_maanden)
+        self.vrijgave = self.schema.vrijgave_per_iteratie(self.totale_allocatie)
+
+    def vrijgave_tokens(self, iteratie):
+        # Na de laatste vrijgave van het schema komt er niets meer vrij
+        tokens = float(self.vrijgave[iteratie]) if iteratie < len(self.vrijgave) else 0
+        if tokens:
+            self.vrijgegeven_tokens += tokens
+            self.beschikbare_vrijgegeven_tokens += tokens
+            self.resterende_tokens -= tokens
+            trace("vrijgave", INFO, "Iteratie {}: {} tokens vrijgegeven.", iteratie, tokens)
+
+class Ecosystem(System):
+    def __init__(self, totale_supply, schema=None):
+        super().__init__(totale_supply, 28, 15, 24, schema=schema)
+        
+    def ontvang_burn_tokens(self, hoeveelheid):
+        self.vrijgegeven_tokens += hoeveelheid
+        trace("activiteit", DEBUG, "Ecosystem ontvangt {} extra tokens door falen burning activiteit", hoeveelheid)
+
+class Mining(System):
+    def __init__(self, totale_supply, schema=None):
+        super().__init__(totale_supply, 27, 10, 36, schema=schema)
+        
+    def ontvang_mining_tokens(self, hoeveelheid):
+        self.vrijgegeven_tokens += hoeveelheid
+        trace("activiteit", DEBUG, "Mining ontvangt {} extra tokens door falen mining activiteit", hoeveelheid)
+        
+class PublicSaleAirdrop(System):
+    def __init__(self, totale_supply, tge_percentage=20, schema=None):
+        super().__init__(totale_supply, allocatie_percentage=13, tge_percentage=tge_percentage, vesting_maanden=12, schema=schema)
+
+class Liquidity(System):
+    def __init__(self, totale_supply, schema=None):
+        super().__init__(totale_supply, 10, 100, 0, schema=schema)
+
+class Brand:
+    def __init__(self, cash):
+        self.cash = cash
+        self.tokens = 0
+        
+    def koop_tokens(self, exchange, aantal_tokens, liquidity=None):
+        # Liquidity wordt standaard toegewezen als deze niet is opgegeven
+        if liquidity is None:
+            liquidity = exchange.liquidity  # Verwijst naar een liquidity-klasse die je aan de exchange koppelt
+            
+        # De DataPartner koopt tokens via de Exchange
+        exchange.koop_tokens(self, aantal_tokens, liquidity)
+
+    def betaal_pool_fee(self, token, hb, pool_fee):
+        pool_fee_tokens = pool_fee / token.get_prijs()
+        
+        if self.tokens >= pool_fee_tokens:
+            self.tokens -= pool_fee_tokens
+            hb.ontvang_setup_fee(token, pool_fee_tokens)
+            trace("fees", DEBUG, "Brand heeft de pool fee van {} tokens betaald aan HB.", pool_fee_tokens)
+        else:
+            trace("fees", DEBUG, "Brand heeft niet genoeg tokens om de pool fee te betalen.")
+            return False
+        return True
+
+class DataPartner:
+    def __init__(self, cash):
+        self.cash = cash
+        self.tokens = 0
+
+    def koop_tokens(self, exchange, aantal_tokens, liquidity=None):
+        # Liquidity wordt standaard toegewezen als deze niet is opgegeven
+        if liquidity is None:
+            liquidity = exchange.liquidity  # Verwijst naar een liquidity-klasse die je aan de exchange koppelt
+            
+        # De DataPartner koopt tokens via de Exchange
+        exchange.koop_tokens(self, aantal_tokens, liquidity)
+
+    def betaal_setup_fee(self, token, hb, setup_fee):
+        setup_fee_tokens = setup_fee / token.get_prijs()
+        
+        if self.tokens >= setup_fee_tokens:
+            self.tokens -= setup_fee_tokens
+            hb.ontvang_setup_fee(token, setup_fee_tokens)
+            trace("fees", DEBUG, "Data Partner heeft de setup_fee van {} tokens betaald aan HB.", setup_fee_tokens)
+        else:
+            trace("fees", DEBUG, "Data Partner heeft niet genoeg tokens om de setup_fee te betalen.")
+            return False
+        return True
+    
+class HB: # Beheerder van de token
+    '''
+    Hoeveel cash heeft HB in het begin? Hoe gaan ze om met het kopen en verkopen van tokens?
+    '''
+    def __init__(self):
+        self.totale_fees = 0
+        self.totale_burned_tokens = 0
+        self.tokens = 0
+        self.cash = 0
+        
+    def burn_tokens(self, token, hoeveelheid):
+        token.burn_tokens(hoeveelheid)
+        self.totale_burned_tokens += hoeveelheid
+    
+    def ontvang_setup_fee(self, token, hoeveelheid, percentage_burn = 0.1):
+        self.tokens += hoeveelheid * (1 - percentage_burn)
+        self.burn_tokens(token, hoeveelheid * percentage_burn)
+    
+    def koop_tokens(self, bedrag, token):
+        if bedrag <= self.cash:
+            aantal_tokens = bedrag / token.get_prijs()
+            self.tokens += aantal_tokens
+            self.cash -= bedrag
+        
+    def verkoop_tokens(self, aantal_tokens, token):
+        if aantal_tokens <= self.tokens:
+            self.tokens -= aantal_tokens
+            bedrag = aantal_tokens * token.get_prijs()
+            self.cash += bedrag
+
+class Activiteiten:
+    def __init__(self, probability, activity_threshold):
+        self.probability = probability
+        self.activity_threshold = activity_threshold
+
+    def bereken_threshold(self, exchange):
+        # Basis berekening van de drempelwaarde
+        return self.activity_threshold + math.log(1 + exchange.tokens_op_markt / 100000)
+    
+    def check_en_update_beschikbaarheid(self, gebruiker):
+        # Controleren of de gebruiker beschikbaar is
+        if gebruiker.days_until_available > 0:
+            trace("activiteit", DEBUG, "{} is nog {} dagen niet beschikbaar", gebruiker.id, gebruiker.days_until_available)
+            return False
+    
+        # Stel nieuwe dagen op basis van gewichten
+        dagen_opties = [7, 14, 21, 28]
+        gewichten = [1, 1, 3, 1]
+        gebruiker.days_until_available = random.choices(dagen_opties, gewichten)[0]
+    
+        return True
+
+class StandaardActiviteit(Activiteiten):
+    def __init__(self, probability, activity_threshold):
+        super().__init__(probability, activity_threshold)
+
+    def deelname_activiteit(self, token, exchange, gebruiker, hb):
+        # Controleren of de gebruiker beschikbaar is voor een activiteit        
+        if not self.check_en_update_beschikbaarheid(gebruiker):
+            return
+        
+        # Gebruik de dynamisch berekende drempelwaarde
+        threshold = self.bereken_threshold(exchange)
+
+        # Controleer of de utility van de gebruiker hoger is dan de threshold
+        if gebruiker.activiteit_utility(token) > threshold:
+            trace("activiteit", DEBUG, "Gebruiker doet mee met de standaard activiteit")
+            # Controleer of de gebruiker wint op basis van probability
+
+            # Bereken een willekeurige inleg tussen de 5 en 10 euro
+            inleg_cash = random.uniform(5, 10)
+            inleg_tokens = inleg_cash / token.get_prijs() # Bereken het aantal tokens dat ingelegd moet worden op basis van cash
+            
+            # Bereken 1% van de inleg als fee voor HB
+            fee_voor_hb = inleg_tokens * 0.01
+            hb.tokens += fee_voor_hb            
+            
+            # Check nog of gebruiker genoeg tokens heeft, anders kopen
+            if gebruiker.tokens < inleg_tokens:
+                trace("activiteit", DEBUG, "Gebruiker heeft niet genoeg geld om aan de activiteit te deelnemen, dus koopt extra tokens")
+                missende_tokens = (inleg_tokens - gebruiker.tokens)
+                gebruiker.koop_tokens(exchange, missende_tokens)
+    
+            # Met een bepaalde kans krijgen de deelnemers tokens na hun inleg
+            if random.random() < self.probability:
+                beloning_tokens = 1.5 * inleg_tokens
+                gebruiker.tokens += (beloning_tokens - inleg_tokens)
+                trace("activiteit", DEBUG, "Gebruiker wint {}", beloning_tokens)
+            else: 
+                gebruiker.tokens -= inleg_tokens
+                hb.tokens += inleg_tokens * 0.9 # 90% procent van de inleg gaat naar HB als de deelnemer faalt
+                hb.burn_tokens(token, inleg_tokens*0.1) # 10% van de inleg wordt geburned
+                trace("activiteit", DEBUG, "Gebruiker verliest {}", inleg_tokens)
+            
+        else:
+            trace("activiteit", DEBUG, "{} heeft niet genoeg utility om deel te nemen aan deze activiteit.", gebruiker.id)
+     
+class BurningActiviteit(Activiteiten):
+    def __init__(self, probability, activity_threshold):
+        super().__init__(probability, activity_threshold)
+        
+    def deelname_activiteit(self, token, exchange, gebruiker, ecosystem):
+        
+        # Controleren of de gebruiker beschikbaar is voor een activiteit        
+        if not self.check_en_update_beschikbaarheid(gebruiker):
+            return
+        
+        # Gebruik de dynamisch berekende drempelwaarde
+        threshold = self.bereken_threshold(exchange)
+
+        # Bereken een willekeurige inleg tussen de 5 en 10 euro
+        inleg_cash = random.uniform(5, 10)
+        inleg_tokens = inleg_cash / token.get_prijs() # Bereken het aantal tokens dat ingelegd moet worden op basis van cash
+        
+        # Controleer of de utility van de gebruiker hoger is dan de threshold
+        if gebruiker.activiteit_utility(token) > threshold:
+            trace("activiteit", DEBUG, "Gebruiker doet mee met de burning activiteit")
+            
+            # check nog of gebruiker genoeg tokens heeft, anders kopen
+            if gebruiker.tokens < inleg_tokens:
+                trace("activiteit", DEBUG, "Gebruiker heeft niet genoeg geld om aan de activiteit te deelnemen, dus koopt extra tokens")
+                missende_tokens = (inleg_tokens - gebruiker.tokens)
+                gebruiker.koop_tokens(exchange, missende_tokens)
+                
+            if random.random() < self.probability:
+                gebruiker.tokens -= inleg_tokens
+                token.burn_tokens(inleg_tokens)
+                trace("activiteit", DEBUG, "Gebruiker wint, en {} tokens worden geburnt", inleg_tokens)
+            else: 
+                gebruiker.tokens -= inleg_tokens
+                ecosystem.ontvang_burn_tokens(inleg_tokens)
+                trace("activiteit", DEBUG, "Gebruiker verliest, en {} tokens worden naar het ecosystem gestuurd", inleg_tokens)
+        
+        else:
+            trace("activiteit", DEBUG, "{} heeft niet genoeg utility om deel te nemen aan deze activiteit.", gebruiker.id)
+
+class MiningActiviteit(Activiteiten):
+    def __init__(self, probability, activity_threshold):
+        super().__init__(probability, activity_threshold)
+        
+    def deelname_activiteit(self, token, exchange, gebruiker, mining):
+
+        # Controleren of de gebruiker beschikbaar is voor een activiteit        
+        if not self.check_en_update_beschikbaarheid(gebruiker):
+            return    
+
+        # Gebruik de dynamisch berekende drempelwaarde
+        threshold = self.bereken_threshold(exchange)
+ 
+        # Bereken een willekeurige inleg tussen de 5 en 10 euro
+        inleg_cash = random.uniform(5, 10)
+        inleg_tokens = inleg_cash / token.get_prijs() # Bereken het aantal tokens dat ingelegd moet worden op basis van cash
+        
+        # Controleer of de utility van de gebruiker hoger is dan de threshold
+        if gebruiker.activiteit_utility(token) > threshold:
+            trace("activiteit", DEBUG, "Gebruiker doet mee met de mining activiteit")
+            # Controleer of de gebruiker wint op basis van probability
+            
+            # check nog of gebruiker genoeg tokens heeft, anders kopen
+            if gebruiker.tokens < inleg_tokens:
+                trace("activiteit", DEBUG, "Gebruiker heeft niet genoeg geld om aan de activiteit te deelnemen, dus koopt extra tokens")
+                missende_tokens = (inleg_tokens - gebruiker.tokens)
+                gebruiker.koop_tokens(exchange, missende_tokens)
+                
+            if random.random() < self.probability:
+                gebruiker.tokens -= inleg_tokens
+                token.burn_tokens(inleg_tokens)
+                trace("activiteit", DEBUG, "Gebruiker wint, en {} tokens worden geburnt", inleg_tokens)
+            else: 
+                gebruiker.tokens -= inleg_tokens
+                mining.ontvang_mining_tokens(inleg_tokens)
+                trace("activiteit", DEBUG, "Gebruiker verliest, en {} tokens worden naar de mining gestuurd", inleg_tokens)
+        
+        else:
+            trace("activiteit", DEBUG, "{} heeft niet genoeg utility om deel te nemen aan deze activiteit.", gebruiker.id)
+
+class HostActiviteit(Activiteiten):
+    def __init__(self, probability, activity_threshold, pool_fee):
+        super().__init__(probability=probability, activity_threshold=activity_threshold)
+        self.pool_fee = pool_fee
+
+    def setup_activiteit(self, brand, token, hb, exchange):
+        pool_fee_tokens = self.pool_fee / token.get_prijs()
+        
+        # De brand moet eerst de pool fee betalen
+        if brand.tokens < pool_fee_tokens:
+            # Brand moet tokens kopen van de exchange om de pool fee te kunnen betalen
+            missende_pool_fee_tokens = pool_fee_tokens - brand.tokens
+            brand.koop_tokens(exchange, missende_pool_fee_tokens)
+            
+        # Als de brand genoeg tokens heeft, betaalt het de pool fee aan HB
+        brand.betaal_pool_fee(token, hb, self.pool_fee)
+            
+    def deelname_activiteit(self, token, exchange, gebruiker, brand):
+        
+        # Controleren of de gebruiker beschikbaar is voor een activiteit        
+        if not self.check_en_update_beschikbaarheid(gebruiker):
+            return            
+        
+        # Gebruik de dynamisch berekende drempelwaarde
+        threshold = 3 * self.bereken_threshold(exchange) # multiply factor van 3 omdat we verwachten dat host activiteiten minder snel gedaan worden
+        pool_fee_tokens = self.pool_fee / token.get_prijs()
+        beloning = pool_fee_tokens * 0.1 # 5% van de pool_fee kan een gebruiker krijgen
+        
+        if gebruiker.activiteit_utility(token) > threshold:
+            trace("activiteit", DEBUG, "Gebruiker doet mee met de host activiteit")
+            
+            # Controleer of de Brand genoeg tokens heeft om de beloning uit te keren, anders kopen op de markt
+            if brand.tokens < beloning:
+                # Brand moet tokens kopen van de exchange om de pool fee te kunnen betalen
+                missende_beloning_tokens = beloning - brand.tokens
+                brand.koop_tokens(exchange, missende_beloning_tokens)
+            
+            if brand.tokens >= beloning:
+                # Controleer of de gebruiker wint op basis van probability
+                if random.random() < self.probability:
+                    gebruiker.tokens += beloning
+                    brand.tokens -= beloning
+                    trace("activiteit", DEBUG, "Gebruiker wint en ontvangt {} tokens van de Brand.", beloning)
+                else:
+                    trace("activiteit", DEBUG, "Gebruiker verliest, geen tokens uitbetaald.")
+            else:
+                trace("activiteit", DEBUG, "Brand heeft niet genoeg tokens om de beloning uit te keren.")
+        
+        else:
+            trace("activiteit", DEBUG, "{} heeft niet genoeg utility om deel te nemen aan deze activiteit.", gebruiker.id)
+  
+class DataPool(Activiteiten):
+     def __init__(self, probability, data_threshold, setup_fee):
+         super().__init__(probability=probability, activity_threshold=data_threshold)
+         self.setup_fee = setup_fee
+         self.data_threshold = data_threshold
+    
+     def setup_activiteit(self, datapartner, token, hb, exchange):
+         setup_fee_tokens = self.setup_fee / token.get_prijs()
+         
+         # De Data Partner moet eerst de setup fee betalen
+         if datapartner.tokens < setup_fee_tokens:
+             # Data Partner moet tokens kopen van de exchange om de setup fee te kunnen betalen
+             missende_setup_fee_tokens = setup_fee_tokens - datapartner.tokens
+             datapartner.koop_tokens(exchange, missende_setup_fee_tokens)
+             
+         # Als de data partner genoeg tokens heeft, betaalt het de setup fee aan HB
+         datapartner.betaal_setup_fee(token, hb, self.setup_fee)
+             
+     def deelname_activiteit(self, token, exchange, gebruiker, datapartner):
+         
+         # Controleren of de gebruiker beschikbaar is voor een activiteit        
+         if not self.check_en_update_beschikbaarheid(gebruiker):
+             return
+         
+         # Gebruik de dynamisch berekende drempelwaarde
+         threshold = self.bereken_threshold(exchange)
+         setup_fee_tokens = self.setup_fee / token.get_prijs()
+         beloning = setup_fee_tokens * 0.05 # 5% van de setup_fee kan een gebruiker krijgen
+         
+         if gebruiker.data_utility > threshold:
+             trace("activiteit", DEBUG, "Gebruiker doet mee met de data activiteit")
+             
+             # Controleer of de Datapartner genoeg tokens heeft om de beloning uit te keren, anders kopen op de markt
+             if datapartner.tokens < beloning:
+                 # Data Partner moet tokens kopen van de exchange om de beloning te kunnen uitkeren
+                 missende_beloning_tokens = beloning - datapartner.tokens
+                 datapartner.koop_tokens(exchange, missende_beloning_tokens)
+             
+             if datapartner.tokens >= beloning:
+                 # Controleer of de gebruiker wint op basis van probability
+                 if random.random() < self.probability:
+                     gebruiker.tokens += beloning
+                     datapartner.tokens -= beloning
+                     trace("activiteit", DEBUG, "Gebruiker wint en ontvangt {} tokens van de Data Partner.", beloning)
+                 else:
+                     trace("activiteit", DEBUG, "Gebruiker verliest, geen tokens uitbetaald.")
+             else:
+                 trace("activiteit", DEBUG, "Data Partner heeft niet genoeg tokens om de beloning uit te keren.")
+               
+         else:
+             trace("activiteit", DEBUG, "{} heeft niet genoeg utility om deel te nemen aan deze activiteit.", gebruiker.id)
+  
+# we moeten nog de data partners en sponsored activiteiten toevoegen 
+
+class Exchange:
+    def __init__(self, token, liquidity):
+        self.token = token # Referentie naar de token die wordt verhandeld
+        self.vraag = 0
+        self.aanbod = 0
+        self.beschikbare_tokens = 0 # Totaal aantal tokens dat beschikbaar is voor verkoop op de markt
+        self.tokens_op_markt = 0
+        self.token_houders = {} # Dictionary om bij te houden welke partij hoeveel tokens aanbiedt
+        self.liquidity = liquidity
+        self.orderboek = OrderBoek(self) # Orders die pas bij wikkel_af() in een keer worden afgewikkeld
+
+    def koop_tokens(self, koper, aantal_tokens, liquidity):
+        totale_kosten = aantal_tokens * self.token.get_prijs()
+        
+        # Controleer of er genoeg tokens zijn op de exchange
+        if aantal_tokens > self.beschikbare_tokens:
+            # Voeg tokens van Liquidity toe als er niet genoeg tokens beschikbaar zijn
+            if liquidity.vrijgegeven_tokens > 0:
+                self.voeg_tokens_toe(liquidity, liquidity.vrijgegeven_tokens, self.token)
+                trace("exchange", DEBUG, "Liquidity tokens zijn toegevoegd aan de exchange omdat er niet genoeg tokens beschikbar waren.")
+        
+        # Controleer opnieuw of er nu genoeg tokens zijn na toevoeging van liquidity
+        if aantal_tokens <= self.beschikbare_tokens and koper.cash >= totale_kosten:
+            self.beschikbare_tokens -= aantal_tokens
+            koper.tokens += aantal_tokens
+            koper.cash -= totale_kosten
+            self.vraag += aantal_tokens
+            trace("exchange", DEBUG, "Koper heeft {} tokens gekocht voor {} cash.", aantal_tokens, totale_kosten)
+        else:
+            trace("exchange", DEBUG, "Niet genoeg tokens beschikbaar of onvoldoende cash.")
+            
+    def verkoop_tokens(self, koper, aantal_tokens):
+        totale_opbrengst = aantal_tokens * self.token.get_prijs()
+        if aantal_tokens <= koper.tokens:
+            self.beschikbare_tokens += aantal_tokens
+            koper.tokens -= aantal_tokens
+            koper.cash += totale_opbrengst
+            self.aanbod += aantal_tokens
+            trace("exchange", DEBUG, "Koper heeft {} tokens verkocht voor {} cash.", aantal_tokens, totale_opbrengst)
+        else:
+            trace("exchange", DEBUG, "Niet genoeg tokens om te verkopen.")
+
+    def handel_bulk(self, tokens, cash, koop_aantallen, verkoop_aantallen, liquidity):
+        '''
+        Verwerkt de koop- en verkooporders van een hele populatie (tokens, cash en aantallen zijn arrays,
+        met per agent hoogstens een koop- of een verkooporder) met dezelfde uitkomst als een order per agent
+        in de volgorde van de populatie, zoals de lus over de speculators met de object backend: elke
+        kooporder wordt afgewikkeld tegen het saldo van de exchange op dat moment (inclusief de verkopen
+        van de agents ervoor) en vult zo nodig de exchange aan met liquidity. Als het saldo nooit onder
+        een order komt gaat alles in een keer; alleen bij schaarste wordt per koper afgewikkeld.
+        '''
+        prijs = self.token.get_prijs()
+        verkocht = np.where(verkoop_aantallen <= tokens, verkoop_aantallen, 0)
+        kan_betalen = cash >= koop_aantallen * prijs
+
+        totaal = float(koop_aantallen[kan_betalen].sum())
+        niet_betaald = koop_aantallen[~kan_betalen]
+        laagste_saldo = self.beschikbare_tokens - totaal # Het saldo daalt nooit verder, ook zonder de verkopen
+        if laagste_saldo >= 0 and (not len(niet_betaald) or niet_betaald.max() <= laagste_saldo):
+            gekocht = np.where(kan_betalen, koop_aantallen, 0)
+        else:
+            gekocht = np.zeros(len(koop_aantallen))
+            verkocht_ervoor = np.cumsum(verkocht) - verkocht
+            totaal_gekocht = 0.0
+            for index in np.flatnonzero(koop_aantallen > 0).tolist():
+                aantal = koop_aantallen[index]
+                saldo = self.beschikbare_tokens + verkocht_ervoor[index] - totaal_gekocht
+                if aantal > saldo and liquidity.vrijgegeven_tokens > 0:
+                    # Voeg tokens van Liquidity toe als er niet genoeg tokens beschikbaar zijn
+                    self.voeg_tokens_toe(liquidity, liquidity.vrijgegeven_tokens, self.token)
+                    saldo = self.beschikbare_tokens + verkocht_ervoor[index] - totaal_gekocht
+                if aantal <= saldo and kan_betalen[index]:
+                    gekocht[index] = aantal
+                    totaal_gekocht += aantal
+
+        totaal_verkocht = float(verkocht.sum())
+        totaal_gekocht = float(gekocht.sum())
+        tokens += gekocht - verkocht
+        cash += (verkocht - gekocht) * prijs
+        self.beschikbare_tokens += totaal_verkocht - totaal_gekocht
+        self.aanbod += totaal_verkocht
+        self.vraag += totaal_gekocht
+        trace("exchange", DEBUG, "Verkopers hebben {} tokens verkocht voor {} cash.", totaal_verkocht, totaal_verkocht * prijs)
+        trace("exchange", DEBUG, "Kopers hebben {} tokens gekocht voor {} cash.", totaal_gekocht, totaal_gekocht * prijs)
+
+    def voeg_tokens_toe(self, bron, aantal_tokens, token):       
+        
+        # controleer dat het aantal_tokens dat op de markt wordt gebracht wel groter is dan 0
+        if aantal_tokens <= 0:
+            trace("exchange", DEBUG, "Aantal tokens moet groter zijn dan 0.")
+            return False
+            
+        # Controleer of de bron een systeem- of investorklasse is
+        if not isinstance(bron, (System, InvestorGroup)):
+            trace("exchange", WAARSCHUWING, "Fout: Bron moet een instantie zijn van System of InvestorGroup klasse.")
+            return False
+
+        # Controleer of het aantal tokens dat toegevoegd wordt niet groter is dan de vrijgegeven tokens van de bron
+        if aantal_tokens > bron.beschikbare_vrijgegeven_tokens:
+            trace("exchange", WAARSCHUWING, "Fout: Aantal tokens dat wordt toegevoegd is groter dan het aantal beschikbare vrijgegeven tokens van de bron.")
+            return False
+
+        # Controleer of de investeerder zijn tokens op de markt wil brengen
+        if isinstance(bron, InvestorGroup) and not bron.tokens_op_de_markt:
+            trace("exchange", DEBUG, "{} wil zijn tokens niet op de markt brengen.", bron.__class__.__name__)
+            return False
+        
+        self.beschikbare_tokens += aantal_tokens
+        if bron in self.token_houders:
+            self.token_houders[bron] += aantal_tokens
+        else:
+            self.token_houders[bron] = aantal_tokens
+       
+        # Cash toekennen aan InvestorGroup wanneer tokens worden toegevoegd
+        if isinstance(bron, InvestorGroup):
+            cash_verdiend = aantal_tokens * token.get_prijs()
+            bron.cash += cash_verdiend
+            trace("exchange", DEBUG, "{} heeft {} cash verdiend door {} tokens op de markt te brengen.", bron.__class__.__name__, cash_verdiend, aantal_tokens)
+        else:
+            trace("exchange", DEBUG, "Geen cash ontvangen omdat het een systeem is.")
+        
+        bron.tokens_op_markt += aantal_tokens
+        self.tokens_op_markt += aantal_tokens
+        bron.beschikbare_vrijgegeven_tokens -= aantal_tokens        
+        token.maandelijkse_supply_vrijgeven(aantal_tokens)
+        self.aanbod += aantal_tokens
+        trace("exchange", DEBUG, "{} tokens toegevoegd aan de markt door {}.", aantal_tokens, bron)
+        trace("exchange", DEBUG, "Er zijn {} tokens beschikbaar op de markt.", self.beschikbare_tokens)
+    
+    def wikkel_af(self):
+        '''
+        Wikkelt alle orders in het orderboek in een keer af tegen dezelfde prijs: eerst alle verkopen,
+        daarna alle kopen. Als er te weinig tokens beschikbaar zijn wordt elke kooporder voor hetzelfde
+        deel gevuld (pro rata), zodat de volgorde van de orders niet uitmaakt.
+        '''
+        orderboek = self.orderboek
+        prijs = self.token.get_prijs()
+
+        # Verkopen: alleen orders waarvoor de verkoper genoeg tokens heeft
+        tokens, cash, aantallen, terugschrijven = orderboek.verzamel(orderboek.verkopen)
+        verkocht = np.where(aantallen <= tokens, aantallen, 0)
+        totaal_verkocht = float(verkocht.sum())
+        tokens -= verkocht
+        cash += verkocht * prijs
+        terugschrijven(tokens, cash)
+        self.beschikbare_tokens += totaal_verkocht
+        self.aanbod += totaal_verkocht
+
+        # Kopen: alleen orders waarvoor de koper genoeg cash heeft
+        tokens, cash, aantallen, terugschrijven = orderboek.verzamel(orderboek.kopen)
+        geldig = cash >= aantallen * prijs
+        totale_vraag = float(np.where(geldig, aantallen, 0).sum())
+
+        # Voeg tokens van Liquidity toe als er niet genoeg tokens beschikbaar zijn
+        if totale_vraag > self.beschikbare_tokens and self.liquidity.vrijgegeven_tokens > 0:
+            self.voeg_tokens_toe(self.liquidity, self.liquidity.vrijgegeven_tokens, self.token)
+            trace("exchange", DEBUG, "Liquidity tokens zijn toegevoegd aan de exchange omdat er niet genoeg tokens beschikbar waren.")
+
+        # Bij een tekort wordt elke order voor hetzelfde deel gevuld
+        fractie = 1.0 if totale_vraag <= self.beschikbare_tokens else max(self.beschikbare_tokens, 0) / totale_vraag
+        gekocht = np.where(geldig, aantallen * fractie, 0)
+        totaal_gekocht = float(gekocht.sum())
+        tokens += gekocht
+        cash -= gekocht * prijs
+        terugschrijven(tokens, cash)
+        self.beschikbare_tokens -= totaal_gekocht
+        self.vraag += totaal_gekocht
+
+        trace("exchange", DEBUG, "Afgewikkeld: {} tokens verkocht, {} tokens gekocht (vulgraad {}).", totaal_verkocht, totaal_gekocht, fractie)
+        orderboek.leeg()
+
+    def update_marktprijs(self):
+        # Bereken de prijs op basis van totale vraag en aanbod in de iteratie
+        self.token.update_prijs(self.vraag, self.aanbod)
+        # Reset vraag en aanbod voor de volgende iteratie
+        self.vraag = 0
+        self.aanbod = 0
+            
+
+class OrderBoek:
+    '''
+    Buffer voor de orders van een iteratie. Heeft dezelfde koop- en verkoopmethodes als de Exchange,
+    zodat agents en populaties hun orders hier kunnen plaatsen in plaats van direct op de exchange.
+    De exchange wikkelt ze daarna in een keer af met Exchange.wikkel_af().
+    '''
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.leeg()
+
+    @property
+    def token(self):
+        return self.exchange.token
+
+    @property
+    def liquidity(self):
+        return self.exchange.liquidity
+
+    def leeg(self):
+        # Per kant: een lijst met blokken (tokens, cash, aantallen) en de orders van losse agents
+        self.kopen = ([], [], [])
+        self.verkopen = ([], [], [])
+
+    def __len__(self):
+        return sum(len(aantallen) for _, _, aantallen in self.kopen[0] + self.verkopen[0]) + len(self.kopen[1]) + len(self.verkopen[1])
+
+    def koop_tokens(self, koper, aantal_tokens, liquidity=None):
+        self.kopen[1].append(koper)
+        self.kopen[2].append(aantal_tokens)
+
+    def verkoop_tokens(self, verkoper, aantal_tokens):
+        self.verkopen[1].append(verkoper)
+        self.verkopen[2].append(aantal_tokens)
+
+    def handel_bulk(self, tokens, cash, koop_aantallen, verkoop_aantallen, liquidity=None):
+        # tokens en cash zijn (views op) kolommen van een populatie, die bij het afwikkelen worden bijgewerkt
+        self.verkopen[0].append((tokens, cash, verkoop_aantallen))
+        self.kopen[0].append((tokens, cash, koop_aantallen))
+
+    def verzamel(self, kant):
+        '''
+        Zet alle orders van een kant achter elkaar in drie arrays (tokens, cash, aantallen) en geeft
+        een functie terug die de nieuwe tokens en cash weer naar de populaties en agents schrijft
+        '''
+        blokken, agents, aantallen = kant
+        delen = list(blokken)
+        if agents:
+            delen.append((
+                np.array([agent.tokens for agent in agents], dtype=float),
+                np.array([agent.cash for agent in agents], dtype=float),
+                np.array(aantallen, dtype=float)
+            ))
+        if not delen:
+            leeg = np.empty(0)
+            return leeg, leeg.copy(), leeg.copy(), lambda tokens, cash: None
+
+        grenzen = np.cumsum([0] + [len(deel[2]) for deel in delen])
+        alle_tokens = np.concatenate([deel[0] for deel in delen])
+        alle_cash = np.concatenate([deel[1] for deel in delen])
+        alle_aantallen = np.concatenate([np.asarray(deel[2], dtype=float) for deel in delen])
+
+        def terugschrijven(tokens, cash):
+            for (blok_tokens, blok_cash, _), begin, eind in zip(blokken, grenzen[:-1], grenzen[1:]):
+                blok_tokens[:] = tokens[begin:eind]
+                blok_cash[:] = cash[begin:eind]
+            if agents:
+                begin = grenzen[-2]
+                for agent, agent_tokens, agent_cash in zip(agents, tokens[begin:].tolist(), cash[begin:].tolist()):
+                    agent.tokens = agent_tokens
+                    agent.cash = agent_cash
+
+        return alle_tokens, alle_cash, alle_aantallen, terugschrijven
+
+def _niet_meten(fase):
+    pass
+
+# Compacte momentopname van de simulatie na een iteratie
+Snapshot = namedtuple("Snapshot", ["iteratie", "prijs", "circulerende_supply", "liquidity", "tokens_op_markt"])
+
+class Simulation:
+    '''
+    Een enkele run van het HB model. De simulatie kan stap voor stap gedraaid worden met step(),
+    of lui doorlopen worden met iter_steps(), zodat resultaten gestreamd kunnen worden of
+    de run vroegtijdig gestopt kan worden.
+    '''
+    def __init__(self, config, seed=None):
+        # Met een seed zijn zowel de random module als de NumPy generator reproduceerbaar
+        if seed is not None:
+            random.seed(seed)
+        self.config = config
+        self.seed = seed
+        self.rng = np.random.default_rng(seed if seed is not None else random.getrandbits(64))
+
+        self.token = Token(config.total_supply, config.initial_token_price, elasticiteit=config.elasticiteit)
+        vesting = config.vesting
+        self.liquidity = Liquidity(config.total_supply, schema=vesting.get("Liquidity"))
+        self.exchange = Exchange(token=self.token, liquidity=self.liquidity)
+
+        # Initialiseer HB (beheerder van de tokens)
+        self.hb = HB()
+
+        # Initialiseer de verschillende investeerdersgroepen
+        self.FaF = FriendsAndFamily(config.total_supply, schema=vesting.get("FriendsAndFamily"))
+        self.TaA = TeamAndAdvisors(config.total_supply, schema=vesting.get("TeamAndAdvisors"))
+        self.PSA = PublicSaleAirdrop(config.total_supply, tge_percentage=config.tge_psa, schema=vesting.get("PublicSaleAirdrop"))
+        self.Min = Mining(config.total_supply, schema=vesting.get("Mining"))
+        self.Eco = Ecosystem(config.total_supply, schema=vesting.get("Ecosystem"))
+
+        # Initialiseer de datapartners en merken
+        self.DP = DataPartner(config.initial_cash_datapartner)
+        self.Bra = Brand(config.initial_cash_brands)
+
+        # Initialiseer de activiteiten
+        StandaardActiviteit1 = StandaardActiviteit(probability=0.9, activity_threshold=10)
+        BurningActiviteit1 = BurningActiviteit(probability=0.9, activity_threshold=12)
+        MiningActiviteit1 = MiningActiviteit(probability=0.9, activity_threshold=14)
+
+        self.DataPool1 = DataPool(probability=1, data_threshold=30, setup_fee=config.setup_fee)
+        self.HostActiviteit1 = HostActiviteit(probability=0.8, activity_threshold=20, pool_fee=config.pool_fee)
+
+        self.activiteiten = [StandaardActiviteit1, BurningActiviteit1, MiningActiviteit1, self.DataPool1, self.HostActiviteit1]
+
+        # Met representatieve agents draait een steekproef, waarin elke agent voor 'gewicht' agents staat
+        self.gewichten = {"gebruikers": 1.0, "speculators": 1.0}
+        self.vertegenwoordigd = {"gebruikers": config.aantal_gebruiker, "speculators": config.aantal_speculators}
+        aantal_gebruiker = config.aantal_gebruiker
+        aantal_spec = config.aantal_speculators
+        if config.representatieve_gebruikers or config.representatieve_speculators:
+            if config.backend not in ("array", "object") or config.afwikkeling != "direct":
+                raise ValueError("Representatieve agents werken alleen met de array of object backend en directe afwikkeling")
+            if config.representatieve_gebruikers and config.representatieve_gebruikers < aantal_gebruiker:
+                self.gewichten["gebruikers"] = aantal_gebruiker / config.representatieve_gebruikers
+                aantal_gebruiker = config.representatieve_gebruikers
+            if config.representatieve_speculators and config.representatieve_speculators < aantal_spec:
+                self.gewichten["speculators"] = aantal_spec / config.representatieve_speculators
+                aantal_spec = config.representatieve_speculators
+            controleer_gewicht("gebruikers", self.gewichten["gebruikers"], aantal_gebruiker)
+            controleer_gewicht("speculators", self.gewichten["speculators"], aantal_spec)
+
+        # Initialiseer de gebruikers
+        if config.backend == "cohort":
+            self.gebruikers = CohortPopulatie(self.rng, transities=config.cohort_transities, max_koop_bedrag=Gebruiker.max_koop_bedrag)
+            self.gebruikers.voeg_toe(aantal_gebruiker, cash=config.initial_cash_user, data_utility=75)
+        elif config.backend != "object":
+            self.gebruikers = GebruikersPopulatie(rij_klasse=PopulatieGebruiker, capaciteit=aantal_gebruiker, rng=self.rng)
+            self.gebruikers.voeg_toe(aantal_gebruiker, cash=config.initial_cash_user, data_utility=75)
+        else:
+            self.gebruikers = []
+            for i in range(aantal_gebruiker):
+                gebruiker = Gebruiker(i, cash=config.initial_cash_user, data_utility=75)
+                self.gebruikers.append(gebruiker)
+
+        # Initialiseer de speculators
+        if config.backend != "object":
+            self.specs = SpeculatorPopulatie(rij_klasse=PopulatieSpeculator, capaciteit=aantal_spec, rng=self.rng)
+            self.specs.voeg_toe(aantal_spec, cash=config.initial_cash_speculator)
+        else:
+            self.specs = []
+            for i in range(aantal_spec):
+                spec = Speculator(i, cash=config.initial_cash_speculator)
+                self.specs.append(spec)
+
+        # UUIDs voor gebruikers en speculators, alleen als ze opgevraagd worden (intern zijn de ids gehele getallen)
+        self.gebruiker_ids = ExterneIds(None if seed is None else f"gebruikers-{seed}")
+        self.speculator_ids = ExterneIds(None if seed is None else f"speculators-{seed}")
+
+        # Alle gebruikers zijn aan het begin beschikbaar (cohorten houden hun eigen dag bij)
+        self.kalender = BeschikbaarheidsKalender()
+        if config.backend != "cohort":
+            self.kalender.plan(0, np.arange(len(self.gebruikers)))
+
+        # Start de eerste iteratie
+        for groep in self.groepen().values():
+            groep.vrijgave_tokens(0)
+
+        # Eigen generator voor steekproeven, zodat het meten de simulatie zelf niet beinvloedt
+        self.statistiek_rng = np.random.default_rng(None if seed is None else [seed, 1])
+        self.schattingen = (None, None) # (iteratie, schattingen) van utility_schattingen()
+
+        # Alle tijdreeksen worden in vooraf gealloceerde kolommen bijgehouden
+        self.recorder = Recorder(config.iterations, cadans=config.opname_cadans)
+        self.registreer_metrics()
+
+        self.iteratie = 0
+        self.fase_timer = None # Object met start() en markeer(fase), om de tijd per fase van step() te meten
+        self.checkpoints = None # Object met na_stap(simulatie), bijvoorbeeld checkpoint.Checkpoints
+
+    def groepen(self):
+        # Alle groepen die tokens vrijgeven, in de volgorde van de originele simulatie
+        return {
+            "FriendsAndFamily": self.FaF,
+            "TeamAndAdvisors": self.TaA,
+            "PublicSaleAirdrop": self.PSA,
+            "Mining": self.Min,
+            "Ecosystem": self.Eco,
+            "Liquidity": self.liquidity
+        }
+
+    def wereld(self, naam):
+        # De gedeelde objecten zoals de agents van populatie 'naam' ze zien (met hun gewicht, zie gewogen.py)
+        gewicht = self.gewichten[naam]
+        return self if gewicht == 1 else GewogenWereld(self, gewicht)
+
+    def groei(self, naam, aantal, groeiratio):
+        '''
+        Aantal nieuwe agents voor populatie 'naam' (nu 'aantal' agents) bij de maandelijkse groei.
+        Met een steekproef groeit de vertegenwoordigde populatie en komen er evenveel agents met
+        hetzelfde gewicht bij.
+        '''
+        gewicht = self.gewichten[naam]
+        if gewicht == 1:
+            return int(aantal * (1 + groeiratio)) - aantal
+        vertegenwoordigd = self.vertegenwoordigd[naam]
+        nieuw = int(vertegenwoordigd * (1 + groeiratio))
+        self.vertegenwoordigd[naam] = nieuw
+        return groei_steekproef(vertegenwoordigd, nieuw, gewicht, self.rng)
+
+    def klassen_op_markt(self):
+        # Groepen waarvan het aantal tokens op de markt wordt bijgehouden
+        return {
+            "FriendsAndFamily": self.FaF,
+            "TeamAndAdvisors": self.TaA,
+            "PublicSaleAirdrop": self.PSA,
+            "Mining": self.Min,
+            "Ecosystem": self.Eco
+        }
+
+    def registreer_metrics(self):
+        '''
+        Registreert de bijgehouden tijdreeksen. De functies krijgen de simulatie mee (en houden
+        zelf geen verwijzingen vast), zodat ze op elk moment opnieuw geregistreerd kunnen worden.
+        '''
+        recorder = self.recorder
+
+        # Vrijgave direct na het vrijgeven van de tokens, per groep
+        for naam in self.groepen():
+            recorder.registreer(f"vrijgave/{naam}", lambda sim, naam=naam: sim.groepen()[naam].vrijgegeven_tokens, moment="vrijgave")
+
+        # Gemiddelde utilities van gebruikers en speculators (met standaardfout), voor de activiteiten van de dag
+        if self.config.utility_opname != "uit":
+            for naam in ["gebruiker_utility", "speculator_koop_utility", "speculator_verkoop_utility"]:
+                recorder.registreer(naam, lambda sim, naam=naam: sim.utility_schattingen()[naam][0], moment="utilities")
+                recorder.registreer(f"{naam}_fout", lambda sim, naam=naam: sim.utility_schattingen()[naam][1], moment="utilities")
+
+        # Thresholds van de activiteiten, na de activiteiten van de gebruikers
+        for index, naam in enumerate(["Standaard", "Burning", "Mining", "Datapool", "Sponsored"]):
+            recorder.registreer(f"activiteit_utility/{naam}", lambda sim, index=index: sim.activiteiten[index].bereken_threshold(sim.exchange), moment="activiteiten")
+
+        # Aan het eind van de iteratie
+        recorder.registreer("prijs", lambda sim: sim.token.get_prijs())
+        recorder.registreer("liquidity", lambda sim: sim.liquidity.beschikbare_vrijgegeven_tokens)
+        recorder.registreer("circulerende_supply", lambda sim: sim.token.get_circulerende_tokens())
+        recorder.registreer("burned", lambda sim: sim.hb.totale_burned_tokens)
+        recorder.registreer("hb_tokens", lambda sim: sim.hb.tokens)
+        for naam in self.klassen_op_markt():
+            recorder.registreer(f"tokens_op_markt/{naam}", lambda sim, naam=naam: sim.klassen_op_markt()[naam].tokens_op_markt)
+
+    def utility_schattingen(self):
+        '''
+        Gemiddelde utility van gebruikers en de gemiddelde koop en verkoop utility van speculators, als
+        dictionary naam -> (gemiddelde, standaardfout). Met utility_opname="steekproef" wordt elk gemiddelde
+        geschat uit een aselecte steekproef; per iteratie wordt er maar een keer gerekend.
+        '''
+        if self.schattingen[0] == self.iteratie:
+            return self.schattingen[1]
+
+        config = self.config
+        steekproef = config.utility_steekproef if config.utility_opname == "steekproef" else None
+        token = self.token
+        prijs = token.get_prijs()
+        gebruikers = self.gebruikers
+        specs = self.specs
+
+        if config.backend != "object":
+            bereken = {
+                "gebruiker_utility": lambda indices: gebruikers.activiteit_utilities(prijs, indices),
+                "speculator_koop_utility": lambda indices: specs.koop_utilities(prijs, indices),
+                "speculator_verkoop_utility": lambda indices: specs.verkoop_utilities(prijs, indices),
+            }
+        else:
+            def agents(lijst, indices):
+                return lijst if indices is None else [lijst[index] for index in indices.tolist()]
+            bereken = {
+                "gebruiker_utility": lambda indices: [gebruiker.activiteit_utility(token) for gebruiker in agents(gebruikers, indices)],
+                "speculator_koop_utility": lambda indices: [spec.koop_utility(token) for spec in agents(specs, indices)],
+                "speculator_verkoop_utility": lambda indices: [spec.verkoop_utility(token) for spec in agents(specs, indices)],
+            }
+
+        schattingen = {}
+        for naam, functie in bereken.items():
+            if naam == "gebruiker_utility" and config.backend == "cohort":
+                # Het gewogen gemiddelde over de cohorten is exact
+                schattingen[naam] = (gebruikers.gemiddelde_utility(prijs), 0.0)
+                continue
+            grootte = len(gebruikers) if naam == "gebruiker_utility" else len(specs)
+            schattingen[naam] = schat_gemiddelde(functie, grootte, steekproef, self.statistiek_rng)
+        self.schattingen = (self.iteratie, schattingen)
+        return schattingen
+
+    # Velden van de configuratie die alleen bij het opbouwen van de simulatie gebruikt worden
+    VASTE_VELDEN = {"initial_token_price", "total_supply", "aantal_gebruikers", "aantal_speculators", "tge_psa",
+                    "backend", "opname_cadans", "vesting", "utility_opname", "cohort_transities",
+                    "representatieve_gebruikers", "representatieve_speculators"}
+
+    def fork(self, **wijzigingen):
+        '''
+        Nieuwe tak van de simulatie die vanaf de huidige iteratie verder gaat, eventueel met een
+        gewijzigde configuratie (argumenten van Configuratie, bijvoorbeeld fork(pool_fee=40)).
+        Met de array en kernel backend delen de takken de kolommen van de populaties copy-on-write,
+        zodat een fork weinig kost en alleen de kolommen die een tak verandert gekopieerd worden.
+        De takken gebruiken dezelfde NumPy random stroom; de random module is gedeeld (zie scenario.py).
+        '''
+        vast = sorted(set(wijzigingen) & self.VASTE_VELDEN)
+        if vast:
+            raise ValueError(f"Deze velden kunnen na de start niet meer veranderen: {', '.join(vast)}")
+
+        tak = copy.deepcopy(self)
+        tak.fase_timer = None
+        tak.checkpoints = None
+        tak.config = self.config.met(**wijzigingen)
+
+        # Waarden die bij het opbouwen uit de configuratie zijn overgenomen
+        tak.HostActiviteit1.pool_fee = tak.config.pool_fee
+        tak.DataPool1.setup_fee = tak.config.setup_fee
+        tak.token.set_elasticiteit(tak.config.elasticiteit)
+        return tak
+
+    def klaar(self):
+        return self.iteratie >= self.config.iterations
+
+    def snapshot(self):
+        return Snapshot(
+            iteratie=self.iteratie - 1,
+            prijs=self.token.get_prijs(),
+            circulerende_supply=self.token.get_circulerende_tokens(),
+            liquidity=self.liquidity.beschikbare_vrijgegeven_tokens,
+            tokens_op_markt={naam: klasse.tokens_op_markt for naam, klasse in self.klassen_op_markt().items()}
+        )
+
+    def step(self):
+        '''
+        Voert een iteratie (dag) van de simulatie uit en geeft een Snapshot terug
+        '''
+        config = self.config
+        token = self.token
+        exchange = self.exchange
+        hb = self.hb
+        gebruikers = self.gebruikers
+        specs = self.specs
+        iteratie = self.iteratie
+
+        # Optionele meting van de tijd per fase (zie benchmark.py)
+        meet = self.fase_timer.markeer if self.fase_timer is not None else _niet_meten
+        if self.fase_timer is not None:
+            self.fase_timer.start()
+
+        # Token vrijgave door de verschillende groepen per iteratie
+        for groep in self.groepen().values():
+            groep.vrijgave_tokens(iteratie)
+        self.recorder.neem_op(iteratie, self, moment="vrijgave")
+        meet("vrijgave")
+
+        # Voeg tokens toe aan de exchange vanuit de verschillende groepen
+        exchange.voeg_tokens_toe(self.PSA, self.PSA.beschikbare_vrijgegeven_tokens, token)
+        exchange.voeg_tokens_toe(self.FaF, self.FaF.beschikbare_vrijgegeven_tokens * config.ratio_op_de_markt_investeerders, token)
+        exchange.voeg_tokens_toe(self.TaA, self.TaA.beschikbare_vrijgegeven_tokens * config.ratio_op_de_markt_investeerders, token)
+        exchange.voeg_tokens_toe(self.Min, self.Min.beschikbare_vrijgegeven_tokens * config.ratio_op_de_markt_systemen, token)
+        exchange.voeg_tokens_toe(self.Eco, self.Eco.beschikbare_vrijgegeven_tokens * config.ratio_op_de_markt_systemen, token)
+        meet("aanbod")
+
+        # Groeimodel voor gebruikers
+        if iteratie % 30 == 0:
+            extra_gebruikers = self.groei("gebruikers", len(gebruikers), config.groeiratio_gebruiker)
+
+            # Voeg nieuwe gebruikers toe, ze zijn direct beschikbaar
+            begin = len(gebruikers)
+            if config.backend == "cohort":
+                gebruikers.voeg_toe(extra_gebruikers, cash=config.initial_cash_user, data_utility=75, dag=iteratie)
+            elif config.backend != "object":
+                gebruikers.voeg_toe(extra_gebruikers, cash=config.initial_cash_user, data_utility=75)
+            else:
+                for i in range(begin, begin + extra_gebruikers):
+                    gebruiker = Gebruiker(i, cash=config.initial_cash_user, data_utility=75)
+                    gebruikers.append(gebruiker)
+            if config.backend != "cohort":
+                self.kalender.plan(iteratie, np.arange(begin, len(gebruikers)))
+        meet("groei")
+
+        # Utilities van gebruikers en speculators bijhouden (alleen op dagen die worden opgenomen)
+        self.recorder.neem_op(iteratie, self, moment="utilities")
+        meet("utilities")
+
+        # Elke iteratie betalen HostActiviteit en DataPool de setup fee
+        self.HostActiviteit1.setup_activiteit(self.Bra, token, hb, exchange)
+        self.DataPool1.setup_activiteit(self.DP, token, hb, exchange)
+        meet("setup_fees")
+
+        # Alleen gebruikers waarvan de wachttijd vandaag afloopt doen mee aan activiteiten
+        activiteiten = self.activiteiten
+        if config.backend == "cohort":
+            # Alle cohorten die vandaag beschikbaar worden in een keer, inclusief hun nieuwe wachttijd
+            gebruikers.deelname_activiteiten(self, iteratie)
+        else:
+            beschikbaar = self.kalender.beschikbaar(iteratie)
+            wereld = self.wereld("gebruikers")
+            if config.backend == "kernel":
+                # Dezelfde activiteiten in een (gecompileerde) lus over de kolommen
+                kernels.deelname_activiteiten(self, beschikbaar)
+            else:
+                if config.backend == "array":
+                    gebruikers.days_until_available[beschikbaar] = 0
+                for index in beschikbaar.tolist():
+                    gebruiker = gebruikers[index]
+                    if config.backend == "object":
+                        gebruiker.days_until_available = 0
+                    activiteit = random.choice(activiteiten)
+                    if isinstance(activiteit, StandaardActiviteit):
+                        activiteit.deelname_activiteit(wereld.token, wereld.exchange, gebruiker, wereld.hb)
+                    elif isinstance(activiteit, BurningActiviteit):
+                        activiteit.deelname_activiteit(wereld.token, wereld.exchange, gebruiker, wereld.Eco)
+                    elif isinstance(activiteit, MiningActiviteit):
+                        activiteit.deelname_activiteit(wereld.token, wereld.exchange, gebruiker, wereld.Min)
+                    elif isinstance(activiteit, DataPool):
+                        activiteit.deelname_activiteit(wereld.token, wereld.exchange, gebruiker, wereld.DP)
+                    elif isinstance(activiteit, HostActiviteit):
+                        activiteit.deelname_activiteit(wereld.token, wereld.exchange, gebruiker, wereld.Bra)
+
+            # Elke deelnemer heeft een nieuwe wachttijd gekregen: plan de dag waarop die afloopt
+            if config.backend != "object":
+                wachttijden = gebruikers.days_until_available[beschikbaar]
+            else:
+                wachttijden = [gebruikers[index].days_until_available for index in beschikbaar.tolist()]
+            self.kalender.plan_wachttijden(iteratie, beschikbaar, wachttijden)
+        meet("activiteiten")
+
+        # Activiteiten utilities bijhouden
+        self.recorder.neem_op(iteratie, self, moment="activiteiten")
+        meet("utilities")
+
+        # Groeimodel voor speculators
+        if iteratie % 30 == 0:
+            extra_speculators = self.groei("speculators", len(specs), config.groeiratio_speculators)
+
+            # Voeg nieuwe speculators toe
+            if config.backend != "object":
+                specs.voeg_toe(extra_speculators, cash=config.initial_cash_speculator)
+            else:
+                for i in range(len(specs), len(specs) + extra_speculators):
+                    spec = Speculator(i, cash=config.initial_cash_speculator)
+                    specs.append(spec)
+        meet("groei")
+
+        # Laat speculators handelen, in batch modus via het orderboek
+        markt = exchange.orderboek if config.afwikkeling == "batch" else self.wereld("speculators").exchange
+        if config.backend == "kernel" and config.afwikkeling == "direct":
+            # De kernel handelt direct op de exchange; in batch modus gaat de kernel backend via specs.handel
+            kernels.handel(self)
+        elif config.backend != "object":
+            specs.handel(markt)
+        else:
+            for spec in specs:
+                handelbare_tokens = spec.bepaal_aantal_tokens_om_te_handelen(token)
+                if spec.koop_utility(token) > spec.verkoop_utility(token):
+                    spec.koop_tokens(markt, handelbare_tokens)
+                elif spec.verkoop_utility(token) > spec.koop_utility(token):
+                    spec.verkoop_tokens(markt, handelbare_tokens)
+        if config.afwikkeling == "batch":
+            exchange.wikkel_af()
+        meet("handel")
+
+        # Update de marktprijs
+        exchange.update_marktprijs()
+        meet("marktprijs")
+
+        # Houd prijs, liquidity, burn en tokens op de markt per klasse bij
+        self.recorder.neem_op(iteratie, self)
+        meet("opname")
+
+        self.iteratie += 1
+        if self.checkpoints is not None:
+            self.checkpoints.na_stap(self)
+        return self.snapshot()
+
+    def iter_steps(self, aantal=None):
+        '''
+        Generator die per iteratie een Snapshot oplevert, tot het aantal iteraties uit de
+        configuratie bereikt is (of 'aantal' extra iteraties als dat is opgegeven)
+        '''
+        eind = self.config.iterations if aantal is None else self.iteratie + aantal
+        while self.iteratie < eind:
+            yield self.step()
+
+    def run(self):
+        # Draai de (rest van de) simulatie volledig door
+        for _ in self.iter_steps():
+            pass
+        return self
+
+    def resultaat(self):
+        '''
+        Compacte, picklebare samenvatting van de run: alle bijgehouden reeksen en de eindwaarden,
+        zonder de (grote) populaties van gebruikers en speculators
+        '''
+        recorder = self.recorder
+
+        def kopie(naam):
+            # Reeksen die niet zijn opgenomen (bijvoorbeeld met utility_opname="uit") worden None
+            return recorder.kolom(naam).copy() if naam in recorder.kolommen else None
+
+        return {
+            "iteraties": recorder.opgenomen_iteraties().copy(),
+            "vrijgave_per_iteratie": {naam: kolom.copy() for naam, kolom in recorder.groep("vrijgave").items()},
+            "marktprijs_over_time": recorder.kolom("prijs").copy(),
+            "liquidity_tokens_over_time": recorder.kolom("liquidity").copy(),
+            "circulerende_supply": recorder.kolom("circulerende_supply").copy(),
+            "burned": recorder.kolom("burned").copy(),
+            "hb_tokens": recorder.kolom("hb_tokens").copy(),
+            "tokens_op_markt_per_klasse": {naam: kolom.copy() for naam, kolom in recorder.groep("tokens_op_markt").items()},
+            "activiteiten_utilities": {naam: kolom.copy() for naam, kolom in recorder.groep("activiteit_utility").items()},
+            "gebruiker_utilities": kopie("gebruiker_utility"),
+            "gebruiker_utilities_fout": kopie("gebruiker_utility_fout"),
+            "speculator_koop_utilities": kopie("speculator_koop_utility"),
+            "speculator_koop_utilities_fout": kopie("speculator_koop_utility_fout"),
+            "speculator_verkoop_utilities": kopie("speculator_verkoop_utility"),
+            "speculator_verkoop_utilities_fout": kopie("speculator_verkoop_utility_fout"),
+            # Gewone floats, ook als een backend met NumPy rekent (zoals de cohort backend)
+            "eind": {
+                "prijs": float(self.token.get_prijs()),
+                "circulerende_supply": float(self.token.get_circulerende_tokens()),
+                "tokens_op_markt": float(self.exchange.tokens_op_markt),
+                "burned": float(self.hb.totale_burned_tokens),
+                "hb_tokens": float(self.hb.tokens),
+            },
+        }
@@ -0,0 +1,52 @@
+'''
+Beschikbaarheidskalender voor gebruikers
+
+Na een activiteit is een gebruiker 7 tot 28 dagen niet beschikbaar. In plaats van elke dag
+alle gebruikers langs te gaan (en de wachttijd van elke gebruiker met een te verlagen),
+zet de kalender elke gebruiker in het emmertje van de dag waarop die weer beschikbaar is.
+Per dag worden dan alleen de gebruikers uit het emmertje van die dag bezocht, zodat het
+bijhouden van de beschikbaarheid O(actieve gebruikers) kost in plaats van O(alle gebruikers).
+'''
+
+import numpy as np
+
+class BeschikbaarheidsKalender:
+    def __init__(self):
+        self.emmers = {} # dag -> lijst van arrays met gebruiker indices
+
+    def __deepcopy__(self, memo):
+        # De arrays in de emmertjes worden nooit aangepast, dus een kopie kan ze delen
+        kopie = BeschikbaarheidsKalender()
+        kopie.emmers = {dag: list(emmer) for dag, emmer in self.emmers.items()}
+        memo[id(self)] = kopie
+        return kopie
+
+    def __len__(self):
+        # Aantal ingeplande gebruikers
+        return sum(len(indices) for emmer in self.emmers.values() for indices in emmer)
+
+    def plan(self, dag, indices):
+        # Gebruikers die op 'dag' (weer) beschikbaar zijn
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices):
+            self.emmers.setdefault(dag, []).append(indices)
+
+    def plan_wachttijden(self, dag, indices, wachttijden):
+        '''
+        Plan gebruikers die op 'dag' een wachttijd hebben gekregen opnieuw in: een gebruiker met
+        wachttijd w is op dag + w weer beschikbaar
+        '''
+        indices = np.asarray(indices, dtype=np.int64)
+        wachttijden = np.asarray(wachttijden, dtype=np.int64)
+        for wachttijd in np.unique(wachttijden):
+            self.plan(dag + int(wachttijd), indices[wachttijden == wachttijd])
+
+    def beschikbaar(self, dag):
+        '''
+        Haalt de gebruikers op die op 'dag' beschikbaar worden, oplopend gesorteerd zodat ze in
+        dezelfde volgorde als in de populatie aan de beurt komen
+        '''
+        emmer = self.emmers.pop(dag, None)
+        if not emmer:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(emmer))
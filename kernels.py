@@ -0,0 +1,266 @@
+'''
+Gecompileerde kernels voor de activiteiten en de handel van de agents
+
+Met backend="kernel" staan gebruikers en speculators in kolommen (zoals bij de array backend),
+maar worden de activiteiten en de handel per agent in een lus over die kolommen uitgevoerd,
+met dezelfde regels als de klassen in hb_model.py (StandaardActiviteit.deelname_activiteit,
+Speculator.bepaal_aantal_tokens_om_te_handelen, Exchange.koop_tokens, ...). Als Numba
+geinstalleerd is worden de lussen gecompileerd (en op schijf gecachet, zodat alleen de eerste
+run de compilatie betaalt); zonder Numba draaien precies dezelfde functies als gewone Python.
+
+De gedeelde toestand (exchange, HB, ecosystem, ...) gaat als een array 'staat' naar de kernels.
+Alle willekeur wordt vooraf met de NumPy generator van de simulatie getrokken, zodat een run
+met en zonder Numba hetzelfde resultaat geeft. De kernels schrijven geen traces.
+'''
+
+import math
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HEEFT_NUMBA = numba is not None
+
+def _jit(functie):
+    # Compileer met Numba als dat beschikbaar is, anders blijft het een gewone Python functie
+    if numba is None:
+        return functie
+    return numba.njit(cache=True)(functie)
+
+# Posities in de staat array
+BESCHIKBAAR = 0        # Exchange.beschikbare_tokens
+VRAAG = 1              # Exchange.vraag
+AANBOD = 2             # Exchange.aanbod
+TOKENS_OP_MARKT = 3    # Exchange.tokens_op_markt
+LIQ_VRIJGEGEVEN = 4    # Liquidity.vrijgegeven_tokens
+LIQ_BESCHIKBAAR = 5    # Liquidity.beschikbare_vrijgegeven_tokens
+LIQ_TOEGEVOEGD = 6     # Tokens die de liquidity tijdens de kernel aan de exchange heeft toegevoegd
+HB_TOKENS = 7          # HB.tokens
+HB_BURNED = 8          # HB.totale_burned_tokens
+GEBURND = 9            # Tokens die uit de circulerende supply zijn geburnd
+ECOSYSTEM = 10         # Extra vrijgegeven tokens voor het Ecosystem
+MINING = 11            # Extra vrijgegeven tokens voor Mining
+BRAND_TOKENS = 12
+BRAND_CASH = 13
+DP_TOKENS = 14
+DP_CASH = 15
+STAAT_GROOTTE = 16
+
+# Volgorde van de activiteiten in Simulation.activiteiten
+STANDAARD, BURNING, MINING_ACTIVITEIT, DATAPOOL, HOST = 0, 1, 2, 3, 4
+
+WACHTTIJDEN = np.array([7, 14, 21, 28])
+WACHTTIJD_KANSEN = np.array([1, 1, 3, 1]) / 6 # Zelfde gewichten als Activiteiten.check_en_update_beschikbaarheid
+
+@_jit
+def _utility(a, b, tokens, cash, random_factor, prijs):
+    # random_factor * log(1 + a * tokens + b * cash + tokens * prijs), met 1 als de waarde niet positief is
+    value = 1 + a * tokens + b * cash + tokens * prijs
+    if value <= 0:
+        value = 1.0
+    return random_factor * math.log(value)
+
+@_jit
+def _koop(staat, aantal, cash, prijs):
+    '''
+    Zelfde regels als Exchange.koop_tokens: geeft het gekochte aantal terug (0 als de order niet doorgaat)
+    '''
+    if aantal > staat[BESCHIKBAAR]:
+        # Voeg tokens van Liquidity toe (zoals voeg_tokens_toe lukt dat alleen als ze nog niet op de markt staan)
+        liquidity = staat[LIQ_VRIJGEGEVEN]
+        if liquidity > 0 and liquidity <= staat[LIQ_BESCHIKBAAR]:
+            staat[BESCHIKBAAR] += liquidity
+            staat[AANBOD] += liquidity
+            staat[TOKENS_OP_MARKT] += liquidity
+            staat[LIQ_BESCHIKBAAR] -= liquidity
+            staat[LIQ_TOEGEVOEGD] += liquidity
+
+    if aantal <= staat[BESCHIKBAAR] and cash >= aantal * prijs:
+        staat[BESCHIKBAAR] -= aantal
+        staat[VRAAG] += aantal
+        return aantal
+    return 0.0
+
+@_jit
+def _koop_als_user(staat, aantal, cash, prijs, max_koop_bedrag):
+    # User.koop_tokens: het koopbedrag is begrensd
+    if aantal * prijs > max_koop_bedrag:
+        aantal = max_koop_bedrag / prijs
+    return _koop(staat, aantal, cash, prijs)
+
+@_jit
+def activiteiten_kernel(indices, tokens, cash, random_factor, data_utility, dagen, keuzes, wachttijden, inleg_cash, kansen,
+                        drempels, succes_kansen, prijs, setup_fee, pool_fee, max_koop_bedrag, staat):
+    '''
+    Laat de gebruikers in 'indices' (in die volgorde) elk aan hun activiteit 'keuzes[j]' deelnemen.
+    Elke deelnemer krijgt wachttijd 'wachttijden[j]'; inleg_cash en kansen zijn de vooraf getrokken
+    inleg (5 tot 10 euro) en de trekking voor het slagen van de activiteit.
+    '''
+    for j in range(len(indices)):
+        i = indices[j]
+        activiteit = keuzes[j]
+        dagen[i] = wachttijden[j]
+
+        # Activiteiten.bereken_threshold
+        drempel = drempels[activiteit] + math.log(1 + staat[TOKENS_OP_MARKT] / 100000)
+
+        if activiteit == STANDAARD or activiteit == BURNING or activiteit == MINING_ACTIVITEIT:
+            if _utility(3.0, 1.0, tokens[i], cash[i], random_factor[i], prijs) <= drempel:
+                continue
+            inleg_tokens = inleg_cash[j] / prijs
+            if activiteit == STANDAARD:
+                staat[HB_TOKENS] += inleg_tokens * 0.01 # Fee voor HB
+
+            # Gebruiker koopt de ontbrekende tokens
+            if tokens[i] < inleg_tokens:
+                gekocht = _koop_als_user(staat, inleg_tokens - tokens[i], cash[i], prijs, max_koop_bedrag)
+                tokens[i] += gekocht
+                cash[i] -= gekocht * prijs
+
+            gewonnen = kansen[j] < succes_kansen[activiteit]
+            if activiteit == STANDAARD:
+                if gewonnen:
+                    tokens[i] += 1.5 * inleg_tokens - inleg_tokens
+                else:
+                    tokens[i] -= inleg_tokens
+                    staat[HB_TOKENS] += inleg_tokens * 0.9
+                    staat[GEBURND] += inleg_tokens * 0.1
+                    staat[HB_BURNED] += inleg_tokens * 0.1
+            else:
+                tokens[i] -= inleg_tokens
+                if gewonnen:
+                    staat[GEBURND] += inleg_tokens
+                elif activiteit == BURNING:
+                    staat[ECOSYSTEM] += inleg_tokens
+                else:
+                    staat[MINING] += inleg_tokens
+
+        else:
+            # DataPool en HostActiviteit: een beloning van de data partner of de brand
+            if activiteit == DATAPOOL:
+                beloning = setup_fee / prijs * 0.05
+                doet_mee = data_utility[i] > drempel
+                partner_tokens, partner_cash = DP_TOKENS, DP_CASH
+            else:
+                beloning = pool_fee / prijs * 0.1
+                doet_mee = _utility(3.0, 1.0, tokens[i], cash[i], random_factor[i], prijs) > 3 * drempel
+                partner_tokens, partner_cash = BRAND_TOKENS, BRAND_CASH
+            if not doet_mee:
+                continue
+
+            if staat[partner_tokens] < beloning:
+                gekocht = _koop(staat, beloning - staat[partner_tokens], staat[partner_cash], prijs)
+                staat[partner_tokens] += gekocht
+                staat[partner_cash] -= gekocht * prijs
+
+            if staat[partner_tokens] >= beloning and kansen[j] < succes_kansen[activiteit]:
+                tokens[i] += beloning
+                staat[partner_tokens] -= beloning
+
+@_jit
+def handel_kernel(tokens, cash, random_factor, willekeur, prijs, max_koop_bedrag, staat):
+    '''
+    Laat alle speculators na elkaar handelen, met de regels van Speculator.bepaal_aantal_tokens_om_te_handelen,
+    User.koop_tokens en Exchange.koop_tokens/verkoop_tokens. 'willekeur' is de factor (0 tot 0.05) per speculator.
+    '''
+    for i in range(len(tokens)):
+        koop_utility = _utility(1.0, 2.0, tokens[i], cash[i], random_factor[i], prijs)
+        verkoop_utility = _utility(2.0, 1.0, tokens[i], cash[i], random_factor[i], prijs)
+
+        aantal = 0.0
+        if prijs != 0 and willekeur[i] != 0:
+            if koop_utility > verkoop_utility:
+                aantal = min(np.trunc(cash[i] * willekeur[i] / prijs), np.trunc(cash[i] / prijs))
+            elif koop_utility < verkoop_utility:
+                aantal = min(np.trunc(tokens[i] * willekeur[i]), np.trunc(tokens[i]))
+
+        if koop_utility > verkoop_utility:
+            gekocht = _koop_als_user(staat, aantal, cash[i], prijs, max_koop_bedrag)
+            tokens[i] += gekocht
+            cash[i] -= gekocht * prijs
+        elif verkoop_utility > koop_utility and aantal <= tokens[i]:
+            staat[BESCHIKBAAR] += aantal
+            staat[AANBOD] += aantal
+            tokens[i] -= aantal
+            cash[i] += aantal * prijs
+
+def lees_staat(simulatie):
+    exchange = simulatie.exchange
+    liquidity = simulatie.liquidity
+    staat = np.zeros(STAAT_GROOTTE)
+    staat[BESCHIKBAAR] = exchange.beschikbare_tokens
+    staat[VRAAG] = exchange.vraag
+    staat[AANBOD] = exchange.aanbod
+    staat[TOKENS_OP_MARKT] = exchange.tokens_op_markt
+    staat[LIQ_VRIJGEGEVEN] = liquidity.vrijgegeven_tokens
+    staat[LIQ_BESCHIKBAAR] = liquidity.beschikbare_vrijgegeven_tokens
+    staat[HB_TOKENS] = simulatie.hb.tokens
+    staat[HB_BURNED] = simulatie.hb.totale_burned_tokens
+    staat[BRAND_TOKENS] = simulatie.Bra.tokens
+    staat[BRAND_CASH] = simulatie.Bra.cash
+    staat[DP_TOKENS] = simulatie.DP.tokens
+    staat[DP_CASH] = simulatie.DP.cash
+    return staat
+
+def schrijf_staat(simulatie, staat):
+    exchange = simulatie.exchange
+    liquidity = simulatie.liquidity
+    exchange.beschikbare_tokens = float(staat[BESCHIKBAAR])
+    exchange.vraag = float(staat[VRAAG])
+    exchange.aanbod = float(staat[AANBOD])
+    exchange.tokens_op_markt = float(staat[TOKENS_OP_MARKT])
+    simulatie.hb.tokens = float(staat[HB_TOKENS])
+    simulatie.hb.totale_burned_tokens = float(staat[HB_BURNED])
+    simulatie.Bra.tokens = float(staat[BRAND_TOKENS])
+    simulatie.Bra.cash = float(staat[BRAND_CASH])
+    simulatie.DP.tokens = float(staat[DP_TOKENS])
+    simulatie.DP.cash = float(staat[DP_CASH])
+    simulatie.Eco.vrijgegeven_tokens += float(staat[ECOSYSTEM])
+    simulatie.Min.vrijgegeven_tokens += float(staat[MINING])
+    simulatie.token.burn_tokens(float(staat[GEBURND]))
+
+    # De rest van de boekhouding van Exchange.voeg_tokens_toe voor liquidity die de kernel heeft toegevoegd
+    toegevoegd = float(staat[LIQ_TOEGEVOEGD])
+    if toegevoegd > 0:
+        liquidity.beschikbare_vrijgegeven_tokens = float(staat[LIQ_BESCHIKBAAR])
+        liquidity.tokens_op_markt += toegevoegd
+        exchange.token_houders[liquidity] = exchange.token_houders.get(liquidity, 0) + toegevoegd
+        simulatie.token.maandelijkse_supply_vrijgeven(toegevoegd)
+
+def deelname_activiteiten(simulatie, beschikbaar):
+    '''
+    Kernel versie van de activiteiten lus in Simulation.step, voor de gebruikers in 'beschikbaar'
+    '''
+    rng = simulatie.rng
+    gebruikers = simulatie.gebruikers
+    activiteiten = simulatie.activiteiten
+    aantal = len(beschikbaar)
+
+    staat = lees_staat(simulatie)
+    activiteiten_kernel(
+        beschikbaar, gebruikers.tokens, gebruikers.cash, gebruikers.random_factor, gebruikers.data_utility,
+        gebruikers.days_until_available,
+        rng.integers(0, len(activiteiten), aantal),
+        rng.choice(WACHTTIJDEN, size=aantal, p=WACHTTIJD_KANSEN),
+        rng.uniform(5, 10, aantal),
+        rng.random(aantal),
+        np.array([activiteit.activity_threshold for activiteit in activiteiten], dtype=float),
+        np.array([activiteit.probability for activiteit in activiteiten], dtype=float),
+        simulatie.token.get_prijs(), float(simulatie.DataPool1.setup_fee), float(simulatie.HostActiviteit1.pool_fee),
+        float(gebruikers.rij_klasse.max_koop_bedrag), staat
+    )
+    schrijf_staat(simulatie, staat)
+
+def handel(simulatie):
+    '''
+    Kernel versie van de handel van de speculators in Simulation.step (directe afwikkeling)
+    '''
+    specs = simulatie.specs
+    staat = lees_staat(simulatie)
+    handel_kernel(
+        specs.tokens, specs.cash, specs.random_factor, simulatie.rng.uniform(0, 0.05, len(specs)),
+        simulatie.token.get_prijs(), float(specs.max_koop_bedrag), staat
+    )
+    schrijf_staat(simulatie, staat)
@@ -0,0 +1,168 @@
+'''
+Lokale opslag van simulatie runs
+
+Elke run krijgt een rij in een SQLite index (index.sqlite) met de sleutel van de run
+(config_hash van configuratie en seed), een hash van alleen de configuratie, de seed, de
+versie van de model code, de configuratie zelf als JSON en een samenvatting (eindwaarden,
+laagste en hoogste prijs). De tijdreeksen van een run staan als losse .npy bestanden in een
+eigen map, een bestand per reeks, zodat ze met np.load(..., mmap_mode="r") gelezen kunnen
+worden zonder de hele run (of alle runs) in het geheugen te laden.
+
+Voorbeeld:
+    opslag = RunOpslag(".hb_runs")
+    opslag.bewaar(config, seed, simulatie.resultaat())
+    runs = opslag.zoek("eind_prijs > ? AND json_extract(config, '$.elasticiteit') = ?", (0.0002, 0.5))
+    prijs = opslag.reeks(runs["sleutel"][0], "marktprijs_over_time")  # memory-mapped
+'''
+
+import os
+import json
+import uuid
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from cache import config_hash, code_versie
+
+# Samenvatting per run, als kolommen van de index
+SAMENVATTING = ["eind_prijs", "eind_circulerende_supply", "eind_tokens_op_markt", "eind_burned", "eind_hb_tokens",
+                "min_prijs", "max_prijs"]
+
+def samenvatting(resultaat):
+    # Enkele getallen per run: de eindwaarden en het verloop van de prijs
+    prijs = resultaat["marktprijs_over_time"]
+    rij = {f"eind_{naam}": waarde for naam, waarde in resultaat["eind"].items()}
+    rij["min_prijs"] = float(np.min(prijs)) if len(prijs) else np.nan
+    rij["max_prijs"] = float(np.max(prijs)) if len(prijs) else np.nan
+    return rij
+
+def _config_json(config):
+    return json.dumps(vars(config), sort_keys=True, separators=(",", ":"), default=str)
+
+class RunOpslag:
+    def __init__(self, map_=".hb_runs"):
+        self.map = map_
+        os.makedirs(os.path.join(self.map, "runs"), exist_ok=True)
+        # Streamlit voert elke rerun in een andere thread uit, met dezelfde (gecachete) opslag
+        self.db = sqlite3.connect(os.path.join(self.map, "index.sqlite"), check_same_thread=False)
+        samenvatting_kolommen = "".join(f", {naam} REAL" for naam in SAMENVATTING)
+        self.db.execute(f"""
+            CREATE TABLE IF NOT EXISTS runs (
+                sleutel TEXT PRIMARY KEY, config_hash TEXT, seed INTEGER, code_versie TEXT,
+                datum TEXT, iteraties INTEGER, config TEXT{samenvatting_kolommen})""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS runs_config ON runs (config_hash, seed)")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def _run_map(self, sleutel):
+        return os.path.join(self.map, "runs", sleutel)
+
+    def __contains__(self, sleutel):
+        return self.db.execute("SELECT 1 FROM runs WHERE sleutel = ?", (sleutel,)).fetchone() is not None
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def bewaar(self, config, seed, resultaat):
+        '''
+        Bewaart de tijdreeksen en de samenvatting van een run en geeft de sleutel terug.
+        Een run met dezelfde sleutel wordt overschreven; runs zonder seed krijgen altijd een eigen sleutel.
+        '''
+        sleutel = config_hash(config, seed) if seed is not None else config_hash(config, seed, run=uuid.uuid4().hex)
+
+        # Reeksen in een tijdelijke map schrijven en die daarna in een keer op zijn plaats zetten
+        run_map = self._run_map(sleutel)
+        tijdelijk = run_map + ".tmp"
+        shutil.rmtree(tijdelijk, ignore_errors=True)
+        os.makedirs(tijdelijk)
+        for naam, waarde in resultaat.items():
+            if isinstance(waarde, dict):
+                if naam == "eind":
+                    continue
+                os.makedirs(os.path.join(tijdelijk, naam))
+                for deel, reeks in waarde.items():
+                    np.save(os.path.join(tijdelijk, naam, f"{deel}.npy"), reeks)
+            elif waarde is not None:
+                np.save(os.path.join(tijdelijk, f"{naam}.npy"), waarde)
+        shutil.rmtree(run_map, ignore_errors=True)
+        os.replace(tijdelijk, run_map)
+
+        rij = samenvatting(resultaat)
+        config_tekst = _config_json(config)
+        waarden = [sleutel, hashlib.sha256(config_tekst.encode("utf-8")).hexdigest(), seed, code_versie(),
+                   datetime.now().isoformat(timespec="seconds"), len(resultaat["iteraties"]), config_tekst]
+        waarden += [rij.get(naam) for naam in SAMENVATTING]
+        vraagtekens = ", ".join("?" * len(waarden))
+        self.db.execute(f"INSERT OR REPLACE INTO runs VALUES ({vraagtekens})", waarden)
+        self.db.commit()
+        return sleutel
+
+    def zoek(self, voorwaarde=None, parameters=()):
+        '''
+        De index als tabel, eventueel alleen de runs die aan een SQL voorwaarde voldoen.
+        Velden van de configuratie zijn te gebruiken met json_extract(config, '$.veld').
+        '''
+        sql = "SELECT * FROM runs" + (f" WHERE {voorwaarde}" if voorwaarde else "") + " ORDER BY datum"
+        return pd.read_sql_query(sql, self.db, params=parameters)
+
+    def samenvattingen(self, sleutels):
+        # Samenvatting per sleutel, voor de sleutels die in de opslag staan
+        samenvattingen = {}
+        sleutels = list(sleutels)
+        for begin in range(0, len(sleutels), 500): # SQLite begrenst het aantal parameters per query
+            deel = sleutels[begin:begin + 500]
+            vraagtekens = ", ".join("?" * len(deel))
+            for sleutel, *waarden in self.db.execute(f"SELECT sleutel, {', '.join(SAMENVATTING)} FROM runs WHERE sleutel IN ({vraagtekens})", deel):
+                samenvattingen[sleutel] = dict(zip(SAMENVATTING, waarden))
+        return samenvattingen
+
+    def reeksen(self, sleutel):
+        # Namen van de bewaarde reeksen van een run, zoals "marktprijs_over_time" of "tokens_op_markt_per_klasse/Mining"
+        run_map = self._run_map(sleutel)
+        namen = []
+        for map_, _, bestanden in os.walk(run_map):
+            for bestand in bestanden:
+                if bestand.endswith(".npy"):
+                    pad = os.path.relpath(os.path.join(map_, bestand[:-4]), run_map)
+                    namen.append(pad.replace(os.sep, "/"))
+        return sorted(namen)
+
+    def reeks(self, sleutel, naam, mmap=True):
+        # Een reeks van een run; standaard memory-mapped (alleen-lezen), zodat er niets in het geheugen geladen wordt
+        pad = os.path.join(self._run_map(sleutel), *naam.split("/")) + ".npy"
+        if not os.path.exists(pad):
+            raise KeyError(f"Run {sleutel} heeft geen reeks {naam}")
+        return np.load(pad, mmap_mode="r" if mmap else None)
+
+    def resultaat(self, sleutel, mmap=True):
+        '''
+        Bouwt het resultaat van een run weer op in de vorm van Simulation.resultaat(), met de
+        eindwaarden uit de index en (memory-mapped) reeksen
+        '''
+        rij = self.db.execute("SELECT eind_prijs, eind_circulerende_supply, eind_tokens_op_markt, eind_burned, eind_hb_tokens "
+                              "FROM runs WHERE sleutel = ?", (sleutel,)).fetchone()
+        if rij is None:
+            raise KeyError(f"Onbekende run {sleutel}")
+
+        resultaat = {
+            "gebruiker_utilities": None, "gebruiker_utilities_fout": None,
+            "speculator_koop_utilities": None, "speculator_koop_utilities_fout": None,
+            "speculator_verkoop_utilities": None, "speculator_verkoop_utilities_fout": None,
+        }
+        for naam in self.reeksen(sleutel):
+            groep, _, deel = naam.partition("/")
+            if deel:
+                resultaat.setdefault(groep, {})[deel] = self.reeks(sleutel, naam, mmap)
+            else:
+                resultaat[groep] = self.reeks(sleutel, naam, mmap)
+        resultaat["eind"] = dict(zip(["prijs", "circulerende_supply", "tokens_op_markt", "burned", "hb_tokens"], rij))
+        return resultaat
+
+    def verwijder(self, sleutel):
+        shutil.rmtree(self._run_map(sleutel), ignore_errors=True)
+        self.db.execute("DELETE FROM runs WHERE sleutel = ?", (sleutel,))
+        self.db.commit()
@@ -0,0 +1,258 @@
+'''
+Kolom-gebaseerde (struct-of-arrays) opslag van agent populaties
+
+In plaats van een Python object per gebruiker staat elke eigenschap in een eigen
+aaneengesloten NumPy array. De simulatie kan zo per dag over de hele populatie
+rekenen, terwijl de bestaande klassen via een rij-object (PopulatieRij) nog steeds
+met een enkele gebruiker kunnen werken.
+
+Een kopie van een populatie (copy.deepcopy, bijvoorbeeld bij het forken van een simulatie)
+deelt de kolommen copy-on-write: een kolom wordt pas gekopieerd als een van beide kanten erin
+gaat schrijven. Kolommen die alleen gelezen worden (zoals random_factor) blijven gedeeld.
+'''
+
+import copy
+import random
+import numpy as np
+
+class PopulatieRij:
+    '''
+    Mixin die de attributen van een agent doorverwijst naar een rij in een populatie.
+    Wordt gecombineerd met een bestaande agent klasse, bijvoorbeeld:
+    class PopulatieGebruiker(PopulatieRij, Gebruiker)
+    '''
+    def __init__(self, populatie, index):
+        object.__setattr__(self, "populatie", populatie)
+        object.__setattr__(self, "index", index)
+        self.id = index
+
+    def __getattr__(self, naam):
+        # Wordt alleen aangeroepen als het attribuut niet op het object zelf staat
+        kolommen = self.populatie.kolommen
+        if naam in kolommen:
+            return kolommen[naam][self.index].item()
+        raise AttributeError(f"{self.__class__.__name__} heeft geen attribuut {naam}")
+
+    def __setattr__(self, naam, waarde):
+        if naam in self.populatie.kolommen:
+            self.populatie.kolom(naam)[self.index] = waarde
+        else:
+            object.__setattr__(self, naam, waarde)
+
+class Populatie:
+    '''
+    Basis klasse voor een populatie: beheert de kolommen en de capaciteit.
+    Subklassen definieren welke kolommen er zijn via KOLOMMEN (naam -> dtype).
+    '''
+    KOLOMMEN = {}
+
+    def __init__(self, rij_klasse=None, capaciteit=1024, rng=None):
+        self.rij_klasse = rij_klasse
+        self.rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+        self.aantal = 0
+        self.kolommen = {naam: np.zeros(capaciteit, dtype=dtype) for naam, dtype in self.KOLOMMEN.items()}
+        self.gedeeld = set() # Kolommen die (alleen-lezen) met een kopie van de populatie gedeeld worden
+
+    def __deepcopy__(self, memo):
+        # De kopie deelt de kolommen; beide kanten kopieren een kolom pas bij de eerste schrijfactie
+        kopie = copy.copy(self)
+        memo[id(self)] = kopie
+        for kolom in self.kolommen.values():
+            kolom.setflags(write=False)
+        self.gedeeld = set(self.kolommen)
+        kopie.kolommen = dict(self.kolommen)
+        kopie.gedeeld = set(self.kolommen)
+        kopie.rng = copy.deepcopy(self.rng, memo)
+        return kopie
+
+    def __len__(self):
+        return self.aantal
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.aantal:
+            raise IndexError(f"Index {index} valt buiten de populatie van {self.aantal}")
+        return self.rij_klasse(self, index)
+
+    def __iter__(self):
+        for index in range(self.aantal):
+            yield self.rij_klasse(self, index)
+
+    def capaciteit(self):
+        return len(next(iter(self.kolommen.values())))
+
+    def reserveer(self, aantal):
+        # Vergroot de kolommen (verdubbelen) zodat er ruimte is voor 'aantal' agents
+        capaciteit = self.capaciteit()
+        if aantal <= capaciteit:
+            return
+
+        while capaciteit < aantal:
+            capaciteit *= 2
+
+        for naam, kolom in self.kolommen.items():
+            nieuwe_kolom = np.zeros(capaciteit, dtype=kolom.dtype)
+            nieuwe_kolom[:self.aantal] = kolom[:self.aantal]
+            self.kolommen[naam] = nieuwe_kolom
+        self.gedeeld.clear()
+
+    def _nieuwe_rijen(self, aantal):
+        # Reserveer 'aantal' nieuwe rijen en geef het slice van die rijen terug
+        begin = self.aantal
+        self.reserveer(begin + aantal)
+        for naam in list(self.gedeeld):
+            self._maak_eigen(naam)
+        self.aantal += aantal
+        return slice(begin, self.aantal)
+
+    def _maak_eigen(self, naam):
+        # Eigen (schrijfbare) kopie van een gedeelde kolom
+        self.kolommen[naam] = self.kolommen[naam].copy()
+        self.gedeeld.discard(naam)
+
+    def kolom(self, naam):
+        # View op het actieve deel van een kolom (geen kopie), om in te schrijven
+        if naam in self.gedeeld:
+            self._maak_eigen(naam)
+        return self.kolommen[naam][:self.aantal]
+
+    def lees_kolom(self, naam):
+        # View op het actieve deel van een kolom om alleen te lezen; een gedeelde kolom blijft gedeeld
+        return self.kolommen[naam][:self.aantal]
+
+    def rijen(self, namen, indices=None):
+        # De kolommen 'namen' (om te lezen) voor alle agents, of alleen voor de rijen in 'indices'
+        if indices is None:
+            return [self.lees_kolom(naam) for naam in namen]
+        return [self.kolommen[naam][indices] for naam in namen]
+
+class GebruikersPopulatie(Populatie):
+    '''
+    Kolom opslag voor Gebruikers (cash, tokens, random_factor, days_until_available, data_utility)
+    '''
+    KOLOMMEN = {
+        "cash": np.float64,
+        "tokens": np.float64,
+        "random_factor": np.float64,
+        "days_until_available": np.int64,
+        "data_utility": np.float64,
+    }
+
+    @property
+    def cash(self):
+        return self.kolom("cash")
+
+    @property
+    def tokens(self):
+        return self.kolom("tokens")
+
+    @property
+    def random_factor(self):
+        return self.lees_kolom("random_factor")
+
+    @property
+    def days_until_available(self):
+        return self.kolom("days_until_available")
+
+    @property
+    def data_utility(self):
+        return self.lees_kolom("data_utility")
+
+    def voeg_toe(self, aantal, cash, data_utility, random_factor=None):
+        rijen = self._nieuwe_rijen(aantal)
+        self.kolommen["cash"][rijen] = cash
+        self.kolommen["tokens"][rijen] = 0 # Elke user begint met 0 tokens
+        self.kolommen["random_factor"][rijen] = random_factor if random_factor is not None else self.rng.uniform(1, 5, aantal)
+        self.kolommen["days_until_available"][rijen] = 0
+        self.kolommen["data_utility"][rijen] = data_utility
+        return rijen
+
+    def activiteit_utilities(self, prijs, indices=None):
+        # Zelfde formule als Gebruiker.activiteit_utility, maar voor alle gebruikers (of alleen 'indices') tegelijk
+        tokens, cash, random_factor = self.rijen(["tokens", "cash", "random_factor"], indices)
+        value = 1 + 3 * tokens + 1 * cash + (tokens * prijs)
+        value = np.where(value <= 0, 1, value)
+        return random_factor * np.log(value)
+
+class SpeculatorPopulatie(Populatie):
+    '''
+    Kolom opslag voor Speculators (cash, tokens, koop_threshold, verkoop_threshold, random_factor)
+    '''
+    KOLOMMEN = {
+        "cash": np.float64,
+        "tokens": np.float64,
+        "koop_threshold": np.float64,
+        "verkoop_threshold": np.float64,
+        "random_factor": np.float64,
+    }
+    max_koop_bedrag = 5000
+
+    @property
+    def cash(self):
+        return self.kolom("cash")
+
+    @property
+    def tokens(self):
+        return self.kolom("tokens")
+
+    @property
+    def random_factor(self):
+        return self.lees_kolom("random_factor")
+
+    def voeg_toe(self, aantal, cash):
+        rijen = self._nieuwe_rijen(aantal)
+        self.kolommen["cash"][rijen] = cash
+        self.kolommen["tokens"][rijen] = 0 # Elke user begint met 0 tokens
+        self.kolommen["koop_threshold"][rijen] = self.rng.normal(5, 1, aantal)
+        self.kolommen["verkoop_threshold"][rijen] = self.rng.normal(5, 1, aantal)
+        self.kolommen["random_factor"][rijen] = self.rng.uniform(1, 5, aantal)
+        return rijen
+
+    def koop_utilities(self, prijs, indices=None):
+        # Zelfde formule als Speculator.koop_utility
+        tokens, cash, random_factor = self.rijen(["tokens", "cash", "random_factor"], indices)
+        value = 1 + 1 * tokens + 2 * cash + tokens * prijs
+        value = np.where(value <= 0, 1, value)
+        return random_factor * np.log(value)
+
+    def verkoop_utilities(self, prijs, indices=None):
+        # Zelfde formule als Speculator.verkoop_utility
+        tokens, cash, random_factor = self.rijen(["tokens", "cash", "random_factor"], indices)
+        value = 1 + 2 * tokens + 1 * cash + tokens * prijs
+        value = np.where(value <= 0, 1, value)
+        return random_factor * np.log(value)
+
+    def bepaal_handel(self, prijs):
+        '''
+        Bepaalt voor alle speculators tegelijk hoeveel tokens ze kopen en verkopen,
+        volgens dezelfde regels als Speculator.bepaal_aantal_tokens_om_te_handelen en User.koop_tokens
+        '''
+        koop_utility = self.koop_utilities(prijs)
+        verkoop_utility = self.verkoop_utilities(prijs)
+
+        # Per speculator een willekeurige factor tussen 0 en 0.05
+        random_factor = self.rng.uniform(0, 0.05, self.aantal)
+
+        koop_aantallen = np.zeros(self.aantal)
+        verkoop_aantallen = np.zeros(self.aantal)
+        if prijs == 0:
+            return koop_aantallen, verkoop_aantallen # Vermijd deling door nul
+
+        kopers = (koop_utility > verkoop_utility) & (random_factor > 0)
+        verkopers = (koop_utility < verkoop_utility) & (random_factor > 0)
+
+        # Kopen met maximaal 5% van de cash, begrensd door het maximale koopbedrag
+        max_tokens = np.trunc(self.cash * random_factor / prijs)
+        koop_aantallen[kopers] = np.minimum(max_tokens, np.trunc(self.cash / prijs))[kopers]
+        te_duur = koop_aantallen * prijs > self.max_koop_bedrag
+        koop_aantallen[te_duur] = self.max_koop_bedrag / prijs
+
+        # Verkopen met maximaal 5% van de tokens
+        max_tokens = np.trunc(self.tokens * random_factor)
+        verkoop_aantallen[verkopers] = np.minimum(max_tokens, np.trunc(self.tokens))[verkopers]
+
+        return koop_aantallen, verkoop_aantallen
+
+    def handel(self, exchange):
+        # Alle orders van de speculators in een keer, met dezelfde uitkomst als een order per speculator (zie Exchange.handel_bulk)
+        koop_aantallen, verkoop_aantallen = self.bepaal_handel(exchange.token.get_prijs())
+        exchange.handel_bulk(self.tokens, self.cash, koop_aantallen, verkoop_aantallen, exchange.liquidity)
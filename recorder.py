@@ -0,0 +1,69 @@
+'''
+Tijdreeks recorder met vooraf gealloceerde NumPy kolommen
+
+Metrics worden een keer geregistreerd met een functie die de waarde uit de simulatie leest.
+De recorder schrijft elke 'cadans' iteraties een rij in kolommen die vooraf op het aantal
+iteraties zijn gealloceerd, zodat er tijdens de simulatie geen lijsten groeien en grafieken
+en exports de kolommen direct (zonder kopie) kunnen gebruiken.
+'''
+
+import math
+import numpy as np
+
+class Recorder:
+    def __init__(self, iterations, cadans=1):
+        self.cadans = max(1, int(cadans))
+        self.capaciteit = max(1, math.ceil(iterations / self.cadans))
+        self.aantal = 0
+        self.iteraties = np.zeros(self.capaciteit, dtype=np.int64)
+        self.kolommen = {}
+        self.metrics = {} # moment -> lijst van (naam, functie)
+
+    def registreer(self, naam, functie, moment="eind"):
+        '''
+        Registreer een metric. 'functie' krijgt de bron (de simulatie) mee en geeft een getal terug.
+        'moment' bepaalt op welk punt in een iteratie de waarde wordt gelezen; een rij is
+        compleet als het moment "eind" is opgenomen.
+        '''
+        if naam in self.kolommen:
+            raise ValueError(f"Metric {naam} is al geregistreerd")
+        self.kolommen[naam] = np.full(self.capaciteit, np.nan)
+        self.metrics.setdefault(moment, []).append((naam, functie))
+
+    def neem_op(self, iteratie, bron, moment="eind"):
+        if iteratie % self.cadans != 0:
+            return
+
+        # Als er langer gesimuleerd wordt dan gepland groeien de kolommen (verdubbelen)
+        if self.aantal == self.capaciteit:
+            self._vergroot()
+
+        rij = self.aantal
+        for naam, functie in self.metrics.get(moment, []):
+            self.kolommen[naam][rij] = functie(bron)
+
+        if moment == "eind":
+            self.iteraties[rij] = iteratie
+            self.aantal += 1
+
+    def _vergroot(self):
+        self.capaciteit *= 2
+        for naam, kolom in self.kolommen.items():
+            nieuwe_kolom = np.full(self.capaciteit, np.nan)
+            nieuwe_kolom[:self.aantal] = kolom[:self.aantal]
+            self.kolommen[naam] = nieuwe_kolom
+        iteraties = np.zeros(self.capaciteit, dtype=np.int64)
+        iteraties[:self.aantal] = self.iteraties[:self.aantal]
+        self.iteraties = iteraties
+
+    def kolom(self, naam):
+        # View op de opgenomen waarden van een metric (geen kopie)
+        return self.kolommen[naam][:self.aantal]
+
+    def groep(self, prefix):
+        # Alle metrics met namen als "prefix/naam", als dictionary naam -> kolom
+        begin = prefix + "/"
+        return {naam[len(begin):]: self.kolom(naam) for naam in self.kolommen if naam.startswith(begin)}
+
+    def opgenomen_iteraties(self):
+        return self.iteraties[:self.aantal]
@@ -0,0 +1,154 @@
+'''
+Parameter sweeps over de velden van de Configuratie
+
+Een sweep bestaat uit jobs: een combinatie van instellingen (argumenten van Configuratie) en
+een seed. De instellingen komen uit een raster (alle combinaties van de opgegeven waarden) of
+uit een lijst van losse configuraties. Elke combinatie wordt 'herhalingen' keer gedraaid; de
+seeds worden afgeleid van een master seed en zijn voor elke combinatie gelijk, zodat verschillen
+tussen combinaties niet door toevallig andere random getallen komen.
+
+De jobs draaien verdeeld over een process pool. Met een ResultaatCache en/of een RunOpslag worden
+jobs waarvan het resultaat al bewaard is (ook uit de Streamlit app, met dezelfde sleutel)
+overgeslagen, en wordt elk nieuw resultaat direct bewaard, zodat een afgebroken sweep verder kan
+waar die gebleven was.
+De uitkomst is een tabel (pandas DataFrame) met een rij per job.
+
+Gebruik:
+    jobs = maak_jobs(raster({"elasticiteit": [0.3, 0.5, 0.7], "tge_psa": [60, 80]}), basis={"iterations": 365}, herhalingen=5)
+    tabel = draai_sweep(jobs, cache=ResultaatCache(map_=".hb_cache"))
+
+    python sweep.py --raster elasticiteit=0.3,0.5,0.7 tge_psa=60,80 --basis iterations=365 --herhalingen 5
+'''
+
+import os
+import json
+import argparse
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from hb_model import Configuratie, Simulation
+from ensemble import seeds_voor_runs
+from cache import ResultaatCache, config_hash
+from opslag import RunOpslag, samenvatting
+
+Job = namedtuple("Job", ["nummer", "instellingen", "herhaling", "seed"])
+
+def raster(velden):
+    '''
+    Alle combinaties van de waarden per veld, bijvoorbeeld
+    raster({"elasticiteit": [0.3, 0.5], "tge_psa": [60, 80]}) geeft vier dictionaries
+    '''
+    namen = list(velden)
+    return [dict(zip(namen, waarden)) for waarden in itertools.product(*(velden[naam] for naam in namen))]
+
+def maak_jobs(instellingen, basis=None, herhalingen=1, master_seed=0):
+    '''
+    Jobs voor een lijst van instellingen (dictionaries met argumenten van Configuratie), elk met
+    'herhalingen' seeds. 'basis' bevat de argumenten die voor alle jobs gelijk zijn.
+    '''
+    basis = basis or {}
+    seeds = seeds_voor_runs(master_seed, herhalingen)
+    jobs = []
+    for combinatie in instellingen:
+        for herhaling, seed in enumerate(seeds):
+            jobs.append(Job(len(jobs), {**basis, **combinatie}, herhaling, seed))
+    return jobs
+
+def draai_job(config, seed):
+    return Simulation(config, seed=seed).run().resultaat()
+
+def draai_sweep(jobs, cache=None, opslag=None, max_workers=None, rapporteer=None):
+    '''
+    Draait alle jobs en geeft een tabel terug met per job de instellingen, de seed, of het
+    resultaat al bewaard was en de samenvatting van het resultaat. 'rapporteer' wordt na
+    elke job aangeroepen met (aantal klaar, aantal jobs).
+    '''
+    configs = {job.nummer: Configuratie(**job.instellingen) for job in jobs}
+    sleutels = {job.nummer: config_hash(configs[job.nummer], job.seed) for job in jobs}
+
+    # Eerst in de run opslag kijken (alleen de index), daarna in de cache
+    samenvattingen = {}
+    bewaard = opslag.samenvattingen(sleutels.values()) if opslag is not None else {}
+    uit_cache = set()
+    te_draaien = []
+    for job in jobs:
+        sleutel = sleutels[job.nummer]
+        resultaat = cache.get(sleutel) if cache is not None and sleutel not in bewaard else None
+        if sleutel in bewaard:
+            samenvattingen[job.nummer] = bewaard[sleutel]
+            uit_cache.add(job.nummer)
+        elif resultaat is not None:
+            samenvattingen[job.nummer] = samenvatting(resultaat)
+            uit_cache.add(job.nummer)
+            if opslag is not None:
+                opslag.bewaar(configs[job.nummer], job.seed, resultaat)
+        else:
+            te_draaien.append(job)
+
+    def klaar(job, resultaat):
+        if cache is not None:
+            cache.put(sleutels[job.nummer], resultaat)
+        if opslag is not None:
+            opslag.bewaar(configs[job.nummer], job.seed, resultaat)
+        samenvattingen[job.nummer] = samenvatting(resultaat)
+        if rapporteer is not None:
+            rapporteer(len(samenvattingen), len(jobs))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for job in te_draaien:
+            klaar(job, draai_job(configs[job.nummer], job.seed))
+    elif te_draaien:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            # Resultaten worden verwerkt zodra ze klaar zijn, zodat de cache ook bij een afgebroken sweep bijgewerkt is
+            futures = {pool.submit(draai_job, configs[job.nummer], job.seed): job for job in te_draaien}
+            for future in as_completed(futures):
+                klaar(futures[future], future.result())
+
+    rijen = []
+    for job in jobs:
+        rij = {"job": job.nummer, **job.instellingen, "herhaling": job.herhaling, "seed": job.seed,
+               "uit_cache": job.nummer in uit_cache}
+        rij.update(samenvattingen[job.nummer])
+        rijen.append(rij)
+    return pd.DataFrame(rijen)
+
+def _lees_velden(teksten):
+    # "naam=1,2,3" -> {"naam": [1, 2, 3]}; waarden die geen JSON zijn blijven tekst
+    velden = {}
+    for tekst in teksten:
+        naam, _, waarden = tekst.partition("=")
+        velden[naam] = []
+        for waarde in waarden.split(","):
+            try:
+                velden[naam].append(json.loads(waarde))
+            except ValueError:
+                velden[naam].append(waarde)
+    return velden
+
+def main(argumenten=None):
+    parser = argparse.ArgumentParser(description="Parameter sweep voor het HB model")
+    parser.add_argument("--raster", nargs="+", default=[], help="Velden met waarden, bijvoorbeeld elasticiteit=0.3,0.5,0.7")
+    parser.add_argument("--basis", nargs="+", default=[], help="Vaste velden voor alle jobs, bijvoorbeeld iterations=365")
+    parser.add_argument("--herhalingen", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0, help="Master seed voor de seeds van de herhalingen")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=".hb_cache", help="Map van de resultaat cache (leeg voor geen cache)")
+    parser.add_argument("--opslag", default=".hb_runs", help="Map van de run opslag (leeg voor geen opslag)")
+    parser.add_argument("--uitvoer", default="sweep_resultaten.csv")
+    args = parser.parse_args(argumenten)
+
+    basis = {naam: waarden[0] for naam, waarden in _lees_velden(args.basis).items()}
+    jobs = maak_jobs(raster(_lees_velden(args.raster)), basis=basis, herhalingen=args.herhalingen, master_seed=args.seed)
+    cache = ResultaatCache(map_=args.cache) if args.cache else None
+    opslag = RunOpslag(args.opslag) if args.opslag else None
+
+    tabel = draai_sweep(jobs, cache=cache, opslag=opslag, max_workers=args.workers,
+                        rapporteer=lambda klaar, totaal: print(f"\r{klaar}/{totaal} jobs", end="", flush=True))
+    print()
+    tabel.to_csv(args.uitvoer, index=False)
+    print(f"{len(tabel)} jobs ({int(tabel['uit_cache'].sum())} uit de cache), opgeslagen in {args.uitvoer}")
+
+if __name__ == "__main__":
+    main()
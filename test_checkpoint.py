@@ -0,0 +1,57 @@
+'''
+Een run die na een checkpoint verder gaat moet precies hetzelfde resultaat geven als een run die
+niet onderbroken is, voor elke backend die checkpoints ondersteunt. De cohort backend en runs met
+representatieve agents worden geweigerd.
+'''
+
+import numpy as np
+import pytest
+from hb_model import Configuratie, Simulation
+from checkpoint import sla_checkpoint_op, laad_checkpoint
+
+def config(backend, **extra):
+    return Configuratie(aantal_gebruikers=300, aantal_speculators=60, iterations=80, backend=backend, **extra)
+
+def vergelijk(verwacht, uitkomst, pad="resultaat"):
+    if isinstance(verwacht, dict):
+        assert sorted(uitkomst) == sorted(verwacht), pad
+        for naam, waarde in verwacht.items():
+            vergelijk(waarde, uitkomst[naam], f"{pad}/{naam}")
+    elif isinstance(verwacht, np.ndarray):
+        np.testing.assert_array_equal(uitkomst, verwacht, err_msg=pad)
+    else:
+        assert uitkomst == verwacht, pad
+
+@pytest.mark.parametrize("backend, extra", [
+    ("object", {}),
+    ("array", {}),
+    ("kernel", {}),
+    ("array", {"utility_opname": "steekproef", "utility_steekproef": 50}), # Ook de statistiek_rng gaat mee
+    ("array", {"afwikkeling": "batch"}),
+])
+def test_verder_na_checkpoint_gelijk_aan_doorlopende_run(tmp_path, backend, extra):
+    doorlopend = Simulation(config(backend, **extra), seed=5).run().resultaat()
+
+    simulatie = Simulation(config(backend, **extra), seed=5)
+    for _ in range(40):
+        simulatie.step()
+    pad = str(tmp_path / "dag_00040.npz")
+    sla_checkpoint_op(simulatie, pad)
+    del simulatie
+
+    hervat = laad_checkpoint(pad)
+    assert hervat.iteratie == 40
+    vergelijk(doorlopend, hervat.run().resultaat())
+
+def test_cohort_backend_geweigerd(tmp_path):
+    simulatie = Simulation(config("cohort"), seed=5)
+    simulatie.step()
+    with pytest.raises(ValueError, match="cohort"):
+        sla_checkpoint_op(simulatie, str(tmp_path / "cohort.npz"))
+
+def test_representatieve_agents_geweigerd(tmp_path):
+    simulatie = Simulation(config("array", representatieve_gebruikers=200), seed=5)
+    simulatie.step()
+    with pytest.raises(ValueError, match="representatieve"):
+        sla_checkpoint_op(simulatie, str(tmp_path / "gewogen.npz"))
+    assert not (tmp_path / "gewogen.npz").exists()
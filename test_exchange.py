@@ -0,0 +1,101 @@
+'''
+Exchange.handel_bulk moet dezelfde uitkomst geven als een order per agent (Exchange.koop_tokens en
+Exchange.verkoop_tokens in de volgorde van de populatie), zoals de lus over de speculators van de
+object backend. Gecontroleerd op willekeurige scenario's: met genoeg tokens (alles in een keer),
+bij schaarste (afwikkeling per koper) en bij schaarste met aanvulling uit liquidity.
+'''
+
+import numpy as np
+import pytest
+from hb_model import Token, Liquidity, Exchange
+
+class Agent:
+    def __init__(self, tokens, cash):
+        self.tokens = tokens
+        self.cash = cash
+
+def maak_exchange(beschikbare_tokens, liquidity_tokens):
+    token = Token(50000000000, 0.0001, 0.5)
+    liquidity = Liquidity(50000000000)
+    liquidity.vrijgegeven_tokens = liquidity_tokens
+    liquidity.beschikbare_vrijgegeven_tokens = liquidity_tokens
+    exchange = Exchange(token, liquidity)
+    exchange.beschikbare_tokens = beschikbare_tokens
+    return exchange
+
+def maak_scenario(rng, aantal):
+    tokens = rng.integers(0, 2000, aantal).astype(float)
+    cash = rng.random(aantal) * 3 # Bij de prijs van 0.0001 kan niet iedereen de grootste orders betalen
+    koopt = rng.random(aantal) < 0.5
+    # Een deel van de orders is te groot voor de tokens of de cash van de agent
+    aantallen = rng.integers(1, 2500, aantal).astype(float)
+    koop_aantallen = np.where(koopt, aantallen * 10, 0.0)
+    verkoop_aantallen = np.where(koopt, 0.0, aantallen)
+    return tokens, cash, koop_aantallen, verkoop_aantallen
+
+def per_agent(tokens, cash, koop_aantallen, verkoop_aantallen, beschikbare_tokens, liquidity_tokens):
+    exchange = maak_exchange(beschikbare_tokens, liquidity_tokens)
+    agents = [Agent(t, c) for t, c in zip(tokens.tolist(), cash.tolist())]
+    for agent, koop, verkoop in zip(agents, koop_aantallen.tolist(), verkoop_aantallen.tolist()):
+        if koop > 0:
+            exchange.koop_tokens(agent, koop, exchange.liquidity)
+        elif verkoop > 0:
+            exchange.verkoop_tokens(agent, verkoop)
+    return exchange, np.array([agent.tokens for agent in agents]), np.array([agent.cash for agent in agents])
+
+def in_bulk(tokens, cash, koop_aantallen, verkoop_aantallen, beschikbare_tokens, liquidity_tokens):
+    exchange = maak_exchange(beschikbare_tokens, liquidity_tokens)
+    tokens, cash = tokens.copy(), cash.copy()
+    exchange.handel_bulk(tokens, cash, koop_aantallen, verkoop_aantallen, exchange.liquidity)
+    return exchange, tokens, cash
+
+def vergelijk(verwacht, uitkomst):
+    exchange_verwacht, tokens_verwacht, cash_verwacht = verwacht
+    exchange, tokens, cash = uitkomst
+    np.testing.assert_allclose(tokens, tokens_verwacht, rtol=1e-12)
+    np.testing.assert_allclose(cash, cash_verwacht, rtol=1e-12)
+    for veld in ["beschikbare_tokens", "vraag", "aanbod", "tokens_op_markt"]:
+        assert getattr(exchange, veld) == pytest.approx(getattr(exchange_verwacht, veld), rel=1e-12)
+    liquidity, liquidity_verwacht = exchange.liquidity, exchange_verwacht.liquidity
+    assert liquidity.beschikbare_vrijgegeven_tokens == pytest.approx(liquidity_verwacht.beschikbare_vrijgegeven_tokens, rel=1e-12)
+    assert liquidity.tokens_op_markt == pytest.approx(liquidity_verwacht.tokens_op_markt, rel=1e-12)
+
+@pytest.mark.parametrize("seed", range(50))
+def test_genoeg_tokens(seed):
+    rng = np.random.default_rng(seed)
+    scenario = maak_scenario(rng, 200)
+    beschikbare_tokens = float(scenario[2].sum()) + 1 # Elke order past, ook die niet betaald kunnen worden
+    verwacht = per_agent(*scenario, beschikbare_tokens, 0.0)
+    vergelijk(verwacht, in_bulk(*scenario, beschikbare_tokens, 0.0))
+
+@pytest.mark.parametrize("seed", range(100))
+def test_schaarste(seed):
+    rng = np.random.default_rng(1000 + seed)
+    scenario = maak_scenario(rng, 200)
+    beschikbare_tokens = float(rng.integers(0, 20000))
+    verwacht = per_agent(*scenario, beschikbare_tokens, 0.0)
+    vergelijk(verwacht, in_bulk(*scenario, beschikbare_tokens, 0.0))
+
+@pytest.mark.parametrize("seed", range(100))
+def test_schaarste_met_liquidity(seed):
+    rng = np.random.default_rng(2000 + seed)
+    scenario = maak_scenario(rng, 200)
+    beschikbare_tokens = float(rng.integers(0, 5000))
+    liquidity_tokens = float(rng.integers(1, 50000))
+    verwacht = per_agent(*scenario, beschikbare_tokens, liquidity_tokens)
+    vergelijk(verwacht, in_bulk(*scenario, beschikbare_tokens, liquidity_tokens))
+
+def test_scenarios_raken_beide_paden():
+    # De scenario's van de tests hierboven moeten echt schaarste hebben (en een aanvulling uit liquidity)
+    schaars, aangevuld = 0, 0
+    for seed in range(100):
+        rng = np.random.default_rng(2000 + seed)
+        tokens, cash, koop_aantallen, verkoop_aantallen = maak_scenario(rng, 200)
+        beschikbare_tokens = float(rng.integers(0, 5000))
+        liquidity_tokens = float(rng.integers(1, 50000))
+        exchange, nieuwe_tokens, _ = in_bulk(tokens, cash, koop_aantallen, verkoop_aantallen, beschikbare_tokens, liquidity_tokens)
+        betaalbaar = (koop_aantallen > 0) & (cash >= koop_aantallen * exchange.token.get_prijs())
+        schaars += bool((nieuwe_tokens[betaalbaar] == tokens[betaalbaar]).any())
+        aangevuld += exchange.liquidity.tokens_op_markt > 0
+    assert schaars > 50
+    assert aangevuld > 50
@@ -0,0 +1,95 @@
+'''
+Een Gewogen view toont de velden van het gedeelde object gedeeld door het gewicht en schrijft elke
+verandering maal het gewicht terug, zodat de code van de activiteiten en de exchange ongewijzigd
+voor een agent met een gewicht kan draaien. Boven MAX_GEWICHT waarschuwt de Simulation.
+'''
+
+import warnings
+import pytest
+import gewogen
+from gewogen import Gewogen, GewogenWereld, GewichtWaarschuwing, MAX_GEWICHT
+from hb_model import Configuratie, Simulation
+
+class Pot:
+    def __init__(self, tokens, cash):
+        self.tokens = tokens
+        self.cash = cash
+        self.naam = "pot"
+
+    def stort(self, aantal):
+        self.tokens += aantal
+        return self.tokens
+
+    def koop(self, pot, aantal):
+        # Rekent met de velden van self, zodat hij op een view ook gewogen rekent
+        pot.stort(aantal)
+        self.cash -= aantal
+
+def test_lezen_gedeeld_en_schrijven_maal_gewicht():
+    pot = Pot(tokens=1000.0, cash=400.0)
+    view = Gewogen(pot, 4.0, velden=["tokens", "cash"])
+    assert view.tokens == 250.0
+    assert view.cash == 100.0
+
+    view.tokens -= 10 # Een agent neemt 10 tokens: de gedeelde pot verliest er 40
+    assert pot.tokens == 960.0
+    assert view.tokens == 240.0
+    view.naam = "andere pot" # Geen veld: ongewijzigd doorgegeven
+    assert pot.naam == "andere pot"
+    assert view.naam == "andere pot"
+
+def test_geschaalde_methode_krijgt_hoeveelheid_maal_gewicht():
+    pot = Pot(tokens=1000.0, cash=0.0)
+    view = Gewogen(pot, 4.0, geschaald={"stort": 0})
+    assert view.stort(5.0) == 1020.0 # De waarde die de methode op het object teruggeeft, niet geschaald
+    assert pot.tokens == 1020.0
+
+def test_eigen_methode_draait_met_view_als_self():
+    pot, andere = Pot(tokens=0.0, cash=400.0), Pot(tokens=0.0, cash=0.0)
+    view = Gewogen(pot, 4.0, velden=["cash"], eigen=["koop"])
+    andere_view = Gewogen(andere, 4.0, geschaald={"stort": 0})
+    view.koop(andere_view, 10.0)
+    assert pot.cash == 360.0
+    assert andere.tokens == 40.0
+
+def test_agent_met_gewicht_handelt_als_gewicht_agents():
+    # Een agent met gewicht 4 op de exchange view doet hetzelfde met de exchange als 4 gelijke agents
+    def simulatie():
+        simulatie = Simulation(Configuratie(aantal_gebruikers=10, aantal_speculators=2, iterations=1, backend="array"), seed=0)
+        simulatie.exchange.beschikbare_tokens = 1e6
+        return simulatie
+
+    gewogen_simulatie, gewone_simulatie = simulatie(), simulatie()
+    exchange = GewogenWereld(gewogen_simulatie, 4.0).exchange
+    agent = Pot(tokens=500.0, cash=100.0)
+    exchange.koop_tokens(agent, 2000.0, exchange.liquidity)
+    exchange.verkoop_tokens(agent, 300.0)
+    agents = [Pot(tokens=500.0, cash=100.0) for _ in range(4)]
+    for andere in agents:
+        gewone_simulatie.exchange.koop_tokens(andere, 2000.0, gewone_simulatie.exchange.liquidity)
+        gewone_simulatie.exchange.verkoop_tokens(andere, 300.0)
+
+    for veld in ["beschikbare_tokens", "vraag", "aanbod"]:
+        assert getattr(gewogen_simulatie.exchange, veld) == pytest.approx(getattr(gewone_simulatie.exchange, veld), rel=1e-12), veld
+    assert (agent.tokens, agent.cash) == pytest.approx((agents[0].tokens, agents[0].cash), rel=1e-12)
+    assert agent.tokens == 2200.0
+
+@pytest.mark.parametrize("steekproef, waarschuwt", [(1000, False), (500, True)])
+def test_waarschuwing_boven_max_gewicht(steekproef, waarschuwt):
+    config = Configuratie(aantal_gebruikers=2000, aantal_speculators=400, iterations=1, backend="array",
+                          representatieve_gebruikers=steekproef, representatieve_speculators=steekproef // 5)
+    assert (2000 / steekproef > MAX_GEWICHT) == waarschuwt
+    with warnings.catch_warnings(record=True) as meldingen:
+        warnings.simplefilter("always")
+        Simulation(config, seed=0)
+    gewicht_meldingen = [melding for melding in meldingen if issubclass(melding.category, GewichtWaarschuwing)]
+    # Een melding voor de gebruikers en een voor de speculators
+    assert len(gewicht_meldingen) == (2 if waarschuwt else 0)
+    assert all(melding.filename == __file__ for melding in gewicht_meldingen) # Wijst naar de aanroeper van Simulation
+
+def test_diagnose_zonder_waarschuwing():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", GewichtWaarschuwing)
+        uitkomsten = gewogen.diagnose(aantal_gebruikers=500, steekproeven=[50], dagen=5, seeds=2, volledig=False,
+                                      rapporteer=lambda regel: None)
+    assert sorted(uitkomsten) == [50]
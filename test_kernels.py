@@ -0,0 +1,110 @@
+'''
+De kernels in kernels.py herhalen de regels van de activiteiten en de handel met de hand. Deze
+tests houden ze bij de klassen: de gecompileerde en de gewone Python versie geven op dezelfde
+invoer hetzelfde resultaat, en de kernel backend komt over een aantal seeds uit op dezelfde
+eindwaarden als de array backend (binnen de spreiding tussen seeds, de willekeur is anders).
+'''
+
+import sys
+import importlib.util
+import numpy as np
+import pytest
+import hb_model
+import kernels
+from hb_model import Configuratie, Simulation
+
+# Relatieve tolerantie voor het verschil tussen de gemiddelde eindwaarden van twee backends over SEEDS seeds.
+# De prijs spreidt veel meer tussen seeds (sd ongeveer 35%) dan burned en de HB tokens (ongeveer 5%); met 12
+# seeds is de standaardfout van het verschil ongeveer 12% en 2%, de toleranties zijn ruim twee keer zo groot.
+SEEDS = 12
+TOLERANTIES = {"prijs": 0.25, "burned": 0.04, "hb_tokens": 0.04}
+
+@pytest.fixture
+def kernels_zonder_numba(monkeypatch):
+    # Een tweede kopie van kernels.py, geladen alsof Numba niet geinstalleerd is
+    with monkeypatch.context() as tijdelijk:
+        # Alleen tijdens het laden; Numba zelf heeft zijn eigen module nog nodig bij het compileren
+        tijdelijk.setitem(sys.modules, "numba", None)
+        spec = importlib.util.spec_from_file_location("kernels_zonder_numba", kernels.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    assert not module.HEEFT_NUMBA
+    return module
+
+def invoer_activiteiten(seed, aantal_gebruikers=500, aantal=400):
+    rng = np.random.default_rng(seed)
+    staat = np.zeros(kernels.STAAT_GROOTTE)
+    staat[kernels.BESCHIKBAAR] = rng.uniform(0, 2e6)
+    staat[kernels.TOKENS_OP_MARKT] = rng.uniform(0, 1e6)
+    staat[kernels.LIQ_VRIJGEGEVEN] = staat[kernels.LIQ_BESCHIKBAAR] = rng.uniform(0, 1e7)
+    staat[kernels.BRAND_CASH] = staat[kernels.DP_CASH] = 100000.0
+    return dict(
+        indices=rng.choice(aantal_gebruikers, size=aantal, replace=False),
+        tokens=rng.uniform(0, 2e5, aantal_gebruikers), cash=rng.uniform(0, 2000, aantal_gebruikers),
+        random_factor=rng.uniform(0.5, 1.5, aantal_gebruikers), data_utility=rng.uniform(0, 100, aantal_gebruikers),
+        dagen=np.zeros(aantal_gebruikers, dtype=np.int64),
+        keuzes=rng.integers(0, 5, aantal), wachttijden=rng.choice(kernels.WACHTTIJDEN, size=aantal),
+        inleg_cash=rng.uniform(5, 10, aantal), kansen=rng.random(aantal),
+        drempels=np.array([10.0, 10.0, 10.0, 5.0, 5.0]), succes_kansen=np.full(5, 0.9),
+        prijs=1e-4, setup_fee=20.0, pool_fee=20.0, max_koop_bedrag=5000.0, staat=staat,
+    )
+
+def invoer_handel(seed, aantal=500):
+    rng = np.random.default_rng(seed)
+    staat = np.zeros(kernels.STAAT_GROOTTE)
+    staat[kernels.BESCHIKBAAR] = rng.uniform(0, 1e6) # Schaars, zodat ook de aanvulling uit liquidity meedoet
+    staat[kernels.LIQ_VRIJGEGEVEN] = staat[kernels.LIQ_BESCHIKBAAR] = rng.uniform(0, 1e7)
+    return dict(
+        tokens=rng.uniform(0, 2e4, aantal), cash=rng.uniform(0, 5000, aantal), random_factor=rng.uniform(0.5, 1.5, aantal),
+        willekeur=rng.uniform(0, 0.05, aantal), prijs=1e-4, max_koop_bedrag=5000.0, staat=staat,
+    )
+
+def kopie(invoer):
+    return {naam: waarde.copy() if isinstance(waarde, np.ndarray) else waarde for naam, waarde in invoer.items()}
+
+def vergelijk_arrays(verwacht, uitkomst):
+    for naam, waarde in verwacht.items():
+        if isinstance(waarde, np.ndarray):
+            np.testing.assert_allclose(uitkomst[naam], waarde, rtol=1e-12, err_msg=naam)
+
+@pytest.mark.skipif(not kernels.HEEFT_NUMBA, reason="Numba is niet geinstalleerd")
+@pytest.mark.parametrize("seed", range(5))
+def test_activiteiten_kernel_gecompileerd_gelijk_aan_python(kernels_zonder_numba, seed):
+    invoer = invoer_activiteiten(seed)
+    gecompileerd, python = kopie(invoer), kopie(invoer)
+    kernels.activiteiten_kernel(**gecompileerd)
+    kernels_zonder_numba.activiteiten_kernel(**python)
+    vergelijk_arrays(python, gecompileerd)
+    assert not np.array_equal(gecompileerd["tokens"], invoer["tokens"]) # De kernel heeft echt iets gedaan
+
+@pytest.mark.skipif(not kernels.HEEFT_NUMBA, reason="Numba is niet geinstalleerd")
+@pytest.mark.parametrize("seed", range(5))
+def test_handel_kernel_gecompileerd_gelijk_aan_python(kernels_zonder_numba, seed):
+    invoer = invoer_handel(seed)
+    gecompileerd, python = kopie(invoer), kopie(invoer)
+    kernels.handel_kernel(**gecompileerd)
+    kernels_zonder_numba.handel_kernel(**python)
+    vergelijk_arrays(python, gecompileerd)
+    assert not np.array_equal(gecompileerd["tokens"], invoer["tokens"])
+
+@pytest.mark.skipif(not kernels.HEEFT_NUMBA, reason="Numba is niet geinstalleerd")
+def test_kernel_backend_met_en_zonder_numba(kernels_zonder_numba, monkeypatch):
+    # Een hele run: de willekeur wordt buiten de kernels getrokken, dus het resultaat moet gelijk zijn
+    config = Configuratie(aantal_gebruikers=500, aantal_speculators=100, iterations=60, backend="kernel")
+    gecompileerd = Simulation(config, seed=2).run().resultaat()
+    monkeypatch.setattr(hb_model, "kernels", kernels_zonder_numba)
+    python = Simulation(config, seed=2).run().resultaat()
+
+    for naam in ["marktprijs_over_time", "burned", "hb_tokens", "gebruiker_utilities"]:
+        np.testing.assert_allclose(python[naam], gecompileerd[naam], rtol=1e-9, err_msg=naam)
+
+def gemiddelde_eindwaarden(backend, seeds=SEEDS):
+    config = Configuratie(aantal_gebruikers=2000, aantal_speculators=400, iterations=120, backend=backend)
+    eind = [Simulation(config, seed=seed).run().resultaat()["eind"] for seed in range(seeds)]
+    return {naam: float(np.mean([rij[naam] for rij in eind])) for naam in TOLERANTIES}
+
+def test_kernel_backend_gelijk_aan_array_backend():
+    array = gemiddelde_eindwaarden("array")
+    kernel = gemiddelde_eindwaarden("kernel")
+    for naam, tolerantie in TOLERANTIES.items():
+        assert kernel[naam] == pytest.approx(array[naam], rel=tolerantie), naam
@@ -0,0 +1,127 @@
+'''
+De Recorder moet dezelfde reeksen geven als de lijsten die de simulatie vroeger zelf bijhield:
+op dezelfde punten in een iteratie dezelfde waarden uit de simulatie. De referentie leest die
+waarden hier rechtstreeks uit de simulatie (zonder de geregistreerde metrics), op elk punt waar
+de simulatie de recorder aanroept, en zet ze in lijsten zoals de simulatie voor de recorder deed.
+'''
+
+import numpy as np
+import pytest
+from hb_model import Configuratie, Simulation
+from tracing import tracer, RingBuffer, DEBUG, UIT
+
+ACTIVITEITEN = ["Standaard", "Burning", "Mining", "Datapool", "Sponsored"]
+
+def config(backend, **extra):
+    return Configuratie(aantal_gebruikers=300, aantal_speculators=60, iterations=45, backend=backend,
+                        utility_opname="volledig", **extra)
+
+def gemiddelde_utilities(simulatie):
+    token = simulatie.token
+    prijs = token.get_prijs()
+    gebruikers, specs = simulatie.gebruikers, simulatie.specs
+    if simulatie.config.backend == "object":
+        return (sum(gebruiker.activiteit_utility(token) for gebruiker in gebruikers) / len(gebruikers),
+                sum(spec.koop_utility(token) for spec in specs) / len(specs),
+                sum(spec.verkoop_utility(token) for spec in specs) / len(specs))
+    return (float(gebruikers.activiteit_utilities(prijs).mean()),
+            float(specs.koop_utilities(prijs).mean()),
+            float(specs.verkoop_utilities(prijs).mean()))
+
+def draai_met_lijsten(simulatie):
+    # Houdt naast de recorder lijsten bij, op de momenten waarop de simulatie de recorder aanroept
+    lijsten = {}
+    neem_op = simulatie.recorder.neem_op
+
+    def voeg_toe(naam, waarde):
+        lijsten.setdefault(naam, []).append(waarde)
+
+    def neem_ook_op(iteratie, bron, moment="eind"):
+        if moment == "vrijgave":
+            for naam, groep in simulatie.groepen().items():
+                voeg_toe(f"vrijgave/{naam}", groep.vrijgegeven_tokens)
+        elif moment == "utilities":
+            for naam, waarde in zip(["gebruiker", "speculator_koop", "speculator_verkoop"], gemiddelde_utilities(simulatie)):
+                voeg_toe(naam, waarde)
+        elif moment == "activiteiten":
+            for naam, activiteit in zip(ACTIVITEITEN, simulatie.activiteiten):
+                voeg_toe(f"activiteit/{naam}", activiteit.bereken_threshold(simulatie.exchange))
+        else:
+            voeg_toe("iteraties", iteratie)
+            voeg_toe("prijs", simulatie.token.get_prijs())
+            voeg_toe("liquidity", simulatie.liquidity.beschikbare_vrijgegeven_tokens)
+            voeg_toe("circulerende_supply", simulatie.token.get_circulerende_tokens())
+            voeg_toe("burned", simulatie.hb.totale_burned_tokens)
+            voeg_toe("hb_tokens", simulatie.hb.tokens)
+            for naam, klasse in simulatie.klassen_op_markt().items():
+                voeg_toe(f"tokens_op_markt/{naam}", klasse.tokens_op_markt)
+        neem_op(iteratie, bron, moment)
+
+    simulatie.recorder.neem_op = neem_ook_op
+    simulatie.run()
+    return {naam: np.array(waarden) for naam, waarden in lijsten.items()}
+
+@pytest.mark.parametrize("backend", ["object", "array"])
+def test_reeksen_gelijk_aan_lijsten(backend):
+    simulatie = Simulation(config(backend), seed=3)
+    lijsten = draai_met_lijsten(simulatie)
+    resultaat = simulatie.resultaat()
+
+    assert len(resultaat["iteraties"]) == simulatie.config.iterations
+    np.testing.assert_array_equal(resultaat["iteraties"], lijsten["iteraties"])
+    for sleutel, naam in [("marktprijs_over_time", "prijs"), ("liquidity_tokens_over_time", "liquidity"),
+                          ("circulerende_supply", "circulerende_supply"), ("burned", "burned"), ("hb_tokens", "hb_tokens")]:
+        np.testing.assert_array_equal(resultaat[sleutel], lijsten[naam])
+    for naam, kolom in resultaat["vrijgave_per_iteratie"].items():
+        np.testing.assert_array_equal(kolom, lijsten[f"vrijgave/{naam}"])
+    assert sorted(resultaat["vrijgave_per_iteratie"]) == sorted(simulatie.groepen())
+    for naam, kolom in resultaat["tokens_op_markt_per_klasse"].items():
+        np.testing.assert_array_equal(kolom, lijsten[f"tokens_op_markt/{naam}"])
+    assert sorted(resultaat["tokens_op_markt_per_klasse"]) == sorted(simulatie.klassen_op_markt())
+    for naam in ACTIVITEITEN:
+        np.testing.assert_array_equal(resultaat["activiteiten_utilities"][naam], lijsten[f"activiteit/{naam}"])
+    for naam in ["gebruiker", "speculator_koop", "speculator_verkoop"]:
+        # De recorder rekent het gemiddelde met NumPy uit, de som kan in de laatste bits verschillen
+        np.testing.assert_allclose(resultaat[f"{naam}_utilities"], lijsten[naam], rtol=1e-12)
+        assert not resultaat[f"{naam}_utilities_fout"].any()
+
+    eind = resultaat["eind"]
+    assert eind["prijs"] == lijsten["prijs"][-1]
+    assert eind["burned"] == lijsten["burned"][-1]
+    assert eind["hb_tokens"] == lijsten["hb_tokens"][-1]
+
+@pytest.mark.parametrize("backend", ["object", "array"])
+def test_cadans_neemt_elke_zoveelste_iteratie_op(backend):
+    # Het opnemen verandert de simulatie niet: met een cadans komen dezelfde waarden, maar minder rijen
+    volledig = Simulation(config(backend), seed=4).run().resultaat()
+    om_de_drie = Simulation(config(backend, opname_cadans=3), seed=4).run().resultaat()
+
+    np.testing.assert_array_equal(om_de_drie["iteraties"], volledig["iteraties"][::3])
+    for sleutel in ["marktprijs_over_time", "liquidity_tokens_over_time", "burned", "hb_tokens", "gebruiker_utilities"]:
+        np.testing.assert_array_equal(om_de_drie[sleutel], volledig[sleutel][::3])
+    for groep in ["vrijgave_per_iteratie", "tokens_op_markt_per_klasse", "activiteiten_utilities"]:
+        for naam, kolom in volledig[groep].items():
+            np.testing.assert_array_equal(om_de_drie[groep][naam], kolom[::3])
+    assert om_de_drie["eind"] == volledig["eind"]
+
+@pytest.fixture
+def traces():
+    # Zet de activiteit traces aan in een eigen ring buffer en zet de gedeelde tracer daarna terug
+    oude_sink = tracer.sink
+    tracer.sink = RingBuffer()
+    tracer.zet("activiteit", DEBUG)
+    yield tracer.sink
+    tracer.sink = oude_sink
+    tracer.zet(None, UIT)
+
+@pytest.mark.parametrize("threshold, doet_mee", [(float("-inf"), True), (float("inf"), False)])
+def test_standaard_activiteit_traced_alleen_de_gekozen_tak(traces, threshold, doet_mee):
+    # De trace "niet genoeg utility" hoort alleen bij gebruikers die niet meedoen
+    simulatie = Simulation(Configuratie(aantal_gebruikers=20, aantal_speculators=5, iterations=5, backend="object"), seed=0)
+    activiteit = simulatie.activiteiten[0]
+    activiteit.bereken_threshold = lambda exchange: threshold
+    activiteit.deelname_activiteit(simulatie.token, simulatie.exchange, simulatie.gebruikers[0], simulatie.hb)
+
+    tekst = traces.tekst()
+    assert ("doet mee met de standaard activiteit" in tekst) == doet_mee
+    assert ("niet genoeg utility" in tekst) == (not doet_mee)
@@ -0,0 +1,90 @@
+'''
+Gestructureerde tracing voor de simulaties
+
+Vervangt de print statements in de hot paths van het model. Elke trace heeft een categorie
+(bijvoorbeeld "exchange" of "activiteit") en een niveau. Categorieen die uit staan kosten
+alleen een vergelijking: het bericht wordt pas geformatteerd als de trace ook echt
+weggeschreven wordt. Ingeschakelde traces gaan naar een sink, standaard een begrensde
+ring buffer in het geheugen.
+
+Gebruik:
+    from tracing import tracer, trace, DEBUG
+    trace("exchange", DEBUG, "Koper heeft {} tokens gekocht voor {} cash.", aantal_tokens, totale_kosten)
+
+    tracer.zet("exchange", DEBUG)  # categorie aanzetten
+    tracer.sink.regels             # laatst weggeschreven traces
+'''
+
+from collections import deque
+
+# Niveaus (zelfde waarden als de logging module)
+DEBUG = 10
+INFO = 20
+WAARSCHUWING = 30
+UIT = 100
+
+NIVEAU_NAMEN = {DEBUG: "DEBUG", INFO: "INFO", WAARSCHUWING: "WAARSCHUWING"}
+
+class RingBuffer:
+    '''
+    Sink die de laatste 'capaciteit' traces in het geheugen bewaart
+    '''
+    def __init__(self, capaciteit=10000):
+        self.regels = deque(maxlen=capaciteit)
+
+    def schrijf(self, categorie, niveau, bericht):
+        self.regels.append((categorie, niveau, bericht))
+
+    def tekst(self):
+        return "\n".join(f"[{categorie}] {bericht}" for categorie, niveau, bericht in self.regels)
+
+    def leeg(self):
+        self.regels.clear()
+
+class BestandSink:
+    '''
+    Sink die traces regel voor regel naar een bestand schrijft
+    '''
+    def __init__(self, pad, modus="a"):
+        self.bestand = open(pad, modus, encoding="utf-8")
+
+    def schrijf(self, categorie, niveau, bericht):
+        self.bestand.write(f"{NIVEAU_NAMEN.get(niveau, niveau)} [{categorie}] {bericht}\n")
+
+    def sluit(self):
+        self.bestand.close()
+
+class PrintSink:
+    '''
+    Sink die traces print, zoals het model vroeger deed
+    '''
+    def schrijf(self, categorie, niveau, bericht):
+        print(bericht)
+
+class Tracer:
+    def __init__(self, sink=None):
+        self.sink = sink if sink is not None else RingBuffer()
+        self.standaard_niveau = UIT # Alles staat standaard uit
+        self.niveaus = {}
+
+    def zet(self, categorie=None, niveau=DEBUG):
+        # Zet een categorie (of met categorie=None alle categorieen) aan vanaf 'niveau', of uit met UIT
+        if categorie is None:
+            self.standaard_niveau = niveau
+            self.niveaus.clear()
+        else:
+            self.niveaus[categorie] = niveau
+
+    def aan(self, categorie, niveau=DEBUG):
+        return niveau >= self.niveaus.get(categorie, self.standaard_niveau)
+
+    def trace(self, categorie, niveau, bericht, *args):
+        if niveau < self.niveaus.get(categorie, self.standaard_niveau):
+            return
+        if args:
+            bericht = bericht.format(*args)
+        self.sink.schrijf(categorie, niveau, bericht)
+
+# Gedeelde tracer voor het hele proces
+tracer = Tracer()
+trace = tracer.trace
@@ -0,0 +1,113 @@
+'''
+Vesting schema's voor de investeerdersgroepen en systemen
+
+Een schema bestaat uit een of meer tranches. Elke tranche is een deel van de allocatie dat
+vanaf een startmaand over een aantal maanden vrijkomt, eventueel pas na een cliff en volgens
+een niet-lineaire curve. Omdat de vrijgave alleen afhangt van de allocatie en het schema,
+wordt de hele reeks vooraf als array uitgerekend; de simulatie leest per dag alleen de
+vrijgave van die dag uit de array.
+
+Voorbeeld (de standaard: TGE gevolgd door lineaire maandelijkse vesting):
+    schema = VestingSchema.standaard(tge_percentage=30, vesting_maanden=12)
+    vrijgave = schema.vrijgave_per_iteratie(totale_allocatie)  # tokens per dag
+'''
+
+import numpy as np
+
+# Lengte van een maand in iteraties (dagen), zoals in de rest van het model
+DAGEN_PER_MAAND = 30
+
+# Cumulatieve vorm van een tranche: fractie van de tranche die na fractie x van de vesting is vrijgegeven
+VORMEN = {
+    "lineair": lambda x: x,
+    "kwadratisch": lambda x: x ** 2, # Langzaam beginnen, veel aan het eind
+    "wortel": lambda x: np.sqrt(x),  # Veel aan het begin, langzaam aflopend
+}
+
+class Tranche:
+    '''
+    Deel van een allocatie met een eigen vesting.
+    percentage: deel van de totale allocatie (in procenten)
+    vesting_maanden: aantal maandelijkse vrijgaven (0 = alles in een keer op de startmaand)
+    cliff_maanden: maanden na de start waarin niets vrijkomt; de opgebouwde tokens komen aan het eind van de cliff in een keer vrij
+    start_maand: maand waarop de vesting begint (0 = TGE)
+    vorm: naam uit VORMEN, of een functie die [0, 1] op [0, 1] afbeeldt
+    '''
+    def __init__(self, percentage, vesting_maanden=0, cliff_maanden=0, start_maand=0, vorm="lineair"):
+        if cliff_maanden > vesting_maanden:
+            raise ValueError(f"Cliff van {cliff_maanden} maanden is langer dan de vesting van {vesting_maanden} maanden")
+        self.percentage = percentage
+        self.vesting_maanden = vesting_maanden
+        self.cliff_maanden = cliff_maanden
+        self.start_maand = start_maand
+        self.vorm = vorm
+
+    def __repr__(self):
+        # Deterministische weergave, zodat een configuratie met een schema een stabiele cache sleutel heeft
+        vorm = self.vorm if isinstance(self.vorm, str) else getattr(self.vorm, "__name__", "functie")
+        return (f"Tranche({self.percentage}, vesting_maanden={self.vesting_maanden}, cliff_maanden={self.cliff_maanden}, "
+                f"start_maand={self.start_maand}, vorm={vorm!r})")
+
+    def laatste_maand(self):
+        return self.start_maand + self.vesting_maanden
+
+    def vrijgave_per_maand(self, hoeveelheid):
+        '''
+        Vrijgave van 'hoeveelheid' tokens per maand, vanaf maand 0 tot en met laatste_maand()
+        '''
+        vrijgave = np.zeros(self.laatste_maand() + 1)
+        if self.vesting_maanden == 0:
+            vrijgave[self.start_maand] = hoeveelheid
+            return vrijgave
+
+        if self.vorm == "lineair":
+            # Gelijke delen per maand (exact zoals de oorspronkelijke lineaire vesting)
+            per_maand = np.full(self.vesting_maanden, hoeveelheid / self.vesting_maanden)
+        else:
+            vorm = VORMEN[self.vorm] if isinstance(self.vorm, str) else self.vorm
+            cumulatief = hoeveelheid * np.asarray(vorm(np.arange(self.vesting_maanden + 1) / self.vesting_maanden), dtype=float)
+            per_maand = np.diff(cumulatief)
+
+        # Tijdens de cliff komt niets vrij, aan het eind van de cliff alles wat tot dan opgebouwd is
+        if self.cliff_maanden > 0:
+            per_maand[self.cliff_maanden - 1] = per_maand[:self.cliff_maanden].sum()
+            per_maand[:self.cliff_maanden - 1] = 0
+
+        vrijgave[self.start_maand + 1:] = per_maand
+        return vrijgave
+
+class VestingSchema:
+    def __init__(self, tranches):
+        totaal = sum(tranche.percentage for tranche in tranches)
+        if not np.isclose(totaal, 100):
+            raise ValueError(f"De tranches van een vesting schema moeten samen 100% zijn, niet {totaal}%")
+        self.tranches = list(tranches)
+
+    @classmethod
+    def standaard(cls, tge_percentage, vesting_maanden):
+        # TGE vrijgave op iteratie 0, daarna lineair elke 30 iteraties (de oorspronkelijke vesting van het model)
+        if tge_percentage < 100 and vesting_maanden == 0:
+            # In het oorspronkelijke model kwam de rest dan nooit vrij; dat kan niet als schema dat samen 100% is
+            raise ValueError(f"Zonder vesting maanden moet de TGE 100% zijn, niet {tge_percentage}%")
+        tranches = [Tranche(tge_percentage)]
+        if tge_percentage < 100:
+            tranches.append(Tranche(100 - tge_percentage, vesting_maanden=vesting_maanden))
+        return cls(tranches)
+
+    def __repr__(self):
+        return f"VestingSchema({self.tranches!r})"
+
+    def vrijgave_per_iteratie(self, totale_allocatie):
+        '''
+        Array met het aantal vrijgegeven tokens per iteratie, tot en met de laatste vrijgave.
+        Vrijgaven vallen op de eerste dag van een maand (iteratie 0, 30, 60, ...).
+        '''
+        laatste_maand = max(tranche.laatste_maand() for tranche in self.tranches)
+        per_maand = np.zeros(laatste_maand + 1)
+        for tranche in self.tranches:
+            maanden = tranche.vrijgave_per_maand(totale_allocatie * (tranche.percentage / 100))
+            per_maand[:len(maanden)] += maanden
+
+        vrijgave = np.zeros(laatste_maand * DAGEN_PER_MAAND + 1)
+        vrijgave[::DAGEN_PER_MAAND] = per_maand
+        return vrijgave
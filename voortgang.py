@@ -0,0 +1,32 @@
+'''
+Begrenzing van voortgangsupdates
+
+Elke update van de interface (een progress bar, een tekst, een grafiek) kost een round-trip naar
+de browser. Per iteratie bijwerken maakt korte runs daardoor trager dan de simulatie zelf. De
+Begrenzer laat een update alleen door als er sinds de vorige genoeg tijd verstreken is, of (als
+dat is opgegeven) genoeg iteraties gedraaid zijn.
+'''
+
+import time
+
+class Begrenzer:
+    def __init__(self, interval=0.25, elke_iteraties=None):
+        self.interval = interval # Minimaal aantal seconden tussen twee updates (None = niet op tijd begrenzen)
+        self.elke_iteraties = elke_iteraties # Of: een update per zoveel iteraties
+        self.vorige_tijd = None
+        self.vorige_iteratie = None
+
+    def moet_bijwerken(self, iteratie, laatste=False):
+        # De eerste en de laatste iteratie worden altijd bijgewerkt
+        nu = time.perf_counter()
+        if laatste or self.vorige_tijd is None:
+            bijwerken = True
+        elif self.elke_iteraties is not None and iteratie - self.vorige_iteratie >= self.elke_iteraties:
+            bijwerken = True
+        else:
+            bijwerken = self.interval is not None and nu - self.vorige_tijd >= self.interval
+
+        if bijwerken:
+            self.vorige_tijd = nu
+            self.vorige_iteratie = iteratie
+        return bijwerken
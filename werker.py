@@ -0,0 +1,181 @@
+'''
+Simulaties in een achtergrondproces
+
+De Streamlit app draait een simulatie niet meer in de eigen script thread, maar geeft haar als
+Opdracht aan een SimulatieWerker. De werker draait de opdrachten een voor een in een apart
+proces en houdt de rest in een wachtrij. Het proces stuurt (begrensd) berichten met de voortgang
+en het nieuwe deel van de prijs terug; de interface haalt die zonder te wachten op met ververs(),
+zodat de sessie bruikbaar blijft tijdens een lange run. Een opdracht kan geannuleerd worden,
+zowel als die bezig is als wanneer die nog in de wachtrij staat. Een Monte Carlo ensemble
+(Opdracht met aantal_runs) gaat op dezelfde manier; de voortgang is dan het aantal afgeronde runs.
+'''
+
+import queue
+import traceback
+import multiprocessing
+from collections import deque
+import numpy as np
+from hb_model import Simulation
+from ensemble import draai_ensemble
+from tracing import tracer, DEBUG, UIT
+from voortgang import Begrenzer
+
+class Opdracht:
+    def __init__(self, sleutel, config, seed, trace_categorieen=(), aantal_runs=None):
+        self.sleutel = sleutel
+        self.config = config
+        self.seed = seed # Bij een ensemble de master seed
+        self.trace_categorieen = list(trace_categorieen)
+        self.aantal_runs = aantal_runs # None voor een enkele simulatie, anders een ensemble met zoveel runs
+        self.status = "wachtend" # wachtend, bezig, klaar, geannuleerd of fout
+        self.iteratie = 0 # Aantal gedraaide iteraties (bij een ensemble: aantal afgeronde runs)
+        self.delen = [] # (iteraties, prijs) zoals ze binnenkomen
+        self.resultaat = None
+        self.traces = ""
+        self.fout = None
+
+    def is_ensemble(self):
+        return self.aantal_runs is not None
+
+    def totaal(self):
+        return self.aantal_runs if self.is_ensemble() else self.config.iterations
+
+    def voortgang(self):
+        return min(self.iteratie / max(self.totaal(), 1), 1.0)
+
+    def prijs_pad(self):
+        # De tot nu toe ontvangen prijs per opgenomen iteratie
+        if not self.delen:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        iteraties, prijs = zip(*self.delen)
+        return np.concatenate(iteraties), np.concatenate(prijs)
+
+def _draai_ensemble(config, master_seed, aantal_runs, berichten, stop, interval):
+    # Een ensemble in het achtergrondproces: de runs zelf gaan over de process pool van draai_ensemble
+    begrenzer = Begrenzer(interval=interval)
+    def rapporteer(klaar, totaal):
+        if begrenzer.moet_bijwerken(klaar, laatste=klaar == totaal):
+            berichten.put(("voortgang", (klaar, None, None)))
+    ensemble = draai_ensemble(config, aantal_runs, master_seed=master_seed, rapporteer=rapporteer, stop=stop)
+    if ensemble is None:
+        berichten.put(("geannuleerd", None))
+    else:
+        berichten.put(("klaar", (ensemble, "")))
+
+def _draai(config, seed, trace_categorieen, aantal_runs, berichten, stop, interval):
+    # Draait in het achtergrondproces
+    tracer.zet(None, UIT)
+    for categorie in trace_categorieen:
+        tracer.zet(categorie, DEBUG)
+
+    try:
+        if aantal_runs is not None:
+            _draai_ensemble(config, seed, aantal_runs, berichten, stop, interval)
+            return
+        simulatie = Simulation(config, seed=seed)
+        recorder = simulatie.recorder
+        begrenzer = Begrenzer(interval=interval)
+        verstuurd = 0 # Aantal opgenomen rijen dat al verstuurd is
+        for snapshot in simulatie.iter_steps():
+            if stop.is_set():
+                berichten.put(("geannuleerd", None))
+                return
+            if begrenzer.moet_bijwerken(snapshot.iteratie, laatste=simulatie.klaar()):
+                berichten.put(("voortgang", (simulatie.iteratie, recorder.opgenomen_iteraties()[verstuurd:].copy(),
+                                             recorder.kolom("prijs")[verstuurd:].copy())))
+                verstuurd = recorder.aantal
+        berichten.put(("klaar", (simulatie.resultaat(), tracer.sink.tekst() if trace_categorieen else "")))
+    except Exception:
+        berichten.put(("fout", traceback.format_exc()))
+
+class SimulatieWerker:
+    def __init__(self, interval=0.5):
+        self.interval = interval # Minimale tijd tussen twee voortgangsberichten van het proces
+        self.context = multiprocessing.get_context("spawn")
+        self.wachtrij = deque()
+        self.huidige = None
+        self.proces = None
+        self.berichten = None
+        self.stop = None
+
+    def bezig(self):
+        return self.huidige is not None
+
+    def opdrachten(self):
+        # De lopende opdracht en de wachtrij, in volgorde
+        return ([self.huidige] if self.huidige is not None else []) + list(self.wachtrij)
+
+    def voeg_toe(self, opdracht):
+        self.wachtrij.append(opdracht)
+        self._start_volgende()
+        return opdracht
+
+    def _start_volgende(self):
+        if self.huidige is not None or not self.wachtrij:
+            return
+        opdracht = self.wachtrij.popleft()
+        self.berichten = self.context.Queue()
+        self.stop = self.context.Event()
+        # Een daemon proces mag zelf geen processen starten, dus een ensemble (met een process pool) draait niet als daemon
+        self.proces = self.context.Process(
+            target=_draai, daemon=not opdracht.is_ensemble(),
+            args=(opdracht.config, opdracht.seed, opdracht.trace_categorieen, opdracht.aantal_runs,
+                  self.berichten, self.stop, self.interval)
+        )
+        self.proces.start()
+        opdracht.status = "bezig"
+        self.huidige = opdracht
+
+    def ververs(self):
+        '''
+        Verwerkt de berichten van het proces zonder te wachten en start zo nodig de volgende opdracht.
+        Geeft de opdrachten terug die sinds de vorige aanroep zijn afgerond (klaar, geannuleerd of fout).
+        '''
+        afgerond = []
+        while self.huidige is not None:
+            opdracht = self.huidige
+            try:
+                soort, inhoud = self.berichten.get_nowait()
+            except queue.Empty:
+                if self.proces.is_alive():
+                    break
+                # Het proces is gestopt; een laatste bericht kan nog onderweg zijn
+                try:
+                    soort, inhoud = self.berichten.get(timeout=1)
+                except queue.Empty:
+                    soort, inhoud = "fout", f"Het achtergrondproces is onverwacht gestopt (exitcode {self.proces.exitcode})"
+
+            if soort == "voortgang":
+                opdracht.iteratie, iteraties, prijs = inhoud
+                if iteraties is not None:
+                    opdracht.delen.append((iteraties, prijs))
+                continue
+
+            opdracht.status = soort
+            if soort == "klaar":
+                opdracht.resultaat, opdracht.traces = inhoud
+            elif soort == "fout":
+                opdracht.fout = inhoud
+            self.proces.join()
+            self.huidige = None
+            afgerond.append(opdracht)
+            self._start_volgende()
+        return afgerond
+
+    def annuleer(self, opdracht=None):
+        # Zonder opdracht wordt de lopende opdracht geannuleerd; die stopt na de iteratie (bij een ensemble: de run)
+        # waar die mee bezig is
+        if opdracht is None or opdracht is self.huidige:
+            if self.huidige is not None:
+                self.stop.set()
+        elif opdracht in self.wachtrij:
+            self.wachtrij.remove(opdracht)
+            opdracht.status = "geannuleerd"
+
+    def sluit(self):
+        # Stopt het proces direct en leegt de wachtrij
+        self.wachtrij.clear()
+        if self.proces is not None and self.proces.is_alive():
+            self.proces.terminate()
+            self.proces.join()
+        self.huidige = None